@@ -9,14 +9,16 @@ import sys
 import os
 from pathlib import Path
 
+import ytdlp_engine
+import capabilities
+import batch_download
+from download_archive import DownloadArchive
+
 def check_ytdlp():
     """Check if yt-dlp is installed"""
-    try:
-        subprocess.run(['yt-dlp', '--version'], 
-                      capture_output=True, check=True)
+    if ytdlp_engine.is_available():
         return True
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        return False
+    return capabilities.available('yt-dlp')
 
 def install_ytdlp():
     """Try to install yt-dlp"""
@@ -43,81 +45,113 @@ def get_download_folder():
     os.makedirs(downloads_path, exist_ok=True)
     return downloads_path
 
-def get_video_info(url):
+def get_video_info(url, args=()):
     """Get video information"""
+    if ytdlp_engine.is_available():
+        try:
+            info = ytdlp_engine.extract_info(url, args)
+            return {'title': info.get('title') or 'Unknown',
+                    'duration': info.get('duration_string') or 'Unknown',
+                    'info': info}
+        except ytdlp_engine.EngineError:
+            return {'title': 'Unknown', 'duration': 'Unknown'}
     try:
-        cmd = ['yt-dlp', '--get-title', '--get-duration', url]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        lines = result.stdout.strip().split('\n')
-        return {'title': lines[0] if lines else 'Unknown', 
-                'duration': lines[1] if len(lines) > 1 else 'Unknown'}
-    except:
+        # Single pass: the same info dict is reused for the download
+        info = ytdlp_engine.dump_info_cli(url, args)
+        return {'title': info.get('title') or 'Unknown',
+                'duration': info.get('duration_string') or 'Unknown',
+                'info': info}
+    except (subprocess.CalledProcessError, FileNotFoundError, ValueError):
         return {'title': 'Unknown', 'duration': 'Unknown'}
 
+def build_ytdlp_args(quality, output_template):
+    """yt-dlp options for downloading a video with audio properly merged"""
+    return [
+        '-f', f'best[height<={quality}]/bestvideo[height<={quality}]+bestaudio/best',
+        '--merge-output-format', 'mp4',
+        '--postprocessor-args', 'ffmpeg:-c:v copy -c:a aac',
+        '-o', output_template,
+        '--progress',  # Show progress
+        '--console-title',  # Update console title with progress
+        '--no-warnings',  # Reduce clutter
+    ]
+
+def open_in_player(output_path):
+    """Open a downloaded file with the default video player"""
+    print("🎥 Opening video player...")
+    
+    # Open with default video player
+    if sys.platform == 'win32':
+        os.startfile(output_path)
+    elif sys.platform == 'darwin':  # macOS
+        subprocess.run(['open', output_path])
+    else:  # Linux
+        subprocess.run(['xdg-open', output_path])
+    
+    print("✨ Enjoy your ad-free video!\n")
+
 def download_and_play(url, quality='best'):
     """Download video and play with default player"""
     try:
+        # Skip the download entirely if the video is already archived
+        archive = DownloadArchive()
+        entry = archive.lookup(url)
+        if entry and os.path.exists(entry['path']):
+            print(f"\n🗃️  Already downloaded: {entry['path']}")
+            open_in_player(entry['path'])
+            return True
+        
+        # Use Downloads folder
+        downloads_dir = get_download_folder()
+        output_template = os.path.join(downloads_dir, '%(title)s.%(ext)s')
+        
+        # Download video with audio properly merged
+        args = build_ytdlp_args(quality, output_template)
+        
         print("\n" + "🔍 " + "Fetching video information...")
-        info = get_video_info(url)
+        info = get_video_info(url, args)
         print(f"✅ Video: {info['title']}")
         print(f"⏱️  Duration: {info['duration']}")
-        print(f"📁 Download location: {get_download_folder()}")
+        print(f"📁 Download location: {downloads_dir}")
         print(f"🎬 Quality: {quality}p")
         
         print("\n" + "="*60)
         print("📥 Starting download (ad-free)...")
         print("="*60 + "\n")
         
-        # Use Downloads folder
-        downloads_dir = get_download_folder()
-        output_template = os.path.join(downloads_dir, '%(title)s.%(ext)s')
-        
-        # Download video with audio properly merged
-        cmd = [
-            'yt-dlp',
-            '-f', f'best[height<={quality}]/bestvideo[height<={quality}]+bestaudio/best',
-            '--merge-output-format', 'mp4',
-            '--postprocessor-args', 'ffmpeg:-c:v copy -c:a aac',
-            '-o', output_template,
-            '--progress',  # Show progress
-            '--console-title',  # Update console title with progress
-            '--no-warnings',  # Reduce clutter
-            url
-        ]
-        
-        # Run without capturing output so progress is shown
-        result = subprocess.run(cmd, check=True)
+        if ytdlp_engine.is_available():
+            # In-process: reuse the extracted info and get the filename from the result
+            output_path = ytdlp_engine.download(url, args, info.get('info'))
+        elif info.get('info'):
+            # Download from the info dict fetched above (no second page fetch)
+            output_path = ytdlp_engine.download_info_cli(info['info'], args)
+        else:
+            # Run without capturing output so progress is shown
+            result = subprocess.run(['yt-dlp'] + args + [url], check=True)
+            
+            # Find the downloaded file
+            # Get the actual filename that was created
+            cmd_get_filename = [
+                'yt-dlp',
+                '--get-filename',
+                '-o', output_template,
+                url
+            ]
+            filename_result = subprocess.run(cmd_get_filename, capture_output=True, text=True, check=True)
+            output_path = filename_result.stdout.strip()
         
-        # Find the downloaded file
-        # Get the actual filename that was created
-        cmd_get_filename = [
-            'yt-dlp',
-            '--get-filename',
-            '-o', output_template,
-            url
-        ]
-        filename_result = subprocess.run(cmd_get_filename, capture_output=True, text=True, check=True)
-        output_path = filename_result.stdout.strip()
+        if output_path and os.path.exists(output_path):
+            output_path = archive.record(url, output_path)
         
         print("\n" + "="*60)
         print("✅ Download complete!")
         print("="*60)
         print(f"📂 Saved to: {output_path}")
-        print("🎥 Opening video player...")
-        
-        # Open with default video player
-        if sys.platform == 'win32':
-            os.startfile(output_path)
-        elif sys.platform == 'darwin':  # macOS
-            subprocess.run(['open', output_path])
-        else:  # Linux
-            subprocess.run(['xdg-open', output_path])
-        
-        print("✨ Enjoy your ad-free video!\n")
+        open_in_player(output_path)
         
         return True
         
-    except subprocess.CalledProcessError as e:
+    except (subprocess.CalledProcessError, ytdlp_engine.EngineError) as e:
         print(f"\n❌ Error occurred: {e}")
         print("💡 Tip: Make sure the URL is valid and accessible")
         return False
@@ -146,6 +180,15 @@ def main():
     
     print("✅ yt-dlp is ready!\n")
     
+    # Batch mode: python NoAd.py --batch urls.txt [--jobs N] [--per-host N]
+    if len(sys.argv) > 1 and sys.argv[1] == '--batch':
+        options = batch_download.parse_batch_args(sys.argv[2:], 'Ad-Free Video Player (batch)')
+        output_template = os.path.join(get_download_folder(), '%(title)s.%(ext)s')
+        args = build_ytdlp_args('720', output_template)
+        ok = batch_download.run_batch(options.source, lambda url: args,
+                                      options.jobs, options.per_host, options.archive)
+        sys.exit(0 if ok else 1)
+    
     # Get video URL
     if len(sys.argv) > 1:
         url = sys.argv[1]
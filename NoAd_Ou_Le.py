@@ -7,24 +7,25 @@ Simple script to download videos for local viewing
 import subprocess
 import sys
 import os
-import re
 import random
 from urllib.parse import urlparse
 
+import ytdlp_engine
+import capabilities
+import hls_download
+import page_scanner
+import http_client
+import batch_download
+from download_archive import DownloadArchive
+
 def check_dependencies():
     """Check if required tools are installed"""
     missing = []
     
-    try:
-        subprocess.run(['yt-dlp', '--version'], 
-                      capture_output=True, check=True)
-    except (subprocess.CalledProcessError, FileNotFoundError):
+    if not ytdlp_engine.is_available() and not capabilities.available('yt-dlp'):
         missing.append('yt-dlp')
     
-    try:
-        subprocess.run(['ffmpeg', '-version'], 
-                      capture_output=True, check=True)
-    except (subprocess.CalledProcessError, FileNotFoundError):
+    if not capabilities.available('ffmpeg'):
         missing.append('ffmpeg')
     
     return missing
@@ -52,38 +53,14 @@ def generate_random_filename():
 def extract_embedded_video(url):
     """Try to extract embedded video source from page"""
     try:
-        import urllib.request
-        req = urllib.request.Request(
-            url,
-            headers={
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-            }
-        )
-        with urllib.request.urlopen(req, timeout=15) as response:
-            html = response.read().decode('utf-8', errors='ignore')
-            
-            patterns = [
-                r'https?://[^"\s<>]*\.m3u8[^"\s<>]*',
-                r'https?://[^"\s<>]*\.mp4[^"\s<>]*',
-                r'player\.vod\.com[^"\']*',
-                r'iframe.*?src=["\'](https?://[^"\']+)',
-                r'"url":\s*"([^"]+\.m3u8[^"]*)"',
-                r'"url":\s*"([^"]+\.mp4[^"]*)"',
-            ]
-            
-            found_urls = []
-            for pattern in patterns:
-                matches = re.findall(pattern, html, re.IGNORECASE)
-                found_urls.extend(matches)
-            
-            if found_urls:
-                cleaned_urls = []
-                for url in found_urls:
-                    cleaned = url.replace('\\/', '/').replace('\\"', '"')
-                    cleaned = cleaned.strip('"\'')
-                    if cleaned not in cleaned_urls:
-                        cleaned_urls.append(cleaned)
-                return cleaned_urls
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+        }
+        # Shared keep-alive client: repeated lookups reuse the same connection
+        with http_client.shared_client().get(url, headers) as response:
+            # Scan while downloading and stop once a few direct sources are found
+            hits, _ = page_scanner.scan_stream(response)
+            return [hit.url for hit in hits]
             
     except Exception:
         pass
@@ -92,6 +69,14 @@ def extract_embedded_video(url):
 
 def download_video_direct(video_url, output_path):
     """Download video directly using ffmpeg"""
+    # Fetch HLS segments in parallel; fall back to ffmpeg's sequential fetch
+    if '.m3u8' in video_url:
+        try:
+            hls_download.download_hls(video_url, output_path, referer=video_url)
+            return True
+        except Exception as e:
+            print(f"Parallel HLS download failed: {e}")
+    
     cmd = [
         'ffmpeg',
         '-user_agent', 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
@@ -111,34 +96,58 @@ def download_video_direct(video_url, output_path):
     except:
         return False
 
+def build_ytdlp_args(url, output_template):
+    """yt-dlp options for downloading url to output_template"""
+    return [
+        '-f', 'best',
+        '--merge-output-format', 'mp4',
+        '-o', output_template,
+        '--newline',
+        '--no-warnings',
+        '--no-playlist',
+        '--progress',
+        '--user-agent', 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
+        '--referer', url,
+        '--all-subs',
+        '--embed-subs',
+    ]
+
+def batch_args_for(url):
+    """yt-dlp options for one URL of a batch, each saved under a random name"""
+    output_template = os.path.join(get_download_folder(), f'{generate_random_filename()}.%(ext)s')
+    return build_ytdlp_args(url, output_template)
+
 def download_with_ytdlp(url):
     """Download video using yt-dlp with progress bar"""
     try:
+        # Already fetched videos are found by id before any network work
+        archive = DownloadArchive()
+        entry = archive.lookup(url)
+        if entry and os.path.exists(entry['path']):
+            print(f"Already downloaded: {entry['path']}")
+            subprocess.run(['open', '-R', entry['path']])
+            return True
+        
         downloads_dir = get_download_folder()
         random_name = generate_random_filename()
         output_template = os.path.join(downloads_dir, f'{random_name}.%(ext)s')
         
         print("Downloading...")
         
-        cmd = [
-            'yt-dlp',
-            '-f', 'best',
-            '--merge-output-format', 'mp4',
-            '-o', output_template,
-            '--newline',
-            '--no-warnings',
-            '--no-playlist',
-            '--progress',
-            '--user-agent', 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
-            '--referer', url,
-            '--all-subs',
-            '--embed-subs',
-            url
-        ]
-        
-        result = subprocess.run(cmd)
+        args = build_ytdlp_args(url, output_template)
         
-        if result.returncode == 0:
+        if ytdlp_engine.is_available():
+            # In-process download returns the final filename directly
+            try:
+                output_path = ytdlp_engine.download(url, args)
+            except ytdlp_engine.EngineError:
+                return False
+        else:
+            result = subprocess.run(['yt-dlp'] + args + [url])
+            
+            if result.returncode != 0:
+                return False
+            
             cmd_filename = [
                 'yt-dlp',
                 '--get-filename',
@@ -148,12 +157,14 @@ def download_with_ytdlp(url):
             ]
             filename_result = subprocess.run(cmd_filename, capture_output=True, text=True)
             output_path = filename_result.stdout.strip()
-            
-            print(f"\n✓ Saved to: {output_path}")
-            subprocess.run(['open', '-R', output_path])
-            return True
         
-        return False
+        # Random names hide duplicates, so the content hash catches them here
+        if output_path and os.path.exists(output_path):
+            output_path = archive.record(url, output_path)
+        
+        print(f"\n✓ Saved to: {output_path}")
+        subprocess.run(['open', '-R', output_path])
+        return True
         
     except Exception as e:
         print(f"Error: {e}")
@@ -180,6 +191,13 @@ def main():
         print("Error: ffmpeg not installed. Install with: brew install ffmpeg")
         sys.exit(1)
     
+    # Batch mode: python NoAd_Ou_Le.py --batch urls.txt [--jobs N] [--per-host N]
+    if len(sys.argv) > 1 and sys.argv[1] == '--batch':
+        options = batch_download.parse_batch_args(sys.argv[2:], 'Video Downloader (batch)')
+        ok = batch_download.run_batch(options.source, batch_args_for,
+                                      options.jobs, options.per_host, options.archive)
+        sys.exit(0 if ok else 1)
+    
     # Get URL
     if len(sys.argv) > 1:
         url = sys.argv[1]
@@ -4,34 +4,403 @@ YouTube Ad-Free Player - Web Interface with Integrated Search
 Uses yt-dlp for searching - more reliable!
 """
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import HTTPServer, ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor, Future
+from collections import OrderedDict
+import argparse
+import gzip
+import hashlib
+import http.client
+import itertools
+import queue
 import urllib.parse
 import subprocess
-import shutil
 import json
 import webbrowser
 import threading
+import sqlite3
+import statistics
+import time
+import sys
 import re
 
+import ytdlp_engine
+import capabilities
+import thumbnail_cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Worker threads available to serve HTTP requests concurrently
+HTTP_WORKERS = 32
+
+# Upper bound on yt-dlp processes running at the same time
+SEARCH_WORKERS = 4
+
+# Slow yt-dlp work runs here so it never blocks /status, / or /play
+SEARCH_POOL = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix='yt-dlp')
+
+# Search results are reused for this many seconds
+SEARCH_CACHE_TTL = 600
+
+# Maximum number of distinct queries kept in memory
+SEARCH_CACHE_SIZE = 256
+
+# Results per search page; the page after the one shown is fetched in the background
+SEARCH_PAGE_SIZE = 12
+
+# Deepest result offset served (yt-dlp walks every earlier result page to get there)
+SEARCH_MAX_OFFSET = 240
+
+# Browsers may reuse the page this long before revalidating it with its ETag
+PAGE_MAX_AGE = 86400
+
+# Thumbnails are named by video id and never change, so browsers keep them this long
+THUMB_MAX_AGE = 7 * 86400
+
+# Idle keep-alive connections are closed after this many seconds, freeing their worker
+KEEPALIVE_TIMEOUT = 15
+
+
+class StaticAsset:
+    """A response body encoded once, with gzip/brotli variants and ETags"""
+    
+    def __init__(self, body, content_type):
+        self.content_type = content_type
+        self.bodies = {'identity': body.encode() if isinstance(body, str) else body}
+        self.bodies['gzip'] = gzip.compress(self.bodies['identity'], compresslevel=9)
+        if brotli is not None:
+            self.bodies['br'] = brotli.compress(self.bodies['identity'], quality=11)
+        digest = hashlib.sha256(self.bodies['identity']).hexdigest()[:20]
+        self.etags = {encoding: f'"{digest}-{encoding}"' for encoding in self.bodies}
+    
+    def negotiate(self, accept_encoding):
+        """Pick the smallest variant the client accepts"""
+        accepted = set()
+        for part in (accept_encoding or '').split(','):
+            name, *params = part.split(';')
+            quality = 1.0
+            for param in params:
+                key, _, value = param.strip().partition('=')
+                if key.lower() == 'q':
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            if quality > 0:
+                accepted.add(name.strip().lower())
+        for encoding in ('br', 'gzip'):
+            if encoding in self.bodies and (encoding in accepted or '*' in accepted):
+                return encoding
+        return 'identity'
+    
+    def matches(self, if_none_match):
+        """True if the client's cached copy (any variant) is current"""
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        return '*' in tags or not tags.isdisjoint(self.etags.values())
+
+
+class SearchCache:
+    """TTL + LRU cache for search results that coalesces identical searches"""
+    
+    def __init__(self, max_entries=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL, db_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, result)
+        self._inflight = {}            # key -> Future shared by concurrent callers
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.disk_hits = 0
+        
+        # Optional sqlite layer so results survive a server restart
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS search_cache '
+                '(key TEXT PRIMARY KEY, expires_at REAL, result TEXT)'
+            )
+            self._db.execute('DELETE FROM search_cache WHERE expires_at < ?', (time.time(),))
+            self._db.commit()
+    
+    @staticmethod
+    def normalize(query, offset=0):
+        """Normalize a query so trivial variations share one entry; later pages get their own"""
+        key = ' '.join(query.lower().split())
+        # A normalized query never contains a newline, so page keys cannot collide with it
+        return key if not offset else f'{key}\noffset {offset}'
+    
+    def get_or_compute(self, query, compute, offset=0):
+        """Return the cached result for query, running compute(query) on a miss"""
+        key = self.normalize(query, offset)
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+            
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                owner = False
+            else:
+                future = Future()
+                self._inflight[key] = future
+                owner = True
+        
+        if not owner:
+            return future.result()
+        
+        try:
+            result = self._load(key)
+            if result is None:
+                with self._lock:
+                    self.misses += 1
+                result = compute(query)
+                # Only successful searches are worth keeping
+                if result.get('success'):
+                    self._store(key, result)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+    
+    def peek(self, query, offset=0):
+        """Return the cached result for query without computing it, or None"""
+        key = self.normalize(query, offset)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        # Misses are counted by get_or_compute, which runs the search
+        return self._load(key)
+    
+    def pending(self, query, offset=0):
+        """Return the Future of a search for query that is still running, or None"""
+        with self._lock:
+            future = self._inflight.get(self.normalize(query, offset))
+            if future is not None:
+                self.coalesced += 1
+            return future
+    
+    def _load(self, key):
+        """Look the key up in the sqlite layer and promote it to memory"""
+        if self._db is None:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                'SELECT expires_at, result FROM search_cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or row[0] <= time.time():
+                return None
+            result = json.loads(row[1])
+            self._remember(key, row[0], result)
+            self.disk_hits += 1
+        return result
+    
+    def _store(self, key, result):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, expires_at, result)
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO search_cache VALUES (?, ?, ?)',
+                    (key, expires_at, json.dumps(result))
+                )
+                self._db.commit()
+    
+    def _remember(self, key, expires_at, result):
+        self._entries[key] = (expires_at, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def stats(self):
+        """Return hit/miss counters for /status"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'disk_hits': self.disk_hits,
+                'persistent': self._db is not None
+            }
+
+
+class PooledHTTPServer(ThreadingHTTPServer):
+    """HTTP server that serves each request on a bounded worker pool"""
+    
+    daemon_threads = True
+    
+    def __init__(self, server_address, handler_class, max_workers=HTTP_WORKERS):
+        super().__init__(server_address, handler_class)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='http')
+    
+    def process_request(self, request, client_address):
+        """Hand the connection to the pool instead of spawning a thread"""
+        self.executor.submit(self.process_request_thread, request, client_address)
+    
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False)
+
+def search_offset(offset=None, page=None):
+    """Result offset from an 'offset' or 1-based 'page' request parameter"""
+    try:
+        if offset is not None:
+            value = int(offset)
+        elif page is not None:
+            value = (int(page) - 1) * SEARCH_PAGE_SIZE
+        else:
+            return 0
+    except (TypeError, ValueError):
+        return 0
+    return max(0, min(value, SEARCH_MAX_OFFSET - SEARCH_PAGE_SIZE))
+
+
 class YouTubeHandler(BaseHTTPRequestHandler):
     
+    # Keep-alive: the browser reuses one connection for the page, /status and searches
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEPALIVE_TIMEOUT
+    # Headers and body are written separately; without TCP_NODELAY, Nagle's
+    # algorithm and delayed ACKs stall every reused connection by ~40 ms
+    disable_nagle_algorithm = True
+    
+    search_cache = SearchCache()
+    
+    page = None
+    page_lock = threading.Lock()
+    
+    thumbnails = None
+    thumbnails_lock = threading.Lock()
+    
+    @classmethod
+    def page_asset(cls):
+        """The interface page, encoded and compressed once per process"""
+        if cls.page is None:
+            with cls.page_lock:
+                if cls.page is None:
+                    cls.page = StaticAsset(cls.get_html(), 'text/html; charset=utf-8')
+        return cls.page
+    
+    @classmethod
+    def thumbnail_cache(cls):
+        """The on-disk thumbnail cache, opened on first use"""
+        if cls.thumbnails is None:
+            with cls.thumbnails_lock:
+                if cls.thumbnails is None:
+                    cls.thumbnails = thumbnail_cache.ThumbnailCache()
+        return cls.thumbnails
+    
+    def send_asset(self, asset):
+        """Serve a StaticAsset: 304 if the client has it, else the best pre-encoded variant"""
+        encoding = asset.negotiate(self.headers.get('Accept-Encoding'))
+        cache_headers = {
+            'ETag': asset.etags[encoding],
+            'Cache-Control': f'public, max-age={PAGE_MAX_AGE}',
+            'Vary': 'Accept-Encoding',
+        }
+        if asset.matches(self.headers.get('If-None-Match')):
+            self.send_response(304)
+            for name, value in cache_headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+        
+        body = asset.bodies[encoding]
+        self.send_response(200)
+        self.send_header('Content-Type', asset.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if encoding != 'identity':
+            self.send_header('Content-Encoding', encoding)
+        for name, value in cache_headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_thumbnail(self, video_id):
+        """Serve a cached thumbnail, fetching it first on a miss"""
+        try:
+            data = self.thumbnail_cache().get(video_id)
+        except ValueError:
+            self.send_error(404)
+            return
+        except (thumbnail_cache.ThumbnailError, OSError):
+            self.send_error(502, 'Thumbnail unavailable')
+            return
+        
+        etag = f'"{hashlib.sha256(data).hexdigest()[:20]}"'
+        cache_headers = {
+            'ETag': etag,
+            'Cache-Control': f'public, max-age={THUMB_MAX_AGE}, immutable',
+        }
+        if etag in self.headers.get('If-None-Match', ''):
+            self.send_response(304)
+            for name, value in cache_headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in cache_headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def send_json(self, data):
+        """Send a JSON response with Content-Length, as keep-alive requires"""
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
     def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
         if self.path == '/':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
-            self.end_headers()
-            self.wfile.write(self.get_html().encode())
+            self.send_asset(self.page_asset())
+        elif url.path == '/search/stream':
+            params = urllib.parse.parse_qs(url.query)
+            query = params.get('q', [''])[0].strip()
+            if not query:
+                self.send_error(400, 'Missing search query')
+            else:
+                self.stream_search(query, search_offset(params.get('offset', [None])[0],
+                                                        params.get('page', [None])[0]))
+        elif url.path.startswith('/thumb/'):
+            self.send_thumbnail(url.path[len('/thumb/'):])
         elif self.path == '/status':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
+            # Tool checks come from the capability registry, not a PATH scan per request
             status = {
-                'mpv': shutil.which('mpv') is not None,
-                'iina': shutil.which('iina') is not None,
-                'yt_dlp': shutil.which('yt-dlp') is not None,
-                'brew': shutil.which('brew') is not None
+                'mpv': capabilities.available('mpv'),
+                'iina': capabilities.available('iina'),
+                'yt_dlp': ytdlp_engine.is_available() or capabilities.available('yt-dlp'),
+                'brew': capabilities.available('brew'),
+                'search_cache': self.search_cache.stats(),
+                'thumbnails': self.thumbnail_cache().stats()
             }
-            self.wfile.write(json.dumps(status).encode())
+            self.send_json(status)
         else:
             self.send_error(404)
     
@@ -46,10 +415,7 @@ class YouTubeHandler(BaseHTTPRequestHandler):
             
             result = self.play_video(query, player)
             
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps(result).encode())
+            self.send_json(result)
         
         elif self.path == '/search':
             content_length = int(self.headers['Content-Length'])
@@ -57,72 +423,196 @@ class YouTubeHandler(BaseHTTPRequestHandler):
             data = json.loads(post_data.decode())
             
             query = data.get('query', '')
-            result = self.search_youtube(query)
+            offset = search_offset(data.get('offset'), data.get('page'))
+            result = self.search_page(query, offset)
             
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps(result).encode())
+            self.send_json(result)
+            if result.get('next_offset') is not None:
+                self.prefetch_search(query, result['next_offset'])
+        
+        else:
+            self.send_error(404)
     
-    def search_youtube(self, query):
-        """Search YouTube using yt-dlp"""
+    def search_page(self, query, offset=0):
+        """One page of results: cached, joined from a search in flight, or searched on the pool"""
+        result = self.search_cache.peek(query, offset)
+        if result is None:
+            pending = self.search_cache.pending(query, offset)
+            if pending is not None:
+                try:
+                    result = pending.result()
+                except Exception as e:
+                    result = {'success': False, 'message': f'Search failed: {e}', 'videos': []}
+        if result is None:
+            # The whole lookup runs on the pool, so a search always computes on the
+            # worker that owns it and no worker waits on a search still in the queue
+            result = SEARCH_POOL.submit(
+                self.search_cache.get_or_compute, query, lambda q: self.search_youtube(q, offset), offset
+            ).result()
+        return result
+    
+    def stream_search(self, query, offset=0):
+        """Send search results as Server-Sent Events, one card per event as yt-dlp finds it"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        # The stream has no length, so it ends by closing the connection
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        
+        try:
+            for event, data in self.search_events(query, offset):
+                self.wfile.write(f'event: {event}\ndata: {json.dumps(data)}\n\n'.encode())
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The page went away; the search still finishes and is cached
+    
+    def search_events(self, query, offset=0):
+        """Yield ('video', card) events, then ('done', summary) or ('failed', error)"""
+        cached = self.search_cache.peek(query, offset)
+        if cached is None:
+            # A prefetch or another page may be fetching this result already; share it
+            pending = self.search_cache.pending(query, offset)
+            if pending is not None:
+                try:
+                    cached = pending.result()
+                except Exception as e:
+                    yield 'failed', {'message': f'Search failed: {e}'}
+                    return
+        if cached is not None:
+            yield from self.result_events(cached, cached=True)
+            if cached.get('next_offset') is not None:
+                self.prefetch_search(query, cached['next_offset'])
+            return
+        
+        # yt-dlp runs on the search pool, so streaming searches share its process limit
+        events = queue.Queue()
+        SEARCH_POOL.submit(self._produce_search_events, query, offset, events)
+        while True:
+            event = events.get()
+            yield event
+            if event[0] != 'video':
+                return
+    
+    def _produce_search_events(self, query, offset, events):
+        streamed = []
+        
+        def compute(q):
+            for video in self.iter_search(q, offset):
+                streamed.append(video)
+                events.put(('video', video))
+            result = self.search_result(streamed, offset)
+            # Empty pages are not cached
+            result['success'] = bool(streamed)
+            return result
+        
+        # Goes through the cache, so a search started meanwhile is joined instead of repeated
+        try:
+            result = self.search_cache.get_or_compute(query, compute, offset)
+        except Exception as e:
+            events.put(('failed', {'message': f'Search failed: {e}'}))
+            return
+        for event in self.result_events(result, cached=not streamed, sent=len(streamed)):
+            events.put(event)
+        if result.get('next_offset') is not None:
+            self.prefetch_search(query, result['next_offset'])
+    
+    @staticmethod
+    def result_events(result, cached, sent=0):
+        """Events for a whole search result, skipping the first sent videos"""
+        if not result.get('success') and result.get('message'):
+            yield 'failed', {'message': result['message']}
+            return
+        for video in result['videos'][sent:]:
+            yield 'video', video
+        yield 'done', {'count': len(result['videos']), 'source': result.get('source', 'yt-dlp'),
+                       'cached': cached, 'next_offset': result.get('next_offset')}
+    
+    def prefetch_search(self, query, offset):
+        """Fetch the next page in the background so scrolling to it is instant"""
+        SEARCH_POOL.submit(
+            # Runs on the pool already, so compute directly instead of submitting again
+            self.search_cache.get_or_compute, query, lambda q: self.search_youtube(q, offset), offset
+        )
+    
+    @staticmethod
+    def search_result(videos, offset):
+        """The search response for one page, with the offset of the next page if there is one"""
+        end = offset + SEARCH_PAGE_SIZE
+        has_more = len(videos) == SEARCH_PAGE_SIZE and end < SEARCH_MAX_OFFSET
+        return {'success': True, 'videos': videos, 'source': 'yt-dlp', 'offset': offset,
+                'next_offset': end if has_more else None}
+    
+    def iter_search(self, query, offset=0):
+        """Yield the result cards of one page as yt-dlp produces them"""
+        if not ytdlp_engine.is_available() and not capabilities.available('yt-dlp'):
+            raise ytdlp_engine.EngineError('yt-dlp not installed. Install with: brew install yt-dlp')
+        end = offset + SEARCH_PAGE_SIZE
+        for entry in ytdlp_engine.iter_entries(
+            f"ytsearch{end}:{query}",
+            ['--flat-playlist', '--quiet', '--no-warnings', '--socket-timeout', '15'],
+            start=offset + 1, end=end
+        ):
+            yield self.video_card(entry)
+    
+    def search_youtube(self, query, offset=0):
+        """Search YouTube using yt-dlp; returns the page of results starting at offset"""
         try:
-            # Check if yt-dlp is available
-            if not shutil.which('yt-dlp'):
-                return {
-                    'success': False,
-                    'message': 'yt-dlp not installed. Install with: brew install yt-dlp',
-                    'videos': []
-                }
-            
             # Use yt-dlp to search YouTube
-            search_url = f"ytsearch12:{query}"
+            end = offset + SEARCH_PAGE_SIZE
+            search_url = f"ytsearch{end}:{query}"
             
-            cmd = [
-                'yt-dlp',
-                '--dump-json',
-                '--no-playlist',
-                '--flat-playlist',
-                search_url
-            ]
-            
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=15
-            )
+            if ytdlp_engine.is_available():
+                # In-process search on this worker's warm YoutubeDL instance
+                try:
+                    videos = list(self.iter_search(query, offset))
+                except ytdlp_engine.EngineError as e:
+                    return {
+                        'success': False,
+                        'message': f'Search failed: {e}',
+                        'videos': []
+                    }
             
-            if result.returncode != 0:
+            # Check if yt-dlp is available
+            elif not capabilities.available('yt-dlp'):
                 return {
                     'success': False,
-                    'message': f'Search failed: {result.stderr}',
+                    'message': 'yt-dlp not installed. Install with: brew install yt-dlp',
                     'videos': []
                 }
             
-            # Parse results
-            videos = []
-            for line in result.stdout.strip().split('\n'):
-                if not line:
-                    continue
-                try:
-                    video_data = json.loads(line)
-                    video_id = video_data.get('id', '')
-                    
-                    videos.append({
-                        'id': video_id,
-                        'title': video_data.get('title', 'Unknown Title'),
-                        'author': video_data.get('uploader', video_data.get('channel', 'Unknown Author')),
-                        'duration': self.format_duration(video_data.get('duration', 0)),
-                        'views': self.format_views(video_data.get('view_count', 0)),
-                        'thumbnail': video_data.get('thumbnail', f"https://i.ytimg.com/vi/{video_id}/mqdefault.jpg"),
-                        'url': f"https://youtube.com/watch?v={video_id}"
-                    })
-                except json.JSONDecodeError:
-                    continue
+            else:
+                cmd = [
+                    'yt-dlp',
+                    '--dump-json',
+                    '--no-playlist',
+                    '--flat-playlist',
+                    '--playlist-start', str(offset + 1),
+                    '--playlist-end', str(end),
+                    search_url
+                ]
+                
+                result = self.run_search_command(cmd)
+                
+                if result.returncode != 0:
+                    return {
+                        'success': False,
+                        'message': f'Search failed: {result.stderr}',
+                        'videos': []
+                    }
+                
+                # Parse results
+                videos = []
+                for line in result.stdout.strip().split('\n'):
+                    if not line:
+                        continue
+                    try:
+                        videos.append(self.video_card(json.loads(line)))
+                    except json.JSONDecodeError:
+                        continue
             
             if videos:
-                return {'success': True, 'videos': videos, 'source': 'yt-dlp'}
+                return self.search_result(videos, offset)
             else:
                 return {
                     'success': False,
@@ -143,6 +633,33 @@ class YouTubeHandler(BaseHTTPRequestHandler):
                 'videos': []
             }
     
+    def video_card(self, video_data):
+        """Build the result card for one yt-dlp search entry"""
+        video_id = video_data.get('id', '')
+        thumbnail = video_data.get('thumbnail', f"https://i.ytimg.com/vi/{video_id}/mqdefault.jpg")
+        if thumbnail_cache.VIDEO_ID_RE.match(video_id):
+            # Served from the local cache; start fetching it now so it is ready when the card renders
+            thumbnail = f'/thumb/{video_id}'
+            self.thumbnail_cache().warm([video_id])
+        return {
+            'id': video_id,
+            'title': video_data.get('title', 'Unknown Title'),
+            'author': video_data.get('uploader', video_data.get('channel', 'Unknown Author')),
+            'duration': self.format_duration(video_data.get('duration', 0)),
+            'views': self.format_views(video_data.get('view_count', 0)),
+            'thumbnail': thumbnail,
+            'url': f"https://youtube.com/watch?v={video_id}"
+        }
+    
+    def run_search_command(self, cmd):
+        """Run the yt-dlp search process and return the completed result"""
+        return subprocess.run(
+            cmd,
+            capture_output=True,
+            text=True,
+            timeout=15
+        )
+    
     def format_duration(self, seconds):
         """Format duration in seconds to MM:SS or HH:MM:SS"""
         if not seconds:
@@ -177,9 +694,9 @@ class YouTubeHandler(BaseHTTPRequestHandler):
     def play_video(self, query, player):
         """Play video based on query and player selection"""
         try:
-            has_mpv = shutil.which('mpv') is not None
-            has_iina = shutil.which('iina') is not None
-            has_yt_dlp = shutil.which('yt-dlp') is not None
+            has_mpv = capabilities.available('mpv')
+            has_iina = capabilities.available('iina')
+            has_yt_dlp = capabilities.available('yt-dlp')
             
             # Determine URL
             if query.startswith('http'):
@@ -240,7 +757,8 @@ class YouTubeHandler(BaseHTTPRequestHandler):
         webbrowser.open(url)
         return {'success': True, 'message': 'Browser opened!', 'player': 'Web', 'url': url}
     
-    def get_html(self):
+    @staticmethod
+    def get_html():
         """Return the HTML interface"""
         return """
 <!DOCTYPE html>
@@ -560,6 +1078,11 @@ class YouTubeHandler(BaseHTTPRequestHandler):
         <div id="resultsContainer" style="display: none;">
             <div class="section-title">Search Results:</div>
             <div class="results" id="results"></div>
+            <div class="loading" id="moreResults" style="display: none;">
+                <div class="loading-spinner"></div>
+                <div>Loading more results...</div>
+            </div>
+            <div id="scrollSentinel"></div>
             <div class="api-info" id="apiInfo"></div>
         </div>
         
@@ -599,6 +1122,12 @@ class YouTubeHandler(BaseHTTPRequestHandler):
         window.onload = function() {
             checkStatus();
             
+            new IntersectionObserver(entries => {
+                if (entries.some(entry => entry.isIntersecting)) {
+                    loadMore();
+                }
+            }, {rootMargin: '200px'}).observe(document.getElementById('scrollSentinel'));
+            
             document.getElementById('searchInput').addEventListener('keypress', function(e) {
                 if (e.key === 'Enter') {
                     handleSearch();
@@ -649,6 +1178,12 @@ class YouTubeHandler(BaseHTTPRequestHandler):
             }
         }
         
+        // Infinite scroll: the next page loads when the sentinel below the results shows up
+        let currentQuery = '';
+        let nextOffset = null;
+        let activeSource = null;
+        let resultCount = 0;
+        
         function searchVideos() {
             const query = document.getElementById('searchInput').value.trim();
             if (!query) {
@@ -658,58 +1193,133 @@ class YouTubeHandler(BaseHTTPRequestHandler):
             
             const resultsDiv = document.getElementById('results');
             const container = document.getElementById('resultsContainer');
-            const btn = document.getElementById('searchBtn');
             
-            btn.disabled = true;
-            btn.textContent = '⏳ Searching...';
+            if (activeSource) {
+                activeSource.close();
+            }
+            currentQuery = query;
+            nextOffset = null;
+            resultCount = 0;
             
             resultsDiv.innerHTML = `
                 <div class="loading">
                     <div class="loading-spinner"></div>
                     <div>🔍 Searching YouTube...</div>
-                    <div style="font-size: 12px; margin-top: 10px; color: #999;">This may take 10-15 seconds</div>
+                    <div style="font-size: 12px; margin-top: 10px; color: #999;">Results appear as they are found</div>
                 </div>
             `;
             container.style.display = 'block';
             hideMessage();
             
-            fetch('/search', {
-                method: 'POST',
-                headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({query})
-            })
-            .then(r => r.json())
-            .then(data => {
-                if (data.success && data.videos.length > 0) {
-                    displayResults(data.videos);
+            loadPage(query, 0);
+        }
+        
+        function loadPage(query, offset) {
+            const resultsDiv = document.getElementById('results');
+            const btn = document.getElementById('searchBtn');
+            const more = document.getElementById('moreResults');
+            
+            btn.disabled = true;
+            btn.textContent = '⏳ Searching...';
+            if (offset > 0) {
+                more.style.display = 'block';
+            }
+            
+            // Cards stream in one Server-Sent Event at a time
+            const source = new EventSource(
+                '/search/stream?q=' + encodeURIComponent(query) + '&offset=' + offset);
+            activeSource = source;
+            let count = 0;
+            
+            function finish() {
+                source.close();
+                if (activeSource === source) {
+                    activeSource = null;
+                    btn.disabled = false;
+                    btn.textContent = '🔍 Search';
+                    more.style.display = 'none';
+                }
+            }
+            
+            function showNoResults(message) {
+                resultsDiv.innerHTML = 
+                    '<div class="no-results">😕 ' + 
+                    escapeHtml(message || 'No videos found. Try a different search term.') +
+                    '<br><br><small>You can still paste YouTube URLs directly!</small></div>';
+            }
+            
+            source.addEventListener('video', e => {
+                if (offset === 0 && count === 0) {
+                    resultsDiv.innerHTML = '';
+                }
+                count++;
+                resultCount++;
+                resultsDiv.insertAdjacentHTML('beforeend', renderCard(JSON.parse(e.data)));
+                document.getElementById('apiInfo').textContent = `Found ${resultCount} results so far...`;
+            });
+            
+            source.addEventListener('done', e => {
+                const data = JSON.parse(e.data);
+                finish();
+                nextOffset = data.next_offset;
+                if (resultCount > 0) {
                     document.getElementById('apiInfo').textContent = 
-                        `Found ${data.videos.length} results using ${data.source}`;
-                    showMessage('✅ Search completed!', 'success');
-                } else {
-                    resultsDiv.innerHTML = 
-                        '<div class="no-results">😕 ' + 
-                        (data.message || 'No videos found. Try a different search term.') +
-                        '<br><br><small>You can still paste YouTube URLs directly!</small></div>';
-                    if (data.message && data.message.includes('not installed')) {
-                        showMessage('⚠️ ' + data.message, 'warning');
+                        `Found ${resultCount} results using ${data.source}` + (data.cached ? ' (cached)' : '') +
+                        (nextOffset !== null ? ' — scroll for more' : '');
+                    if (offset === 0) {
+                        showMessage('✅ Search completed!', 'success');
                     }
+                    // Keep loading while the sentinel is still on screen
+                    checkSentinel();
+                } else {
+                    showNoResults();
+                }
+            });
+            
+            source.addEventListener('failed', e => {
+                const data = JSON.parse(e.data);
+                finish();
+                if (resultCount === 0) {
+                    showNoResults(data.message);
+                }
+                if (data.message.includes('not installed')) {
+                    showMessage('⚠️ ' + data.message, 'warning');
+                } else {
+                    showMessage('❌ ' + data.message, 'error');
                 }
-            })
-            .catch(err => {
-                resultsDiv.innerHTML = 
-                    '<div class="no-results">❌ Search failed: ' + err.message + 
-                    '<br><br>Try pasting a YouTube URL directly instead!</div>';
-                showMessage('❌ Search error: ' + err.message, 'error');
-            })
-            .finally(() => {
-                btn.disabled = false;
-                btn.textContent = '🔍 Search';
             });
+            
+            source.onerror = () => {
+                // The server closes the stream after 'done'; anything earlier is a failure
+                if (activeSource === source) {
+                    finish();
+                    if (resultCount === 0) {
+                        resultsDiv.innerHTML = 
+                            '<div class="no-results">❌ Search failed: connection lost' + 
+                            '<br><br>Try pasting a YouTube URL directly instead!</div>';
+                    }
+                    showMessage('❌ Search error: connection lost', 'error');
+                }
+            };
         }
         
-        function displayResults(videos) {
-            const resultsDiv = document.getElementById('results');
-            resultsDiv.innerHTML = videos.map(video => `
+        function loadMore() {
+            if (nextOffset !== null && !activeSource && currentQuery) {
+                const offset = nextOffset;
+                nextOffset = null;
+                loadPage(currentQuery, offset);
+            }
+        }
+        
+        function checkSentinel() {
+            const rect = document.getElementById('scrollSentinel').getBoundingClientRect();
+            if (rect.top < window.innerHeight + 200) {
+                loadMore();
+            }
+        }
+        
+        function renderCard(video) {
+            return `
                 <div class="video-card" onclick="playVideo('${video.url}')">
                     <img src="${video.thumbnail}" 
                          alt="${escapeHtml(video.title)}" 
@@ -722,7 +1332,7 @@ class YouTubeHandler(BaseHTTPRequestHandler):
                         <div class="video-stats">${video.views} • ${video.duration}</div>
                     </div>
                 </div>
-            `).join('');
+            `;
         }
         
         function playVideo(url) {
@@ -774,9 +1384,107 @@ class YouTubeHandler(BaseHTTPRequestHandler):
         """Suppress default logging"""
         pass
 
+class BenchmarkHandler(YouTubeHandler):
+    """Handler whose search runs a fake slow process instead of yt-dlp"""
+    
+    search_delay = 2.0
+    
+    # Results expire at once, so every request really runs the slow search
+    search_cache = SearchCache(ttl=0)
+    
+    def search_youtube(self, query, offset=0):
+        self.run_search_command([sys.executable, '-c', f'import time; time.sleep({self.search_delay})'])
+        return {'success': True, 'videos': [], 'source': 'benchmark'}
+
+
+def _benchmark_server(server_class, searches_in_flight, duration):
+    """Measure /status latency while searches keep the server busy"""
+    server = server_class(('localhost', 0), BenchmarkHandler)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    
+    stop = threading.Event()
+    
+    queries = itertools.count()
+    
+    def search_loop():
+        while not stop.is_set():
+            try:
+                # A fresh query each time, so concurrent searches are not coalesced either
+                query = f'benchmark {next(queries)}'
+                conn = http.client.HTTPConnection('localhost', port, timeout=30)
+                conn.request('POST', '/search', body=json.dumps({'query': query}),
+                             headers={'Content-Type': 'application/json'})
+                conn.getresponse().read()
+                conn.close()
+            except OSError:
+                pass
+    
+    searchers = [threading.Thread(target=search_loop, daemon=True) for _ in range(searches_in_flight)]
+    for t in searchers:
+        t.start()
+    time.sleep(0.2)
+    
+    latencies = []
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        conn = http.client.HTTPConnection('localhost', port, timeout=60)
+        conn.request('GET', '/status')
+        conn.getresponse().read()
+        conn.close()
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.05)
+    
+    stop.set()
+    server.shutdown()
+    server.server_close()
+    
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return len(latencies), p50, p99
+
+
+def run_benchmark(searches_in_flight=4, duration=10.0):
+    """Compare /status latency of the single-threaded and pooled servers"""
+    print("\n" + "="*60)
+    print("   ⏱️  /status latency with searches in flight")
+    print("="*60)
+    print(f"\nSearches in flight: {searches_in_flight}  "
+          f"(each takes {BenchmarkHandler.search_delay:.1f}s)")
+    print(f"Duration per server: {duration:.0f}s\n")
+    print(f"{'server':<20}{'requests':>10}{'p50 ms':>12}{'p99 ms':>12}")
+    for server_class in (HTTPServer, PooledHTTPServer):
+        count, p50, p99 = _benchmark_server(server_class, searches_in_flight, duration)
+        print(f"{server_class.__name__:<20}{count:>10}{p50:>12.1f}{p99:>12.1f}")
+    print()
+
+
 def main():
+    parser = argparse.ArgumentParser(description='YouTube Ad-Free Player')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='measure /status latency while searches are in flight')
+    parser.add_argument('--cache-db', metavar='PATH',
+                        help='sqlite file that keeps search results across restarts')
+    args = parser.parse_args()
+    
+    if args.benchmark:
+        run_benchmark()
+        return
+    
+    if args.cache_db:
+        YouTubeHandler.search_cache = SearchCache(db_path=args.cache_db)
+    
+    # Build and compress the page once, before the first request
+    YouTubeHandler.page_asset()
+    YouTubeHandler.thumbnail_cache()
+    # Resolve the player tools off the main thread so the first /status is instant
+    threading.Thread(target=capabilities.status, args=(['mpv', 'iina', 'yt-dlp', 'brew'],),
+                     daemon=True).start()
+    
     PORT = 8088
-    server = HTTPServer(('localhost', PORT), YouTubeHandler)
+    server = PooledHTTPServer(('localhost', PORT), YouTubeHandler)
     
     print("\n" + "="*60)
     print("   🎬 YouTube Ad-Free Player with Search")
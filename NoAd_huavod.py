@@ -9,24 +9,22 @@ import sys
 import os
 import re
 import random
-import json
-import http.cookiejar
 from urllib.parse import urlparse, urljoin
 
+import ytdlp_engine
+import capabilities
+import hls_download
+import page_scanner
+import http_client
+
 def check_dependencies():
     """检查依赖是否安装"""
     missing = []
     
-    try:
-        subprocess.run(['yt-dlp', '--version'], 
-                      capture_output=True, check=True)
-    except (subprocess.CalledProcessError, FileNotFoundError):
+    if not ytdlp_engine.is_available() and not capabilities.available('yt-dlp'):
         missing.append('yt-dlp')
     
-    try:
-        subprocess.run(['ffmpeg', '-version'], 
-                      capture_output=True, check=True)
-    except (subprocess.CalledProcessError, FileNotFoundError):
+    if not capabilities.available('ffmpeg'):
         missing.append('ffmpeg')
     
     return missing
@@ -62,107 +60,47 @@ def generate_filename(url):
 def extract_video_with_browser_cookies(url):
     """使用浏览器 cookies 提取视频源"""
     try:
-        import urllib.request
-        import ssl
-        
-        # 创建 cookie 处理器
-        cookie_jar = http.cookiejar.CookieJar()
+        # 共享的连接池客户端：keep-alive 复用连接，cookies 按站点保存，自动解压 gzip/deflate/br
+        client = http_client.shared_client(verify=False)
         
-        # 创建支持 cookies 和 SSL 的 opener
-        context = ssl.create_default_context()
-        context.check_hostname = False
-        context.verify_mode = ssl.CERT_NONE
-        
-        opener = urllib.request.build_opener(
-            urllib.request.HTTPCookieProcessor(cookie_jar),
-            urllib.request.HTTPSHandler(context=context)
-        )
-        
-        # 设置请求头
+        # 设置请求头（Accept-Encoding 由客户端按实际支持的解压方式设置）
         headers = {
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1'
         }
         
         print("正在访问页面（可能需要等待验证）...")
         
         # 第一次请求，可能会被重定向到验证页
-        req = urllib.request.Request(url, headers=headers)
         try:
-            response = opener.open(req, timeout=30)
-            html = response.read()
-            
-            # 尝试解码
-            try:
-                html = html.decode('utf-8')
-            except:
-                html = html.decode('gbk', errors='ignore')
+            # 边下载边解码边扫描，找到足够的视频源就停止读取
+            with client.get(url, headers) as response:
+                hits, markers = page_scanner.scan_stream(response, markers=('验证',))
+                final_url = response.geturl()
             
             # 检查是否有验证页面
-            if 'verify' in response.geturl().lower() or '验证' in html:
+            if not hits and ('verify' in final_url.lower() or markers):
                 print("检测到验证页面，尝试自动通过...")
                 
                 # 等待几秒
                 import time
                 time.sleep(3)
                 
-                # 再次请求原始 URL
-                req = urllib.request.Request(url, headers=headers)
-                response = opener.open(req, timeout=30)
-                html = response.read()
-                try:
-                    html = html.decode('utf-8')
-                except:
-                    html = html.decode('gbk', errors='ignore')
+                # 再次请求原始 URL（复用同一连接和验证得到的 cookies）
+                with client.get(url, headers) as response:
+                    hits, markers = page_scanner.scan_stream(response)
             
             print("正在分析页面...")
             
-            # 查找视频源
+            # 一次扫描找出所有视频源（m3u8 / mp4 / 播放器配置 / iframe），已去重
             video_sources = []
-            
-            # 多种匹配模式
-            patterns = [
-                # m3u8
-                r'https?://[^"\s<>\']+\.m3u8[^"\s<>\']*',
-                r'"url":\s*"([^"]+\.m3u8[^"]*)"',
-                r"'url':\s*'([^']+\.m3u8[^']*)'",
-                r'url:\s*["\']([^"\']+\.m3u8[^"\']*)["\']',
-                
-                # mp4
-                r'https?://[^"\s<>\']+\.mp4[^"\s<>\']*',
-                r'"url":\s*"([^"]+\.mp4[^"]*)"',
-                r"'url':\s*'([^']+\.mp4[^']*)'",
-                r'url:\s*["\']([^"\']+\.mp4[^"\']*)["\']',
-                
-                # 常见播放器配置
-                r'player_aaaa\s*=\s*({[^}]+})',
-                r'var\s+player[^=]*=\s*({.+?});',
-                
-                # iframe
-                r'<iframe[^>]+src=["\'](https?://[^"\']+)["\']',
-            ]
-            
-            for pattern in patterns:
-                matches = re.findall(pattern, html, re.IGNORECASE | re.DOTALL)
-                for match in matches:
-                    if match.strip().startswith('{'):
-                        try:
-                            data = json.loads(match)
-                            if 'url' in data:
-                                video_sources.append(data['url'])
-                        except:
-                            pass
-                    else:
-                        cleaned = match.replace('\\/', '/').replace('\\"', '"').strip('"\'')
-                        if cleaned.startswith('http') and ('m3u8' in cleaned or 'mp4' in cleaned):
-                            video_sources.append(cleaned)
-            
-            # 去重
-            video_sources = list(dict.fromkeys(video_sources))
+            for hit in hits:
+                if hit.kind == 'player_config':
+                    video_sources.append(hit.url)
+                elif hit.url.startswith('http') and ('m3u8' in hit.url or 'mp4' in hit.url):
+                    video_sources.append(hit.url)
             
             return video_sources
             
@@ -186,8 +124,7 @@ def download_with_ytdlp(url, video_url=None, use_cookies=False):
         print(f"\n开始下载...")
         print(f"目标: {target_url[:80]}...\n")
         
-        cmd = [
-            'yt-dlp',
+        args = [
             '-f', 'best',
             '--merge-output-format', 'mp4',
             '-o', output_template,
@@ -208,21 +145,32 @@ def download_with_ytdlp(url, video_url=None, use_cookies=False):
             print("⚠️  即将访问浏览器 cookies，macOS 会请求钥匙串授权...")
             # 尝试从不同浏览器读取 cookies
             for browser in ['chrome', 'firefox', 'safari', 'edge']:
-                cmd.extend(['--cookies-from-browser', browser])
+                args.extend(['--cookies-from-browser', browser])
                 break
         
-        cmd.extend(['--all-subs', '--embed-subs', target_url])
+        args.extend(['--all-subs', '--embed-subs'])
         
-        result = subprocess.run(cmd)
+        output_path = None
+        if ytdlp_engine.is_available():
+            # 进程内下载，直接从结果中获得最终文件名
+            try:
+                output_path = ytdlp_engine.download(target_url, args)
+            except ytdlp_engine.EngineError:
+                return False
+        else:
+            result = subprocess.run(['yt-dlp'] + args + [target_url])
+            
+            if result.returncode == 0:
+                for file in os.listdir(downloads_dir):
+                    if file.startswith(filename):
+                        output_path = os.path.join(downloads_dir, file)
+                        break
         
-        if result.returncode == 0:
-            for file in os.listdir(downloads_dir):
-                if file.startswith(filename):
-                    output_path = os.path.join(downloads_dir, file)
-                    print(f"\n✓ 下载完成！")
-                    print(f"保存位置: {output_path}")
-                    subprocess.run(['open', '-R', output_path], stderr=subprocess.DEVNULL)
-                    return True
+        if output_path:
+            print(f"\n✓ 下载完成！")
+            print(f"保存位置: {output_path}")
+            subprocess.run(['open', '-R', output_path], stderr=subprocess.DEVNULL)
+            return True
         
         return False
         
@@ -235,6 +183,19 @@ def download_with_ffmpeg(video_url, url, filename):
     downloads_dir = get_download_folder()
     output_path = os.path.join(downloads_dir, f'{filename}.mp4')
     
+    # m3u8: 先用并行分片下载器，失败时再交给 ffmpeg 逐段下载
+    if '.m3u8' in video_url:
+        print(f"\n并行下载 HLS 分片...")
+        print(f"源: {video_url[:80]}...\n")
+        try:
+            hls_download.download_hls(video_url, output_path, referer=url, verify=False)
+            print(f"\n✓ 下载完成！")
+            print(f"保存位置: {output_path}")
+            subprocess.run(['open', '-R', output_path], stderr=subprocess.DEVNULL)
+            return True
+        except Exception as e:
+            print(f"并行下载失败: {e}")
+    
     print(f"\n使用 ffmpeg 下载...")
     print(f"源: {video_url[:80]}...\n")
     
@@ -7,16 +7,24 @@ Downloads videos in iPhone-friendly format (H.264 + AAC in MP4)
 import subprocess
 import sys
 import os
+import tempfile
+import time
 from pathlib import Path
 
+import ytdlp_engine
+import capabilities
+import mp4_to_iphone_format
+import ffmpeg_progress
+
+# Encoder profile used when a download has to be re-encoded
+# (see mp4_to_iphone_format.PROFILES)
+ENCODER_PROFILE = 'fast'
+
 def check_ytdlp():
     """Check if yt-dlp is installed"""
-    try:
-        subprocess.run(['yt-dlp', '--version'], 
-                      capture_output=True, check=True)
+    if ytdlp_engine.is_available():
         return True
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        return False
+    return capabilities.available('yt-dlp')
 
 def install_ytdlp():
     """Try to install yt-dlp"""
@@ -43,64 +51,166 @@ def get_download_folder():
     os.makedirs(downloads_path, exist_ok=True)
     return downloads_path
 
-def get_video_info(url):
+def get_video_info(url, args=()):
     """Get video information"""
+    if ytdlp_engine.is_available():
+        try:
+            info = ytdlp_engine.extract_info(url, args)
+            return {'title': info.get('title') or 'Unknown',
+                    'duration': info.get('duration_string') or 'Unknown',
+                    'info': info}
+        except ytdlp_engine.EngineError:
+            return {'title': 'Unknown', 'duration': 'Unknown'}
     try:
-        cmd = ['yt-dlp', '--get-title', '--get-duration', url]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        lines = result.stdout.strip().split('\n')
-        return {'title': lines[0] if lines else 'Unknown', 
-                'duration': lines[1] if len(lines) > 1 else 'Unknown'}
-    except:
+        # Single pass: the same info dict is reused for the download
+        info = ytdlp_engine.dump_info_cli(url, args)
+        return {'title': info.get('title') or 'Unknown',
+                'duration': info.get('duration_string') or 'Unknown',
+                'info': info}
+    except (subprocess.CalledProcessError, FileNotFoundError, ValueError):
         return {'title': 'Unknown', 'duration': 'Unknown'}
 
-def download_for_iphone(url, quality='720'):
-    """Download video in iPhone-compatible format (H.264 + AAC)"""
-    try:
-        print("\n" + "🔍 " + "Fetching video information...")
-        info = get_video_info(url)
-        print(f"✅ Video: {info['title']}")
-        print(f"⏱️  Duration: {info['duration']}")
-        print(f"📁 Download location: {get_download_folder()}")
-        print(f"🎬 Quality: {quality}p")
-        print(f"📱 Format: iPhone-compatible (H.264 + AAC)")
+def output_path_for(info, args):
+    """Final .mp4 path for a video, from the -o template in args"""
+    if ytdlp_engine.is_available():
+        path = ytdlp_engine.get_ydl(args).prepare_filename(info)
+    else:
+        path = info.get('filename') or info.get('_filename') or f"{info.get('title', 'video')}.mp4"
+    return str(Path(path).with_suffix('.mp4'))
+
+def can_pipeline():
+    """Pipelining needs ffmpeg and /dev/fd to hand a second pipe to it"""
+    return sys.platform != 'win32' and os.path.isdir('/dev/fd') and capabilities.available('ffmpeg')
+
+def download_pipelined(info, output_path, profile=ENCODER_PROFILE):
+    """
+    Stream the selected formats straight into ffmpeg while they download.
+    
+    yt-dlp writes the video to ffmpeg's stdin and the audio to a second
+    pipe that ffmpeg reads as /dev/fd/N, so converting overlaps with
+    downloading and nothing but the final file touches the disk. Streams
+    that are already H.264/AAC are copied. Returns the stream plan.
+    """
+    video, audio = ytdlp_engine.requested_formats(info)
+    if video is None:
+        raise RuntimeError('No video format selected')
+    plan = mp4_to_iphone_format.plan_codecs(video.get('vcodec'), audio.get('acodec') if audio else None)
+    separate_audio = audio is not None and audio is not video
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        info_path = os.path.join(tmp, 'info.json')
+        ytdlp_engine.save_info(info, info_path)
         
-        print("\n" + "="*60)
-        print("📥 Starting download (ad-free)...")
-        print("="*60 + "\n")
+        processes = [ytdlp_engine.open_stream(info_path, video['format_id'], quiet=False)]
+        command = ['ffmpeg', '-loglevel', 'error', '-i', 'pipe:0']
+        pass_fds = ()
+        if separate_audio:
+            processes.append(ytdlp_engine.open_stream(info_path, audio['format_id']))
+            audio_fd = processes[1].stdout.fileno()
+            pass_fds = (audio_fd,)
+            command += ['-i', f'/dev/fd/{audio_fd}', '-map', '0:v:0', '-map', '1:a:0']
+        command += mp4_to_iphone_format.codec_args(plan, profile=profile) + ['-y', output_path]
+        
+        try:
+            ffmpeg = subprocess.Popen(command, stdin=processes[0].stdout, pass_fds=pass_fds)
+        finally:
+            # ffmpeg holds its own copies; closing ours lets EOF/SIGPIPE propagate
+            for process in processes:
+                process.stdout.close()
+        ffmpeg.wait()
+        for process in processes:
+            if ffmpeg.returncode != 0:
+                process.kill()
+            process.wait()
+    
+    failed = [p.returncode for p in processes if p.returncode != 0]
+    if ffmpeg.returncode != 0 or failed:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise RuntimeError(f'Pipelined download failed (ffmpeg exit {ffmpeg.returncode}, yt-dlp exit {failed})')
+    return plan
+
+def download_then_convert(url, args, info, output_template, profile=ENCODER_PROFILE):
+    """Download the whole file, then make it iPhone-compatible; returns the final path"""
+    if ytdlp_engine.is_available():
+        # In-process: reuse the extracted info and get the filename from the result
+        output_path = ytdlp_engine.download(url, args, info)
+    elif info:
+        # Download from the info dict fetched before (no second page fetch)
+        output_path = ytdlp_engine.download_info_cli(info, args)
+    else:
+        # Run without capturing output so progress is shown
+        subprocess.run(['yt-dlp'] + args + [url], check=True)
         
+        # Get the actual filename
+        cmd_get_filename = [
+            'yt-dlp',
+            '--get-filename',
+            '-o', output_template,
+            url
+        ]
+        filename_result = subprocess.run(cmd_get_filename, capture_output=True, text=True, check=True)
+        output_path = filename_result.stdout.strip()
+        if not os.path.exists(output_path):
+            # --get-filename reports the pre-merge extension
+            output_path = str(Path(output_path).with_suffix('.mp4'))
+    
+    # Only re-encode the streams an iPhone cannot play; compatible
+    # downloads are just remuxed, which takes seconds instead of minutes
+    print("\n📱 Checking iPhone compatibility...")
+    result = mp4_to_iphone_format.make_iphone_compatible(
+        output_path, callback=ffmpeg_progress.print_progress, profile=profile)
+    print(f"✅ {mp4_to_iphone_format.MODE_LABELS[result['mode']].capitalize()} "
+          f"in {result['seconds']:.1f}s")
+    return result['output']
+
+def download_for_iphone(url, quality='720', pipelined=True, profile=ENCODER_PROFILE):
+    """Download video in iPhone-compatible format (H.264 + AAC)"""
+    try:
         # Use Downloads folder
         downloads_dir = get_download_folder()
         output_template = os.path.join(downloads_dir, '%(title)s.%(ext)s')
         
-        # Download and convert to iPhone-compatible format
-        # Use a more flexible format selection that works with all videos
-        cmd = [
-            'yt-dlp',
-            '-f', f'bv*[height<={quality}]+ba/b[height<={quality}]/bv*+ba/b',
+        # Prefer streams that are already H.264 + AAC so no re-encode is needed,
+        # falling back to a more flexible format selection that works with all videos
+        args = [
+            '-f', (f'bv*[height<={quality}][vcodec^=avc1]+ba[acodec^=mp4a]/'
+                   f'bv*[height<={quality}]+ba/b[height<={quality}]/bv*+ba/b'),
             '--merge-output-format', 'mp4',
-            # Force H.264 video codec and AAC audio codec (iPhone compatible)
-            '--recode-video', 'mp4',
-            '--postprocessor-args', 'ffmpeg:-c:v libx264 -preset fast -crf 22 -c:a aac -b:a 128k -movflags +faststart',
             '-o', output_template,
             '--progress',
             '--console-title',
             '--no-warnings',
-            url
         ]
         
-        # Run without capturing output so progress is shown
-        result = subprocess.run(cmd, check=True)
+        print("\n" + "🔍 " + "Fetching video information...")
+        info = get_video_info(url, args)
+        print(f"✅ Video: {info['title']}")
+        print(f"⏱️  Duration: {info['duration']}")
+        print(f"📁 Download location: {downloads_dir}")
+        print(f"🎬 Quality: {quality}p")
+        print(f"📱 Format: iPhone-compatible (H.264 + AAC)")
         
-        # Get the actual filename
-        cmd_get_filename = [
-            'yt-dlp',
-            '--get-filename',
-            '-o', output_template,
-            url
-        ]
-        filename_result = subprocess.run(cmd_get_filename, capture_output=True, text=True, check=True)
-        output_path = filename_result.stdout.strip()
+        print("\n" + "="*60)
+        print("📥 Starting download (ad-free)...")
+        print("="*60 + "\n")
+        
+        output_path = None
+        if pipelined and can_pipeline():
+            try:
+                # Pipelined: convert while downloading, no intermediate file
+                video_info = info.get('info') or ytdlp_engine.dump_info_cli(url, args)
+                output_path = output_path_for(video_info, args)
+                start = time.monotonic()
+                plan = download_pipelined(video_info, output_path, profile)
+                print(f"\n✅ Downloaded and converted in {time.monotonic() - start:.1f}s "
+                      f"({mp4_to_iphone_format.MODE_LABELS[mp4_to_iphone_format.describe_plan(plan)]})")
+            except (RuntimeError, OSError, subprocess.CalledProcessError, ytdlp_engine.EngineError) as e:
+                print(f"\n⚠️  Pipelined download failed ({e}), falling back to download + convert...")
+                output_path = None
+        
+        if output_path is None:
+            output_path = download_then_convert(url, args, info.get('info'), output_template, profile)
         
         print("\n" + "="*60)
         print("✅ Download complete!")
@@ -128,7 +238,8 @@ def download_for_iphone(url, quality='720'):
         
         return True
         
-    except subprocess.CalledProcessError as e:
+    except (subprocess.CalledProcessError, ytdlp_engine.EngineError,
+            RuntimeError, FileNotFoundError) as e:
         print(f"\n❌ Error occurred: {e}")
         print("💡 Tip: Make sure the URL is valid and ffmpeg is installed")
         return False
@@ -155,9 +266,23 @@ def main():
     
     print("✅ yt-dlp is ready!\n")
     
+    # --no-pipe: download the whole file first, then convert it
+    # --profile NAME: encoder profile for streams that need re-encoding
+    argv = sys.argv[1:]
+    pipelined = '--no-pipe' not in argv
+    argv = [arg for arg in argv if arg != '--no-pipe']
+    profile = ENCODER_PROFILE
+    if '--profile' in argv:
+        index = argv.index('--profile')
+        profile = argv[index + 1] if index + 1 < len(argv) else ''
+        del argv[index:index + 2]
+        if profile not in mp4_to_iphone_format.PROFILES:
+            print(f"❌ Unknown profile '{profile}'. Choose from: {', '.join(mp4_to_iphone_format.PROFILES)}")
+            sys.exit(1)
+    
     # Get video URL
-    if len(sys.argv) > 1:
-        url = sys.argv[1]
+    if argv:
+        url = argv[0]
         print(f"🔗 URL: {url}\n")
     else:
         url = input("🔗 Enter video URL (YouTube, etc.): ").strip()
@@ -170,7 +295,7 @@ def main():
     print()
     quality = input("🎯 Max quality (360/480/720/1080) [default: 720]: ").strip()
     quality = quality if quality in ['360', '480', '720', '1080'] else '720'
-    download_for_iphone(url, quality)
+    download_for_iphone(url, quality, pipelined, profile)
     
     print("\n" + "="*60)
     print("🎉 Done! Transfer to your iPhone and enjoy!")
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Batch Video Downloader
+Downloads many URLs at once through a bounded worker pool with
+per-host concurrency limits and a throughput summary.
+
+Usage: python3 batch_download.py urls.txt [--jobs 4] [--per-host 2]
+       cat urls.txt | python3 batch_download.py -
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from urllib.parse import urlparse, parse_qs
+
+import ytdlp_engine
+from download_archive import DownloadArchive, DEFAULT_ARCHIVE_PATH
+
+# Default number of downloads running at once
+DEFAULT_JOBS = 4
+
+# Default number of downloads running at once against the same host
+DEFAULT_PER_HOST = 2
+
+# Options that only make sense for a single interactive download
+INTERACTIVE_FLAGS = {'--progress', '--console-title', '--newline'}
+
+
+def read_urls(source):
+    """Read URLs from a file path, or from stdin when source is '-'"""
+    if source == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+
+    urls = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#') and line not in urls:
+            urls.append(line)
+    return urls
+
+
+def is_playlist_url(url):
+    """Check if the URL points to a playlist or channel rather than one video"""
+    parsed = urlparse(url)
+    query = parse_qs(parsed.query)
+    if 'list' in query and 'v' not in query:
+        return True
+    return parsed.path.startswith(('/playlist', '/@', '/channel/', '/c/', '/user/'))
+
+
+def expand_playlists(urls):
+    """Replace playlist/channel URLs with the videos they contain"""
+    expanded = []
+    for url in urls:
+        if is_playlist_url(url):
+            print(f"📃 Expanding playlist: {url}")
+            try:
+                entries = ytdlp_engine.playlist_urls(url)
+            except Exception as e:
+                print(f"   ✗ Could not expand playlist: {e}")
+                entries = [url]
+            print(f"   {len(entries)} videos")
+            expanded.extend(entries)
+        else:
+            expanded.append(url)
+    return list(dict.fromkeys(expanded))
+
+
+def batch_args(args):
+    """Make a single-download option list quiet enough to run in parallel"""
+    return [a for a in args if a not in INTERACTIVE_FLAGS] + ['--quiet', '--no-progress']
+
+
+def host_of(url):
+    """Host used for per-host concurrency limits"""
+    host = (urlparse(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def format_size(num_bytes):
+    """Format a byte count as MB/GB"""
+    if num_bytes >= 1024 ** 3:
+        return f"{num_bytes / 1024 ** 3:.2f} GB"
+    return f"{num_bytes / 1024 ** 2:.1f} MB"
+
+
+class BatchDownloader:
+    """Runs downloads on a fixed pool of workers, at most per_host per host"""
+
+    def __init__(self, fetch, jobs=DEFAULT_JOBS, per_host=DEFAULT_PER_HOST):
+        self.fetch = fetch
+        self.jobs = max(1, jobs)
+        self.per_host = max(1, per_host)
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._active = Counter()
+        self.completed = []  # (url, path, size, seconds)
+        self.failed = []     # (url, error)
+        self.total_bytes = 0
+
+    def run(self, urls):
+        """Download all URLs and return True if every download succeeded"""
+        self._pending.extend(urls)
+        self.total = len(urls)
+        self.started = time.monotonic()
+
+        workers = [threading.Thread(target=self._worker, daemon=True)
+                   for _ in range(min(self.jobs, len(urls)))]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+
+        self.elapsed = time.monotonic() - self.started
+        return not self.failed
+
+    def _next_url(self):
+        """Take the first pending URL whose host still has a free slot"""
+        with self._cond:
+            while self._pending:
+                for i, url in enumerate(self._pending):
+                    host = host_of(url)
+                    if self._active[host] < self.per_host:
+                        del self._pending[i]
+                        self._active[host] += 1
+                        return url
+                self._cond.wait()
+            return None
+
+    def _worker(self):
+        while True:
+            url = self._next_url()
+            if url is None:
+                return
+
+            start = time.monotonic()
+            path, error = None, None
+            try:
+                path = self.fetch(url)
+            except Exception as e:
+                error = str(e).strip().splitlines()[-1] if str(e).strip() else repr(e)
+            seconds = time.monotonic() - start
+            size = os.path.getsize(path) if path and os.path.exists(path) else 0
+
+            with self._cond:
+                self._active[host_of(url)] -= 1
+                if path and error is None:
+                    self.completed.append((url, path, size, seconds))
+                    self.total_bytes += size
+                    mark = '✓'
+                else:
+                    self.failed.append((url, error or 'no file produced'))
+                    mark = '✗'
+                self._print_progress(mark, url)
+                self._cond.notify_all()
+
+    def _print_progress(self, mark, url):
+        done = len(self.completed) + len(self.failed)
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        rate = self.total_bytes / elapsed / 1024 ** 2
+        print(f"[{done}/{self.total}] {mark} {url[:60]}  "
+              f"| ✓ {len(self.completed)} ✗ {len(self.failed)} "
+              f"| {format_size(self.total_bytes)} | {rate:.1f} MB/s", flush=True)
+
+    def print_summary(self):
+        """Print throughput and failures"""
+        elapsed = max(self.elapsed, 1e-6)
+        print("\n" + "=" * 60)
+        print("📊 Batch summary")
+        print("=" * 60)
+        print(f"Videos:     {len(self.completed)} ok, {len(self.failed)} failed, {self.total} total")
+        print(f"Downloaded: {format_size(self.total_bytes)} in {elapsed:.1f}s")
+        print(f"Throughput: {self.total_bytes / elapsed / 1024 ** 2:.2f} MB/s, "
+              f"{len(self.completed) / elapsed * 60:.1f} videos/min")
+        if self.failed:
+            print("\nFailed:")
+            for url, error in self.failed:
+                print(f"  ✗ {url}\n    {error}")
+        print("=" * 60 + "\n")
+
+
+def run_batch(source, args_for, jobs=DEFAULT_JOBS, per_host=DEFAULT_PER_HOST,
+              archive_path=DEFAULT_ARCHIVE_PATH):
+    """Download every URL from source; args_for(url) returns the yt-dlp options"""
+    urls = expand_playlists(read_urls(source))
+    if not urls:
+        print("❌ No URLs found")
+        return False
+
+    # Skip everything already in the archive before any network work;
+    # videos whose file was deleted since are downloaded again
+    archive = DownloadArchive(archive_path) if archive_path else None
+    if archive is not None:
+        new_urls = []
+        for url in urls:
+            entry = archive.lookup(url)
+            if entry is None or not os.path.exists(entry['path']):
+                new_urls.append(url)
+        if len(new_urls) < len(urls):
+            print(f"🗃️  Skipping {len(urls) - len(new_urls)} already downloaded videos")
+        urls = new_urls
+        if not urls:
+            print("✅ Everything is already downloaded")
+            return True
+
+    def fetch(url):
+        path = ytdlp_engine.fetch(url, batch_args(args_for(url)))
+        if archive is not None and path and os.path.exists(path):
+            path = archive.record(url, path)
+        return path
+
+    print(f"📥 {len(urls)} videos, {jobs} at a time (max {per_host} per host)\n")
+    downloader = BatchDownloader(fetch, jobs=jobs, per_host=per_host)
+    ok = downloader.run(urls)
+    downloader.print_summary()
+    if archive is not None:
+        archive.close()
+    return ok
+
+
+def parse_batch_args(argv, description='Batch video downloader'):
+    """Parse the batch options shared by the downloader scripts"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('source', help="file with one URL per line, or '-' for stdin")
+    parser.add_argument('--jobs', '-j', type=int, default=DEFAULT_JOBS,
+                        help=f'downloads running at once (default: {DEFAULT_JOBS})')
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST,
+                        help=f'downloads running at once per host (default: {DEFAULT_PER_HOST})')
+    parser.add_argument('--archive', default=DEFAULT_ARCHIVE_PATH, metavar='PATH',
+                        help=f'index of downloaded videos (default: {DEFAULT_ARCHIVE_PATH})')
+    parser.add_argument('--no-archive', dest='archive', action='store_const', const=None,
+                        help='download everything, even videos already in the archive')
+    return parser.parse_args(argv)
+
+
+def main():
+    options = parse_batch_args(sys.argv[1:])
+    downloads_dir = os.path.join(os.path.expanduser('~'), 'Downloads')
+    os.makedirs(downloads_dir, exist_ok=True)
+    args = [
+        '-f', 'bestvideo[height<=1080]+bestaudio/best[height<=1080]/best',
+        '--merge-output-format', 'mp4',
+        '-o', os.path.join(downloads_dir, '%(title)s.%(ext)s'),
+        '--no-warnings',
+    ]
+    ok = run_batch(options.source, lambda url: args, options.jobs, options.per_host,
+                   options.archive)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
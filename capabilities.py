@@ -0,0 +1,180 @@
+"""
+Capabilities
+One registry for the external tools the scripts use (yt-dlp, ffmpeg,
+ffprobe, mpv, iina, brew). Each tool is resolved on PATH and its version
+probed once; the results are kept in memory and in a small JSON cache
+keyed by PATH and the binary's mtime, so later starts check a tool with
+one stat() instead of a PATH scan and a `--version` subprocess. Entries
+older than REFRESH_AFTER are served as they are and re-probed in a
+background thread.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from collections import namedtuple
+
+# Default location of the probe cache
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'noad', 'capabilities.json')
+
+# Seconds before an entry is re-probed in the background
+REFRESH_AFTER = 300
+
+# Arguments that make a tool print its version; tools not listed are only located
+VERSION_ARGS = {
+    'yt-dlp': ['--version'],
+    'ffmpeg': ['-version'],
+    'ffprobe': ['-version'],
+    'mpv': ['--version'],
+}
+
+# Seconds a version probe may take
+PROBE_TIMEOUT = 10
+
+Capability = namedtuple('Capability', 'name path version ok')
+
+
+def probe(name, previous=None):
+    """
+    Locate a tool and run its version probe; returns a cache entry.
+    The probe is skipped when previous has the same path and mtime.
+    """
+    entry = {'path': None, 'mtime': None, 'version': None, 'ok': False, 'checked': time.time()}
+    path = shutil.which(name)
+    if path is None:
+        return entry
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return entry
+    entry.update(path=path, mtime=mtime)
+
+    if previous and previous.get('path') == path and previous.get('mtime') == mtime:
+        entry.update(version=previous['version'], ok=previous['ok'])
+        return entry
+    if name not in VERSION_ARGS:
+        entry['ok'] = True
+        return entry
+    try:
+        result = subprocess.run([path] + VERSION_ARGS[name], capture_output=True, text=True,
+                                timeout=PROBE_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired):
+        return entry
+    if result.returncode == 0:
+        lines = result.stdout.strip().splitlines()
+        entry.update(version=lines[0] if lines else None, ok=True)
+    return entry
+
+
+class CapabilityRegistry:
+    """Thread-safe, disk-backed cache of probe results"""
+
+    def __init__(self, cache_path=DEFAULT_CACHE_PATH, refresh_after=REFRESH_AFTER):
+        self.cache_path = cache_path
+        self.refresh_after = refresh_after
+        self._entries = None  # name -> probe entry
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def _load(self):
+        """Read the cache, keeping entries whose binary is unchanged"""
+        if not self.cache_path:
+            return {}
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get('PATH') != os.environ.get('PATH', ''):
+            return {}
+
+        entries = {}
+        for name, entry in data.get('tools', {}).items():
+            # Missing tools are looked up again, so a fresh install is seen at once
+            if not entry.get('path'):
+                continue
+            try:
+                if os.stat(entry['path']).st_mtime != entry['mtime']:
+                    continue
+            except OSError:
+                continue
+            entries[name] = entry
+        return entries
+
+    def _save(self):
+        if not self.cache_path:
+            return
+        with self._lock:
+            data = {'PATH': os.environ.get('PATH', ''), 'tools': dict(self._entries)}
+        # Write to a temporary file and rename, so readers never see half a cache
+        tmp_path = f'{self.cache_path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            pass  # The cache is only an optimization
+
+    def get(self, name):
+        """Return the Capability of a tool, probing it only if nothing valid is cached"""
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load()
+            entry = self._entries.get(name)
+
+        if entry is None:
+            entry = probe(name)
+            with self._lock:
+                self._entries[name] = entry
+            self._save()
+        elif time.time() - entry['checked'] > self.refresh_after:
+            self.refresh(background=True)
+        return Capability(name, entry['path'], entry['version'], entry['ok'])
+
+    def refresh(self, background=False):
+        """Re-probe every known tool; version probes only run for changed binaries"""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+            names = list(self._entries or {})
+
+        def run():
+            try:
+                for name in names:
+                    with self._lock:
+                        previous = (self._entries or {}).get(name)
+                    entry = probe(name, previous)
+                    with self._lock:
+                        self._entries[name] = entry
+                self._save()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        if background:
+            threading.Thread(target=run, name='capabilities-refresh', daemon=True).start()
+        else:
+            run()
+
+
+_registry = CapabilityRegistry()
+
+
+def get(name):
+    """Capability of a tool from the shared registry"""
+    return _registry.get(name)
+
+
+def available(name):
+    """Check if a tool is installed and working"""
+    return _registry.get(name).ok
+
+
+def status(names):
+    """{name: available} for several tools, e.g. for a status endpoint"""
+    return {name: _registry.get(name).ok for name in names}
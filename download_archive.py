@@ -0,0 +1,162 @@
+"""
+Download Archive
+Remembers fetched videos in a small sqlite index keyed by extractor +
+video id and by content hash, so already downloaded videos are skipped
+before any network work is done.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse, parse_qs, urlunparse
+
+import ytdlp_engine
+
+# Default location of the archive index
+DEFAULT_ARCHIVE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'noad', 'archive.sqlite3')
+
+YOUTUBE_ID_RE = re.compile(r'^[0-9A-Za-z_-]{11}$')
+YOUTUBE_HOSTS = ('youtube.com', 'www.youtube.com', 'm.youtube.com', 'music.youtube.com')
+
+# Second-level labels of country domains like example.co.uk
+SECOND_LEVEL_LABELS = ('co', 'com', 'net', 'org', 'ac', 'gov', 'edu', 'ne', 'or', 'go')
+
+_extractors_by_label = {}  # domain label -> extractors whose URL pattern mentions it
+_extractors_lock = threading.Lock()
+
+
+def domain_label(host):
+    """The label naming the site: 'vimeo' for player.vimeo.com, 'bbc' for www.bbc.co.uk"""
+    labels = host.split('.')
+    if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in SECOND_LEVEL_LABELS:
+        return labels[-3]
+    return labels[-2] if len(labels) >= 2 else host
+
+
+def candidate_extractors(host):
+    """
+    yt-dlp extractors that can match URLs of host: those whose URL pattern
+    spells out the site's label. Checking every extractor costs ~5 ms per
+    URL; the candidates of a site are found once and are usually a handful.
+    """
+    label = domain_label(host)
+    with _extractors_lock:
+        candidates = _extractors_by_label.get(label)
+        if candidates is None:
+            candidates = _extractors_by_label[label] = [
+                ie for ie in ytdlp_engine.yt_dlp.extractor.gen_extractor_classes()
+                if ie.ie_key() != 'Generic'
+                and isinstance(getattr(ie, '_VALID_URL', None), str)
+                and label in ie._VALID_URL.lower()
+            ]
+    return candidates
+
+
+def video_key(url):
+    """Return (extractor, video_id) for a URL without touching the network"""
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or '').lower()
+
+    # Fast path for the common YouTube URL shapes
+    if host in YOUTUBE_HOSTS:
+        video_id = parse_qs(parsed.query).get('v', [''])[0]
+        if not video_id:
+            parts = parsed.path.strip('/').split('/')
+            if len(parts) >= 2 and parts[0] in ('shorts', 'embed', 'live', 'v'):
+                video_id = parts[1]
+        if YOUTUBE_ID_RE.match(video_id):
+            return 'youtube', video_id
+    elif host == 'youtu.be':
+        video_id = parsed.path.strip('/').split('/')[0]
+        if YOUTUBE_ID_RE.match(video_id):
+            return 'youtube', video_id
+
+    # Let yt-dlp's extractors match the URL offline when it is installed
+    if ytdlp_engine.is_available() and host:
+        for ie in candidate_extractors(host):
+            if not ie.suitable(url):
+                continue
+            video_id = ie.get_temp_id(url)
+            if video_id:
+                return ie.ie_key().lower(), str(video_id)
+            break
+
+    # Anything else is identified by its normalized URL
+    normalized = urlunparse((parsed.scheme.lower(), host, parsed.path, '', parsed.query, ''))
+    return 'generic', normalized
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Hash a file in chunks so large videos are not read into memory"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DownloadArchive:
+    """sqlite index of downloaded videos, safe to share between threads"""
+
+    def __init__(self, path=DEFAULT_ARCHIVE_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS videos ('
+            'extractor TEXT NOT NULL, video_id TEXT NOT NULL, url TEXT, path TEXT, '
+            'sha256 TEXT, size INTEGER, downloaded_at REAL, '
+            'PRIMARY KEY (extractor, video_id))'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS videos_sha256 ON videos (sha256)')
+        self._db.commit()
+
+    def lookup(self, url):
+        """Return the archived entry for url as a dict, or None"""
+        extractor, video_id = video_key(url)
+        with self._lock:
+            row = self._db.execute(
+                'SELECT url, path, sha256, size FROM videos WHERE extractor = ? AND video_id = ?',
+                (extractor, video_id)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'extractor': extractor, 'id': video_id, 'url': row[0],
+                'path': row[1], 'sha256': row[2], 'size': row[3]}
+
+    def contains(self, url):
+        """Check if url was already downloaded"""
+        return self.lookup(url) is not None
+
+    def record(self, url, path):
+        """Record a finished download and return the path to keep
+
+        If a file with the same content is already archived, the new copy
+        is deleted and the existing path is returned instead.
+        """
+        extractor, video_id = video_key(url)
+        sha256 = file_sha256(path)
+        size = os.path.getsize(path)
+
+        with self._lock:
+            row = self._db.execute(
+                'SELECT path FROM videos WHERE sha256 = ? AND path != ?', (sha256, path)
+            ).fetchone()
+            if row is not None and os.path.exists(row[0]):
+                os.remove(path)
+                path = row[0]
+            self._db.execute(
+                'INSERT OR REPLACE INTO videos VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (extractor, video_id, url, path, sha256, size, time.time())
+            )
+            self._db.commit()
+        return path
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -1,96 +1,124 @@
+import argparse
 import os
-import csv
+import sys
 import google.oauth2.credentials
 import google_auth_oauthlib.flow
 import googleapiclient.discovery
 import googleapiclient.errors
 
-def get_authenticated_service():
+import youtube_comments
+
+def get_credentials():
     # This OAuth 2.0 access scope allows for read-only access to the authenticated
     # user's account, but not other types of account access.
     SCOPES = ['https://www.googleapis.com/auth/youtube.force-ssl']
-    API_SERVICE_NAME = 'youtube'
-    API_VERSION = 'v3'
     CLIENT_SECRETS_FILE = 'client_secret.json'
     
-    # Get credentials and create an API client
+    # Get credentials once; every worker thread builds its own client from them
     flow = google_auth_oauthlib.flow.InstalledAppFlow.from_client_secrets_file(
         CLIENT_SECRETS_FILE, SCOPES)
-    credentials = flow.run_console()
+    return flow.run_console()
+
+def build_service(credentials):
+    # Create an API client (not thread-safe, so one per thread)
+    API_SERVICE_NAME = 'youtube'
+    API_VERSION = 'v3'
     return googleapiclient.discovery.build(
         API_SERVICE_NAME, API_VERSION, credentials=credentials)
 
-def get_video_comments(service, video_id, output_file):
-    # Create a CSV file to store the comments
-    with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-        comment_writer = csv.writer(csvfile)
-        comment_writer.writerow(['Comment ID', 'Author', 'Published At', 'Updated At', 'Like Count', 'Text'])
-        
-        # Get comments for the video
-        request = service.commentThreads().list(
-            part="snippet,replies",
-            videoId=video_id,
-            maxResults=100
-        )
-        
-        count = 0
-        while request:
-            response = request.execute()
-            
-            for item in response['items']:
-                # Process top-level comments
-                comment = item['snippet']['topLevelComment']['snippet']
-                comment_writer.writerow([
-                    item['id'],
-                    comment['authorDisplayName'],
-                    comment['publishedAt'],
-                    comment['updatedAt'],
-                    comment['likeCount'],
-                    comment['textDisplay']
-                ])
-                count += 1
-                
-                # Process replies if any
-                if 'replies' in item:
-                    for reply in item['replies']['comments']:
-                        reply_snippet = reply['snippet']
-                        comment_writer.writerow([
-                            reply['id'],
-                            reply_snippet['authorDisplayName'],
-                            reply_snippet['publishedAt'],
-                            reply_snippet['updatedAt'],
-                            reply_snippet['likeCount'],
-                            reply_snippet['textDisplay']
-                        ])
-                        count += 1
-            
-            # Check if there are more comments to retrieve
-            if 'nextPageToken' in response:
-                request = service.commentThreads().list(
-                    part="snippet,replies",
-                    videoId=video_id,
-                    pageToken=response['nextPageToken'],
-                    maxResults=100
-                )
-            else:
-                break
+def get_authenticated_service():
+    return build_service(get_credentials())
+
+def get_video_comments(credentials, video_id, output_file, output_format=None, sync=False):
+    # Stream every comment, including full reply lists, into the output file
+    factory = lambda: build_service(credentials)
+    if sync:
+        # Only fetch the threads published since the last export
+        count = youtube_comments.sync_video(factory, video_id, output_file,
+                                            output_format=output_format)
+        print(f"Added {count} new comments to {output_file}")
+        return
+    count = youtube_comments.export_video(factory, video_id, output_file,
+                                          output_format=output_format)
     
     print(f"Successfully exported {count} comments to {output_file}")
 
+def read_video_ids(path):
+    # One video ID per line; blank lines and # comments are ignored
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+def export_batch(credentials, options):
+    # Export many videos (or a whole channel) under one shared API budget
+    quota = youtube_comments.QuotaLimiter(options.quota, options.rate)
+    factory = lambda: build_service(credentials)
+    
+    video_ids = list(options.video_ids)
+    if options.ids_file:
+        video_ids += read_video_ids(options.ids_file)
+    if options.channel:
+        services = youtube_comments.ServicePool(factory, quota)
+        video_ids += youtube_comments.channel_video_ids(services, options.channel)
+        print(f"Found {len(video_ids)} videos on channel {options.channel}")
+    video_ids = list(dict.fromkeys(video_ids))
+    
+    counts, errors = youtube_comments.export_many(
+        factory, video_ids, options.output_dir, options.jobs, quota,
+        options.merge, resume=not options.restart, output_format=options.format,
+        sync=options.sync)
+    
+    verb, noun = ('Added', 'new comments') if options.sync else ('Exported', 'comments')
+    print(f"\n{verb} {sum(counts.values())} {noun} from {len(counts)} videos "
+          f"using {quota.used} API units")
+    if options.merge and counts:
+        print(f"Merged output: {options.merge}")
+    for video_id, error in errors.items():
+        print(f"  ✗ {video_id}: {error}")
+    return not errors
+
 def main():
     # Disable OAuthlib's HTTPS verification when running locally.
     # *DO NOT* leave this option enabled in production.
     os.environ["OAUTHLIB_INSECURE_TRANSPORT"] = "1"
     
-    # Get the service object
-    service = get_authenticated_service()
+    parser = argparse.ArgumentParser(description='Export YouTube comments to CSV, JSONL, SQLite, Parquet or Arrow')
+    parser.add_argument('video_ids', nargs='*', help='video IDs (prompted for if none are given)')
+    parser.add_argument('--ids-file', help='file with one video ID per line')
+    parser.add_argument('--channel', help='export every upload of this channel ID')
+    parser.add_argument('--format', default='csv', choices=list(youtube_comments.WRITERS),
+                        help='output format (default: csv; parquet and arrow need pyarrow)')
+    parser.add_argument('--output-dir', default='.', help='directory for <id>_comments.<ext> files')
+    parser.add_argument('--merge', metavar='FILE', help='also write all comments to one file')
+    parser.add_argument('--jobs', '-j', type=int, default=youtube_comments.DEFAULT_JOBS,
+                        help=f'videos exported at once (default: {youtube_comments.DEFAULT_JOBS})')
+    parser.add_argument('--quota', type=int, default=youtube_comments.DEFAULT_QUOTA,
+                        help=f'API units this run may use (default: {youtube_comments.DEFAULT_QUOTA})')
+    parser.add_argument('--rate', type=float, default=youtube_comments.DEFAULT_RATE,
+                        help=f'API requests per second (default: {youtube_comments.DEFAULT_RATE:g})')
+    parser.add_argument('--restart', action='store_true',
+                        help='ignore checkpoints and export from the first page')
+    parser.add_argument('--sync', action='store_true',
+                        help='only add comments newer than the last export')
+    options = parser.parse_args()
+    try:
+        youtube_comments.get_writer(options.format)
+    except RuntimeError as e:
+        parser.error(str(e))
+    if options.sync and options.restart:
+        parser.error('--sync and --restart cannot be combined')
+    
+    # Get the credentials (API clients are built per thread from them)
+    credentials = get_credentials()
+    
+    if options.video_ids or options.ids_file or options.channel:
+        sys.exit(0 if export_batch(credentials, options) else 1)
     
     # Prompt for the video ID
     video_id = input("Enter YouTube video ID (the part after v= in the URL): ")
-    output_file = f"{video_id}_comments.csv"
+    output_file = f"{video_id}_comments{youtube_comments.WRITERS[options.format][1]}"
     
     # Get comments
-    get_video_comments(service, video_id, output_file)
+    get_video_comments(credentials, video_id, output_file, options.format, options.sync)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
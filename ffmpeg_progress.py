@@ -0,0 +1,168 @@
+"""
+FFmpeg Progress
+Runs ffmpeg with -progress pipe:1 and turns the key=value stream into
+live metrics (fps, speed, bitrate, out_time, ETA) for a callback, while
+keeping only the last lines of stderr for error reports. Each job can
+append its metrics to a JSONL log for capacity planning.
+"""
+
+import json
+import os
+import subprocess
+import threading
+import time
+from collections import deque, namedtuple
+
+# Lines of stderr kept for error reporting
+STDERR_TAIL = 40
+
+FFmpegResult = namedtuple('FFmpegResult', 'returncode metrics stderr_tail seconds')
+
+
+def _number(value, suffix=''):
+    """Parse '1234.5kbits/s' / '1.5x' style values; None for N/A"""
+    if value is None:
+        return None
+    value = value.strip()
+    if suffix and value.endswith(suffix):
+        value = value[:-len(suffix)]
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def parse_block(fields, duration, elapsed):
+    """Turn one -progress block into a metrics dict"""
+    out_time_us = _number(fields.get('out_time_us') or fields.get('out_time_ms'))
+    out_time = out_time_us / 1e6 if out_time_us is not None and out_time_us >= 0 else None
+    speed = _number(fields.get('speed'), 'x')
+    if speed is None and out_time and elapsed > 0:
+        speed = out_time / elapsed
+
+    metrics = {
+        'frame': int(_number(fields.get('frame')) or 0),
+        'fps': _number(fields.get('fps')),
+        'bitrate_kbps': _number(fields.get('bitrate'), 'kbits/s'),
+        'total_size': int(_number(fields.get('total_size')) or 0),
+        'out_time': out_time,
+        'speed': speed,
+        'elapsed': elapsed,
+        'percent': None,
+        'eta': None,
+        'progress': fields.get('progress'),
+    }
+    if duration and out_time is not None:
+        metrics['percent'] = min(100.0, out_time / duration * 100)
+        if speed:
+            metrics['eta'] = max(0.0, (duration - out_time) / speed)
+    return metrics
+
+
+class JobLog:
+    """Append-only JSONL log of one job's events"""
+
+    def __init__(self, path, job):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.job = job
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def write(self, event, **fields):
+        record = {'time': time.time(), 'job': self.job, 'event': event}
+        record.update(fields)
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def _read_tail(stream, tail):
+    for line in stream:
+        tail.append(line.decode('utf-8', errors='replace').rstrip())
+
+
+def run(command, duration=None, callback=None, log_path=None, job=None,
+        tail_lines=STDERR_TAIL, **popen_kwargs):
+    """
+    Run an ffmpeg command and report progress while it works.
+
+    command starts with 'ffmpeg'; -progress pipe:1 -nostats are added.
+    callback(metrics) is called for every progress update (about twice a
+    second); duration (seconds of input) enables percent and ETA. Returns
+    an FFmpegResult with the last metrics and the tail of stderr.
+    Raises FileNotFoundError if ffmpeg is not installed.
+    """
+    command = [command[0], '-progress', 'pipe:1', '-nostats'] + list(command[1:])
+    log = JobLog(log_path, job or os.path.basename(command[-1])) if log_path else None
+    if log is not None:
+        log.write('start', command=command, duration=duration)
+
+    start = time.monotonic()
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               **popen_kwargs)
+    tail = deque(maxlen=tail_lines)
+    reader = threading.Thread(target=_read_tail, args=(process.stderr, tail), daemon=True)
+    reader.start()
+
+    metrics = parse_block({}, duration, 0.0)
+    fields = {}
+    try:
+        for raw in process.stdout:
+            key, _, value = raw.decode('utf-8', errors='replace').strip().partition('=')
+            if not key:
+                continue
+            fields[key] = value
+            if key != 'progress':
+                continue
+            # 'progress' closes a block
+            metrics = parse_block(fields, duration, time.monotonic() - start)
+            fields = {}
+            if callback is not None:
+                callback(metrics)
+            if log is not None:
+                log.write('progress', **metrics)
+        process.wait()
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        reader.join()
+        process.stdout.close()
+        process.stderr.close()
+
+    seconds = time.monotonic() - start
+    if log is not None:
+        log.write('end', returncode=process.returncode, seconds=seconds,
+                  error=tail[-1] if process.returncode != 0 and tail else None, **{
+                      key: metrics[key] for key in ('frame', 'fps', 'speed', 'bitrate_kbps',
+                                                    'total_size', 'out_time')})
+        log.close()
+    return FFmpegResult(process.returncode, metrics, list(tail), seconds)
+
+
+def format_progress(metrics):
+    """One status line: percent, out_time, fps, speed, bitrate and ETA"""
+    parts = []
+    if metrics['percent'] is not None:
+        parts.append(f"{metrics['percent']:5.1f}%")
+    if metrics['out_time'] is not None:
+        parts.append(f"{metrics['out_time']:.0f}s")
+    if metrics['fps'] is not None:
+        parts.append(f"{metrics['fps']:.1f} fps")
+    if metrics['speed'] is not None:
+        parts.append(f"{metrics['speed']:.2f}x")
+    if metrics['bitrate_kbps'] is not None:
+        parts.append(f"{metrics['bitrate_kbps']:.0f} kb/s")
+    if metrics['eta'] is not None:
+        parts.append(f"ETA {metrics['eta']:.0f}s")
+    return '  '.join(parts)
+
+
+def print_progress(metrics):
+    """Callback that keeps one status line updated in the terminal"""
+    print(f"\r  {format_progress(metrics)}   ", end='', flush=True)
+    if metrics['progress'] == 'end':
+        print()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Parallel HLS Downloader
+Fetches the segments of an m3u8 playlist concurrently over the shared
+keep-alive connection pool and streams them, in order, into ffmpeg for
+a lossless remux (-c copy). Replaces the one-segment-at-a-time ffmpeg fetch.
+
+Usage: python3 hls_download.py "https://.../index.m3u8" output.mp4
+       python3 hls_download.py --benchmark
+"""
+
+import http.client
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+import http_client
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+
+# Segments downloaded at once
+DEFAULT_WORKERS = 8
+
+# Attempts per segment before giving up
+DEFAULT_RETRIES = 4
+
+
+# NAME=value pairs of a tag's attribute list; quoted values may contain commas
+ATTRIBUTE_RE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+class HLSError(Exception):
+    """Raised when a playlist cannot be downloaded natively"""
+
+
+def fetch(client, url, headers):
+    """GET url and return (final_url, body bytes)"""
+    with client.get(url, headers) as response:
+        body = response.read()
+        if response.status != 200:
+            raise HLSError(f'HTTP {response.status} for {url}')
+        return response.geturl(), body
+
+
+def parse_attributes(line):
+    """Parse the attribute list of a tag line into a dict, unquoting values"""
+    attributes = {}
+    for name, value in ATTRIBUTE_RE.findall(line.partition(':')[2]):
+        if value.startswith('"'):
+            value = value[1:-1]
+        attributes[name] = value
+    return attributes
+
+
+def parse_playlist(text, base_url):
+    """Parse an m3u8 playlist into variants (master) or segments (media)
+
+    Variants are (bandwidth, url, audio group id or None); 'audio' maps
+    each group id to the URIs of its renditions that are separate playlists.
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if not lines or not lines[0].startswith('#EXTM3U'):
+        raise HLSError('Not an m3u8 playlist')
+
+    playlist = {'variants': [], 'segments': [], 'audio': {}, 'init': None, 'encrypted': False}
+    stream = None
+    for line in lines[1:]:
+        if line.startswith('#EXT-X-STREAM-INF'):
+            stream = parse_attributes(line)
+        elif line.startswith('#EXT-X-MEDIA:'):
+            attributes = parse_attributes(line)
+            if attributes.get('TYPE') == 'AUDIO':
+                uris = playlist['audio'].setdefault(attributes.get('GROUP-ID'), [])
+                # Without a URI the rendition is muxed into the variant itself
+                if attributes.get('URI'):
+                    uris.append(urljoin(base_url, attributes['URI']))
+        elif line.startswith('#EXT-X-KEY'):
+            if parse_attributes(line).get('METHOD') != 'NONE':
+                playlist['encrypted'] = True
+        elif line.startswith('#EXT-X-MAP'):
+            attributes = parse_attributes(line)
+            if 'BYTERANGE' in attributes:
+                raise HLSError('Byte-range playlists are not supported')
+            playlist['init'] = urljoin(base_url, attributes['URI'])
+        elif line.startswith('#EXT-X-BYTERANGE'):
+            raise HLSError('Byte-range playlists are not supported')
+        elif not line.startswith('#'):
+            if stream is not None:
+                bandwidth = int(stream.get('BANDWIDTH') or 0)
+                playlist['variants'].append((bandwidth, urljoin(base_url, line), stream.get('AUDIO')))
+                stream = None
+            else:
+                playlist['segments'].append(urljoin(base_url, line))
+    return playlist
+
+
+def fetch_with_retry(client, url, headers, retries):
+    """Download one segment, retrying with backoff"""
+    for attempt in range(retries):
+        try:
+            return fetch(client, url, headers)[1]
+        except (HLSError, http.client.HTTPException, OSError):
+            if attempt == retries - 1:
+                raise
+            time.sleep(0.5 * 2 ** attempt)
+
+
+def resolve_media_playlist(client, url, headers):
+    """Follow a master playlist to its highest-bandwidth variant"""
+    for _ in range(3):
+        final_url, body = fetch(client, url, headers)
+        playlist = parse_playlist(body.decode('utf-8', errors='ignore'), final_url)
+        if not playlist['variants']:
+            return playlist
+        _, url, audio_group = max(playlist['variants'], key=lambda variant: variant[0])
+        # The segments are remuxed as one stream, so separate audio would be lost
+        if playlist['audio'].get(audio_group):
+            raise HLSError('Variant has a separate audio playlist; use ffmpeg instead')
+    raise HLSError('Nested master playlists')
+
+
+def download_hls(m3u8_url, output_path, referer=None, user_agent=DEFAULT_USER_AGENT,
+                 workers=DEFAULT_WORKERS, retries=DEFAULT_RETRIES, verify=True):
+    """Download an HLS stream to output_path without re-encoding"""
+    headers = {'User-Agent': user_agent, 'Accept': '*/*'}
+    if referer:
+        headers['Referer'] = referer
+
+    client = http_client.shared_client(verify=verify)
+    playlist = resolve_media_playlist(client, m3u8_url, headers)
+    if playlist['encrypted']:
+        raise HLSError('Encrypted playlist; use ffmpeg instead')
+    segments = playlist['segments']
+    if not segments:
+        raise HLSError('Playlist has no segments')
+    if playlist['init']:
+        segments = [playlist['init']] + segments
+
+    # .ts output takes the raw stream; anything else is remuxed by ffmpeg
+    if output_path.endswith('.ts'):
+        ffmpeg = None
+        sink = open(output_path, 'wb')
+    else:
+        ffmpeg = subprocess.Popen([
+            'ffmpeg', '-loglevel', 'error',
+            '-i', 'pipe:0',
+            '-c', 'copy',
+            '-bsf:a', 'aac_adtstoasc',
+            '-movflags', '+faststart',
+            '-y', output_path
+        ], stdin=subprocess.PIPE)
+        sink = ffmpeg.stdin
+
+    total_bytes = 0
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = {}
+    try:
+        # A sliding window keeps at most 2x workers segments in memory
+        window = workers * 2
+        for i, url in enumerate(segments[:window]):
+            futures[i] = executor.submit(fetch_with_retry, client, url, headers, retries)
+        for i in range(len(segments)):
+            data = futures.pop(i).result()
+            nxt = i + window
+            if nxt < len(segments):
+                futures[nxt] = executor.submit(fetch_with_retry, client, segments[nxt], headers, retries)
+            sink.write(data)
+            total_bytes += len(data)
+            print(f"\r  segments {i + 1}/{len(segments)}  {total_bytes / 1024 ** 2:.1f} MB",
+                  end='', flush=True)
+        print()
+    finally:
+        for future in futures.values():
+            future.cancel()
+        executor.shutdown(wait=True)
+        sink.close()
+        if ffmpeg is not None:
+            ffmpeg.wait()
+
+    if ffmpeg is not None and ffmpeg.returncode != 0:
+        raise HLSError(f'ffmpeg remux failed with exit code {ffmpeg.returncode}')
+    return total_bytes
+
+
+def _serve_directory(directory, latency):
+    """Serve directory over HTTP/1.1 with an artificial per-request latency"""
+    from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+    class SlowHandler(SimpleHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=directory, **kwargs)
+
+        def do_GET(self):
+            time.sleep(latency)
+            super().do_GET()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('localhost', 0), SlowHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_benchmark(duration=120, segment_seconds=2, latency=0.15, workers=DEFAULT_WORKERS):
+    """Compare sequential ffmpeg against the parallel fetcher on a local server"""
+    if not shutil.which('ffmpeg'):
+        print("Error: ffmpeg is required for the benchmark")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        hls_dir = os.path.join(tmp, 'hls')
+        os.makedirs(hls_dir)
+        print(f"Generating a {duration}s synthetic HLS stream...")
+        subprocess.run([
+            'ffmpeg', '-loglevel', 'error',
+            '-f', 'lavfi', '-i', f'testsrc=size=1280x720:rate=30:duration={duration}',
+            '-f', 'lavfi', '-i', f'sine=frequency=440:duration={duration}',
+            '-c:v', 'libx264', '-preset', 'ultrafast', '-g', str(30 * segment_seconds),
+            '-c:a', 'aac',
+            '-f', 'hls', '-hls_time', str(segment_seconds), '-hls_list_size', '0',
+            os.path.join(hls_dir, 'index.m3u8')
+        ], check=True)
+
+        server = _serve_directory(hls_dir, latency)
+        url = f'http://localhost:{server.server_address[1]}/index.m3u8'
+        segments = len([f for f in os.listdir(hls_dir) if f.endswith('.ts')])
+        print(f"Serving {segments} segments with {latency * 1000:.0f} ms latency per request\n")
+
+        start = time.perf_counter()
+        subprocess.run(['ffmpeg', '-loglevel', 'error', '-i', url, '-c', 'copy',
+                        '-bsf:a', 'aac_adtstoasc', '-y', os.path.join(tmp, 'ffmpeg.mp4')], check=True)
+        ffmpeg_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        download_hls(url, os.path.join(tmp, 'parallel.mp4'), workers=workers)
+        parallel_time = time.perf_counter() - start
+
+        server.shutdown()
+        print(f"\n{'method':<28}{'seconds':>10}{'speedup':>10}")
+        print(f"{'ffmpeg (sequential)':<28}{ffmpeg_time:>10.2f}{1:>10.1f}x")
+        print(f"{f'parallel ({workers} workers)':<28}{parallel_time:>10.2f}"
+              f"{ffmpeg_time / parallel_time:>10.1f}x")
+        print(f"\nOutput sizes: ffmpeg {os.path.getsize(os.path.join(tmp, 'ffmpeg.mp4'))} bytes, "
+              f"parallel {os.path.getsize(os.path.join(tmp, 'parallel.mp4'))} bytes")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        run_benchmark()
+        return
+
+    if len(sys.argv) < 3:
+        print("Usage: python3 hls_download.py URL output.mp4 [referer]")
+        print("       python3 hls_download.py --benchmark")
+        sys.exit(1)
+
+    referer = sys.argv[3] if len(sys.argv) > 3 else None
+    try:
+        size = download_hls(sys.argv[1], sys.argv[2], referer=referer)
+        print(f"✓ Saved {size / 1024 ** 2:.1f} MB to {sys.argv[2]}")
+    except (HLSError, http.client.HTTPException, OSError) as e:
+        print(f"✗ Download failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Pooled HTTP Client
+One shared client for the scrapers: keep-alive connections pooled per
+host, a cookie jar that persists across requests, gzip/deflate/br
+decompression and configurable timeouts. Batch scraping reuses the same
+TCP/TLS sessions instead of opening a new connection per page.
+"""
+
+import http.client
+import http.cookiejar
+import ssl
+import threading
+import urllib.request
+import zlib
+from urllib.parse import urljoin, urlparse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_TIMEOUT = 20
+
+# Idle connections kept per host
+MAX_IDLE_PER_HOST = 8
+
+# Raw bytes read from the socket per chunk
+READ_CHUNK = 64 * 1024
+
+ACCEPT_ENCODING = 'gzip, deflate, br' if brotli is not None else 'gzip, deflate'
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+# Errors that mean a reused keep-alive connection was closed by the server
+STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                ConnectionResetError, BrokenPipeError)
+
+
+class _Decoder:
+    """Incremental decoder for one Content-Encoding"""
+
+    def __init__(self, encoding):
+        encoding = (encoding or 'identity').strip().lower()
+        self._raw_deflate = False
+        if encoding in ('gzip', 'x-gzip'):
+            self._obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == 'deflate':
+            self._obj = zlib.decompressobj()
+        elif encoding == 'br' and brotli is not None:
+            self._obj = brotli.Decompressor()
+        else:
+            self._obj = None
+        self.encoding = encoding
+
+    def decode(self, data):
+        if self._obj is None:
+            return data
+        if self.encoding == 'br':
+            return self._obj.process(data)
+        try:
+            return self._obj.decompress(data)
+        except zlib.error:
+            # Some servers send raw deflate without the zlib header
+            if self.encoding == 'deflate' and not self._raw_deflate:
+                self._raw_deflate = True
+                self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+                return self._obj.decompress(data)
+            raise
+
+    def flush(self):
+        if self._obj is None or self.encoding == 'br':
+            return b''
+        return self._obj.flush()
+
+
+class Response:
+    """Streaming response; the connection returns to the pool once fully read"""
+
+    def __init__(self, client, key, conn, raw, url):
+        self._client = client
+        self._key = key
+        self._conn = conn
+        self._raw = raw
+        self._decoder = _Decoder(raw.getheader('Content-Encoding'))
+        self._done = False
+        self.url = url
+        self.status = raw.status
+        self.reason = raw.reason
+        self.headers = raw.msg
+
+    def geturl(self):
+        return self.url
+
+    def info(self):
+        return self.headers
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
+
+    def read(self, amt=None):
+        """Read decompressed bytes; returns b'' only at the end of the body"""
+        if self._done:
+            return b''
+        if amt is None or amt < 0:
+            parts = []
+            while True:
+                chunk = self.read(READ_CHUNK)
+                if not chunk:
+                    return b''.join(parts)
+                parts.append(chunk)
+
+        while True:
+            data = self._raw.read(amt)
+            if not data:
+                tail = self._decoder.flush()
+                self._finish(reusable=True)
+                return tail
+            data = self._decoder.decode(data)
+            if data:
+                return data
+
+    def _finish(self, reusable):
+        if self._done:
+            return
+        self._done = True
+        keep = reusable and not self._raw.will_close
+        self._client._release(self._key, self._conn, keep)
+
+    def close(self):
+        """Stop reading; an unread body means the connection cannot be reused"""
+        if not self._done:
+            self._raw.close()
+            self._finish(reusable=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _CookieResponse:
+    """Adapter that lets http.cookiejar read cookies from a raw response"""
+
+    def __init__(self, headers):
+        self._headers = headers
+
+    def info(self):
+        return self._headers
+
+
+class HttpClient:
+    """Thread-safe HTTP client with keep-alive pooling and a cookie jar"""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, verify=True, max_redirects=5,
+                 max_idle_per_host=MAX_IDLE_PER_HOST, headers=None):
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self.max_idle_per_host = max_idle_per_host
+        self.headers = dict(headers or {})
+        self.cookies = http.cookiejar.CookieJar()
+        self._idle = {}  # (scheme, host, port) -> [connections]
+        self._lock = threading.Lock()
+        self._context = ssl.create_default_context()
+        if not verify:
+            self._context.check_hostname = False
+            self._context.verify_mode = ssl.CERT_NONE
+
+    def _acquire(self, key):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        scheme, host, port = key
+        if scheme == 'https':
+            conn = http.client.HTTPSConnection(host, port, timeout=self.timeout, context=self._context)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=self.timeout)
+        return conn, False
+
+    def _release(self, key, conn, keep):
+        if keep:
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.max_idle_per_host:
+                    idle.append(conn)
+                    return
+        conn.close()
+
+    def _send(self, method, url, headers, body):
+        parsed = urlparse(url)
+        scheme = parsed.scheme.lower()
+        if scheme not in ('http', 'https'):
+            raise ValueError(f'Unsupported URL scheme: {url}')
+        port = parsed.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parsed.hostname, port)
+        path = parsed.path or '/'
+        if parsed.query:
+            path += '?' + parsed.query
+
+        request_headers = {'Accept-Encoding': ACCEPT_ENCODING, 'Connection': 'keep-alive'}
+        request_headers.update(self.headers)
+        request_headers.update(headers or {})
+
+        # Let the cookie jar pick the cookies for this host and path
+        cookie_request = urllib.request.Request(url, headers=request_headers, method=method)
+        self.cookies.add_cookie_header(cookie_request)
+        request_headers.update(cookie_request.unredirected_hdrs)
+
+        while True:
+            conn, reused = self._acquire(key)
+            try:
+                conn.request(method, path, body=body, headers=request_headers)
+                raw = conn.getresponse()
+                break
+            except STALE_ERRORS:
+                conn.close()
+                # A pooled connection may have been closed by the server; retry on a new one
+                if not reused:
+                    raise
+            except BaseException:
+                conn.close()
+                raise
+
+        self.cookies.extract_cookies(_CookieResponse(raw.msg), cookie_request)
+        return Response(self, key, conn, raw, url)
+
+    def request(self, method, url, headers=None, body=None):
+        """Send a request, following redirects; returns a streaming Response"""
+        for _ in range(self.max_redirects + 1):
+            response = self._send(method, url, headers, body)
+            location = response.getheader('Location')
+            if response.status not in REDIRECT_CODES or not location:
+                return response
+            # Drain the (small) redirect body so the connection can be reused
+            response.read()
+            url = urljoin(url, location)
+            if response.status == 303 or (response.status in (301, 302) and method == 'POST'):
+                method, body = 'GET', None
+        raise http.client.HTTPException(f'Too many redirects for {url}')
+
+    def get(self, url, headers=None):
+        return self.request('GET', url, headers=headers)
+
+    def close(self):
+        """Close all idle connections"""
+        with self._lock:
+            for idle in self._idle.values():
+                for conn in idle:
+                    conn.close()
+            self._idle.clear()
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared_client(verify=True):
+    """Process-wide client, so every scraper call reuses the same pool and cookies"""
+    with _shared_lock:
+        client = _shared.get(verify)
+        if client is None:
+            client = _shared[verify] = HttpClient(verify=verify)
+        return client
@@ -1,15 +1,311 @@
+import argparse
+import glob
+import json
+import shutil
 import subprocess
 import sys
 import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
-def convert_to_iphone_format(input_file, output_file=None):
+import ffmpeg_progress
+
+# File types picked up when a directory is given in batch mode
+VIDEO_EXTENSIONS = ('.mp4', '.m4v', '.mov', '.mkv', '.webm', '.avi')
+
+# x264 stops scaling well past this many threads per encode, so extra
+# cores are better spent on running more files at once
+THREADS_PER_JOB = 4
+
+# What iPhones play without conversion: H.264 up to level 4.0 in 8-bit
+# 4:2:0, with AAC audio
+IPHONE_VIDEO_PROFILES = ('Constrained Baseline', 'Baseline', 'Main', 'High')
+IPHONE_MAX_LEVEL = 40
+IPHONE_PIX_FMTS = ('yuv420p', 'yuvj420p')
+IPHONE_AUDIO_PROFILES = ('LC', 'HE-AAC', 'HE-AACv2')
+
+# Named encoder settings: x264 preset and CRF (lower CRF = better quality).
+# Pick one with --profile; profile_benchmark.py measures them on this CPU.
+PROFILES = {
+    'draft': {'preset': 'veryfast', 'crf': 24},
+    'fast': {'preset': 'fast', 'crf': 22},
+    'balanced': {'preset': 'medium', 'crf': 23},
+    'quality': {'preset': 'slow', 'crf': 20},
+}
+DEFAULT_PROFILE = 'balanced'
+
+# Segmented mode: allowed difference from the source duration, and
+# between the audio and video start offsets, in seconds
+DURATION_TOLERANCE = 0.5
+SYNC_TOLERANCE = 0.1
+
+
+def available_cores():
+    """Number of CPU cores this process may run on"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def plan_jobs(file_count, cores=None, jobs=None, threads=None):
+    """Split the cores into (parallel jobs, ffmpeg threads per job)
+
+    jobs x threads never exceeds the core count, so the machine stays
+    busy without the encoders fighting over the same cores.
+    """
+    cores = cores or available_cores()
+    if jobs is None:
+        per_job = threads or THREADS_PER_JOB
+        jobs = max(1, cores // per_job)
+    jobs = max(1, min(jobs, file_count, cores))
+    if threads is None:
+        threads = max(1, cores // jobs)
+    return jobs, threads
+
+
+def default_output_file(input_file, output_dir=None):
+    """input.mp4 -> input_iphone.mp4, next to the input or in output_dir"""
+    input_path = Path(input_file)
+    parent = Path(output_dir) if output_dir else input_path.parent
+    # Containers that cannot hold H.264/AAC with faststart become .mp4
+    suffix = input_path.suffix if input_path.suffix.lower() in ('.mp4', '.m4v', '.mov') else '.mp4'
+    return str(parent / f"{input_path.stem}_iphone{suffix}")
+
+
+def batch_output_files(inputs, output_dir=None):
+    """
+    Output path for each input, unique within the batch. Inputs that would
+    share one (x.mkv and x.mp4, or a/x.mp4 and b/x.mp4 with output_dir) get
+    a numbered name (x-2_iphone.mp4) instead of overwriting each other.
+    """
+    defaults = [default_output_file(path, output_dir) for path in inputs]
+    key = lambda path: os.path.normcase(os.path.abspath(path))
+    taken = {key(path) for path in defaults}
+    used = set()
+    outputs = []
+    for default in defaults:
+        output = default
+        if key(output) in used:
+            path = Path(default)
+            stem = path.stem[:-len('_iphone')]
+            number = 2
+            while key(output) in taken:
+                output = str(path.with_name(f"{stem}-{number}_iphone{path.suffix}"))
+                number += 1
+            taken.add(key(output))
+        used.add(key(output))
+        outputs.append(output)
+    return outputs
+
+
+def probe_streams(input_file):
+    """Return the streams ffprobe reports for input_file, or None if it cannot probe"""
+    command = [
+        'ffprobe', '-v', 'error',
+        '-show_entries', 'stream=codec_type,codec_name,profile,level,pix_fmt:stream_disposition=attached_pic',
+        '-of', 'json',
+        input_file
+    ]
+    try:
+        result = subprocess.run(command, capture_output=True, text=True)
+    except FileNotFoundError:
+        return None
+    if result.returncode != 0:
+        return None
+    try:
+        return json.loads(result.stdout).get('streams', [])
+    except ValueError:
+        return None
+
+
+def video_compatible(stream):
+    """Check if a video stream can be copied as-is"""
+    return (stream.get('codec_name') == 'h264'
+            and stream.get('profile') in IPHONE_VIDEO_PROFILES
+            and 0 < int(stream.get('level') or 0) <= IPHONE_MAX_LEVEL
+            and stream.get('pix_fmt') in IPHONE_PIX_FMTS)
+
+
+def audio_compatible(stream):
+    """Check if an audio stream can be copied as-is"""
+    return stream.get('codec_name') == 'aac' and stream.get('profile') in IPHONE_AUDIO_PROFILES
+
+
+# H.264 profile_idc values from avc1.PPCCLL codec strings
+AVC_PROFILES = {0x42: 'Baseline', 0x4D: 'Main', 0x64: 'High'}
+
+
+def plan_codecs(vcodec, acodec):
+    """
+    Plan from RFC 6381 codec strings (e.g. avc1.64001f, mp4a.40.2), as
+    reported by yt-dlp before anything is downloaded.
+    """
+    plan = {'video': None, 'audio': None}
+    if vcodec and vcodec != 'none':
+        plan['video'] = 'encode'
+        parts = vcodec.split('.')
+        if parts[0] in ('avc1', 'avc3') and len(parts) > 1 and len(parts[1]) == 6:
+            profile = AVC_PROFILES.get(int(parts[1][:2], 16))
+            level = int(parts[1][4:], 16)
+            if profile in IPHONE_VIDEO_PROFILES and 0 < level <= IPHONE_MAX_LEVEL:
+                plan['video'] = 'copy'
+    if acodec and acodec != 'none':
+        # mp4a.40.2 = AAC LC, .5 = HE-AAC, .29 = HE-AACv2
+        plan['audio'] = 'copy' if acodec in ('mp4a.40.2', 'mp4a.40.5', 'mp4a.40.29') else 'encode'
+    return plan
+
+
+def plan_streams(input_file):
+    """
+    Decide per stream whether to copy or re-encode.
+    
+    Returns {'video': ..., 'audio': ...} with 'copy', 'encode' or None
+    (no such stream). Without ffprobe everything is re-encoded.
+    """
+    streams = probe_streams(input_file)
+    if streams is None:
+        return {'video': 'encode', 'audio': 'encode'}
+    
+    # The streams ffmpeg picks by default: first real video, first audio
+    video = next((s for s in streams if s.get('codec_type') == 'video'
+                  and not s.get('disposition', {}).get('attached_pic')), None)
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+    return {
+        'video': None if video is None else 'copy' if video_compatible(video) else 'encode',
+        'audio': None if audio is None else 'copy' if audio_compatible(audio) else 'encode',
+    }
+
+
+MODE_LABELS = {
+    'remux': 'already compatible, remuxed only',
+    'video': 're-encoded video, copied audio',
+    'audio': 'copied video, re-encoded audio',
+    'full': 're-encoded video and audio',
+}
+
+
+def describe_plan(plan):
+    """Short label for a stream plan: remux, video, audio or full"""
+    encoded = [kind for kind in ('video', 'audio') if plan.get(kind) == 'encode']
+    if not encoded:
+        return 'remux'
+    return encoded[0] if len(encoded) == 1 else 'full'
+
+
+def get_profile(name):
+    """Return the encoder settings for a profile name; raises ValueError if unknown"""
+    try:
+        return PROFILES[name or DEFAULT_PROFILE]
+    except KeyError:
+        raise ValueError(f"Unknown profile '{name}' (choose from {', '.join(PROFILES)})") from None
+
+
+def build_command(input_file, output_file, threads=None, plan=None, profile=None):
+    """FFmpeg command for iPhone-compatible video"""
+    return ['ffmpeg', '-i', input_file] + codec_args(plan, threads, profile) + [
+        '-y',                         # Overwrite output file if exists
+        output_file
+    ]
+
+
+def codec_args(plan=None, threads=None, profile=None):
+    """FFmpeg output options for iPhone-compatible video
+    
+    H.264 codec with AAC audio, optimized for iOS devices, using the
+    named encoder profile (default: balanced). Streams the plan marks as
+    'copy' are passed through untouched.
+    """
+    plan = plan or {'video': 'encode', 'audio': 'encode'}
+    settings = get_profile(profile)
+    command = []
+    if plan.get('video') == 'copy':
+        command += ['-c:v', 'copy']   # Already H.264 High <= 4.0, yuv420p
+    else:
+        command += [
+            '-c:v', 'libx264',           # H.264 video codec
+            '-preset', settings['preset'],  # Encoding speed/quality tradeoff
+            '-crf', str(settings['crf']),   # Quality (lower = better, 18-28 is good range)
+            '-profile:v', 'high',         # H.264 profile
+            '-level', '4.0',              # H.264 level
+            '-pix_fmt', 'yuv420p',        # Pixel format compatible with iPhone
+        ]
+    if plan.get('audio') == 'copy':
+        command += ['-c:a', 'copy']   # Already AAC
+    elif plan.get('audio', 'encode') == 'encode':
+        command += [
+            '-c:a', 'aac',                # AAC audio codec
+            '-b:a', '128k',               # Audio bitrate
+        ]
+    command += [
+        '-movflags', '+faststart',    # Enable fast start for web/streaming
+    ]
+    if threads:
+        command += ['-threads', str(threads)]  # Encoder threads for this job
+    return command
+
+
+def source_duration(input_file):
+    """Duration of input_file in seconds, or None if ffprobe cannot tell"""
+    try:
+        return probe_timing(input_file)['duration']
+    except (RuntimeError, FileNotFoundError, ValueError):
+        return None
+
+
+def transcode(input_file, output_file, threads=None, reencode=False, callback=None, log_path=None,
+              profile=None):
+    """
+    Run one conversion and measure it.
+    
+    Streams that are already iPhone-compatible are copied unless reencode
+    is set; the rest use the named encoder profile. callback(metrics)
+    receives live progress from ffmpeg_progress and log_path gets a JSONL
+    record of the job. Returns a dict with ok, mode, seconds, frames, fps
+    and error (the tail of ffmpeg's stderr on failure). Raises
+    FileNotFoundError if ffmpeg is not installed.
+    """
+    start = time.monotonic()
+    plan = {'video': 'encode', 'audio': 'encode'} if reencode else plan_streams(input_file)
+    result = ffmpeg_progress.run(
+        build_command(input_file, output_file, threads, plan, profile),
+        duration=source_duration(input_file),
+        callback=callback,
+        log_path=log_path,
+        job=os.path.basename(input_file)
+    )
+    seconds = time.monotonic() - start
+    
+    frames = result.metrics['frame']
+    return {
+        'input': input_file,
+        'output': output_file,
+        'ok': result.returncode == 0,
+        'mode': describe_plan(plan),
+        'seconds': seconds,
+        'frames': frames,
+        'fps': frames / result.seconds if result.seconds > 0 else 0.0,
+        'speed': result.metrics['speed'],
+        'threads': threads,
+        'profile': profile or DEFAULT_PROFILE,
+        'error': '\n'.join(result.stderr_tail) if result.returncode != 0 else None,
+    }
+
+
+def convert_to_iphone_format(input_file, output_file=None, threads=None, reencode=False, log_path=None,
+                             profile=None):
     """
     Convert MP4 video to iPhone-compatible format.
     
     Args:
         input_file: Path to input MP4 file
         output_file: Path to output file (optional, will auto-generate if not provided)
+        threads: FFmpeg encoder threads (optional, ffmpeg picks by default)
+        reencode: Re-encode even streams that are already compatible
+        log_path: JSONL file for progress records (optional)
+        profile: Encoder profile name from PROFILES (optional, default: balanced)
     """
     # Check if input file exists
     if not os.path.exists(input_file):
@@ -18,26 +314,7 @@ def convert_to_iphone_format(input_file, output_file=None):
     
     # Generate output filename if not provided
     if output_file is None:
-        input_path = Path(input_file)
-        output_file = str(input_path.parent / f"{input_path.stem}_iphone{input_path.suffix}")
-    
-    # FFmpeg command for iPhone-compatible video
-    # H.264 codec with AAC audio, optimized for iOS devices
-    command = [
-        'ffmpeg',
-        '-i', input_file,
-        '-c:v', 'libx264',           # H.264 video codec
-        '-preset', 'medium',          # Encoding speed/quality tradeoff
-        '-crf', '23',                 # Quality (lower = better, 18-28 is good range)
-        '-profile:v', 'high',         # H.264 profile
-        '-level', '4.0',              # H.264 level
-        '-pix_fmt', 'yuv420p',        # Pixel format compatible with iPhone
-        '-c:a', 'aac',                # AAC audio codec
-        '-b:a', '128k',               # Audio bitrate
-        '-movflags', '+faststart',    # Enable fast start for web/streaming
-        '-y',                         # Overwrite output file if exists
-        output_file
-    ]
+        output_file = default_output_file(input_file)
     
     print(f"Converting: {input_file}")
     print(f"Output: {output_file}")
@@ -45,20 +322,18 @@ def convert_to_iphone_format(input_file, output_file=None):
     
     try:
         # Run FFmpeg
-        result = subprocess.run(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
+        result = transcode(input_file, output_file, threads, reencode,
+                           callback=ffmpeg_progress.print_progress, log_path=log_path,
+                           profile=profile)
         
-        if result.returncode == 0:
-            print(f"\n✓ Conversion successful!")
+        if result['ok']:
+            print(f"\n✓ Conversion successful! ({MODE_LABELS[result['mode']]})")
             print(f"Output saved to: {output_file}")
+            print(f"Processed {result['frames']} frames in {result['seconds']:.1f}s ({result['fps']:.1f} fps)")
             return True
         else:
             print(f"\n✗ Conversion failed!")
-            print(f"Error: {result.stderr}")
+            print(f"Error: {result['error']}")
             return False
             
     except FileNotFoundError:
@@ -72,18 +347,394 @@ def convert_to_iphone_format(input_file, output_file=None):
         print(f"\n✗ Error: {str(e)}")
         return False
 
+def make_iphone_compatible(path, threads=None, callback=None, profile=None):
+    """
+    Convert a downloaded file in place to a .mp4 next to it.
+    
+    Compatible streams are only remuxed for fast start. Returns the
+    transcode result, whose 'output' is the final path. Raises
+    RuntimeError if ffmpeg fails and FileNotFoundError without ffmpeg.
+    """
+    final_path = str(Path(path).with_suffix('.mp4'))
+    temp_path = str(Path(path).with_suffix('.iphone-tmp.mp4'))
+    result = transcode(path, temp_path, threads, callback=callback, profile=profile)
+    if not result['ok']:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        error = (result['error'] or '').strip().splitlines()
+        raise RuntimeError(error[-1] if error else 'ffmpeg failed')
+    
+    os.replace(temp_path, final_path)
+    if os.path.abspath(path) != os.path.abspath(final_path):
+        os.remove(path)
+    result['output'] = final_path
+    return result
+
+
+def run_ffmpeg(command, log_path=None, job=None):
+    """Run an ffmpeg command; raises RuntimeError with its last error line"""
+    result = ffmpeg_progress.run(command, log_path=log_path, job=job)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr_tail[-1] if result.stderr_tail else 'ffmpeg failed')
+    return result
+
+
+def probe_timing(path):
+    """
+    Return the container duration and (start, duration) of the first
+    video and audio streams; stream values are None where unknown.
+    """
+    result = subprocess.run([
+        'ffprobe', '-v', 'error',
+        '-show_entries', 'format=duration:stream=codec_type,start_time,duration',
+        '-of', 'json',
+        path
+    ], capture_output=True, text=True)
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()
+        raise RuntimeError(error[-1] if error else 'ffprobe failed')
+    data = json.loads(result.stdout)
+    
+    def number(value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    
+    timing = {'duration': number(data.get('format', {}).get('duration')), 'video': None, 'audio': None}
+    for stream in data.get('streams', []):
+        kind = stream.get('codec_type')
+        if kind in ('video', 'audio') and timing[kind] is None:
+            timing[kind] = (number(stream.get('start_time')) or 0.0, number(stream.get('duration')))
+    return timing
+
+
+def verify_output(source, output):
+    """
+    Compare the output's timing with the source.
+    
+    Returns a list of problems; empty means duration and A/V sync match.
+    """
+    problems = []
+    expected = source['duration']
+    video, audio = output['video'], output['audio']
+    if video is None:
+        return ['output has no video stream']
+    
+    if expected and video[1] is not None and abs(video[1] - expected) > DURATION_TOLERANCE:
+        problems.append(f'video lasts {video[1]:.2f}s, source {expected:.2f}s')
+    if source['audio'] is not None:
+        if audio is None:
+            return problems + ['output lost the audio stream']
+        if expected and audio[1] is not None and abs(audio[1] - expected) > DURATION_TOLERANCE:
+            problems.append(f'audio lasts {audio[1]:.2f}s, source {expected:.2f}s')
+        # Audio must start as far from the video as it did in the source
+        source_offset = source['audio'][0] - source['video'][0]
+        offset = audio[0] - video[0]
+        if abs(offset - source_offset) > SYNC_TOLERANCE:
+            problems.append(f'A/V offset {offset * 1000:.0f} ms, source {source_offset * 1000:.0f} ms')
+    return problems
+
+
+def convert_segmented(input_file, output_file=None, segments=None, jobs=None, threads=None,
+                      log_path=None, profile=None):
+    """
+    Convert one long video by encoding keyframe-aligned chunks in parallel.
+    
+    The video stream is split at keyframes with ffmpeg's segment muxer,
+    the chunks are encoded on several cores at once while the audio is
+    converted once alongside them, and everything is joined with the
+    concat demuxer without another encode. The result is checked against
+    the source's duration and A/V offset.
+    
+    Every ffmpeg step is logged to log_path (JSONL) when given. Returns a
+    dict like transcode() plus 'segments' and 'problems'.
+    Raises RuntimeError if a step fails and FileNotFoundError without ffmpeg.
+    """
+    if output_file is None:
+        output_file = default_output_file(input_file)
+    
+    start = time.monotonic()
+    plan = plan_streams(input_file)
+    source = probe_timing(input_file)
+    if plan['video'] != 'encode' or not source['duration']:
+        # Nothing worth splitting: video is copied, absent or of unknown length
+        return transcode(input_file, output_file, threads, log_path=log_path, profile=profile)
+    
+    name = os.path.basename(input_file)
+    if segments is None:
+        segments = 2 * max(1, available_cores() // THREADS_PER_JOB)
+    segment_time = max((source['duration'] or 0) / max(segments, 1), 1.0)
+    
+    tmp = tempfile.mkdtemp(prefix='iphone-segments-')
+    try:
+        # 1. Split the video stream at keyframes without re-encoding
+        run_ffmpeg([
+            'ffmpeg', '-i', input_file,
+            '-map', '0:v:0', '-c', 'copy',
+            '-f', 'segment', '-segment_time', f'{segment_time:.3f}',
+            '-reset_timestamps', '1',
+            '-y', os.path.join(tmp, 'source%04d.mkv')
+        ], log_path, f'{name}:split')
+        parts = sorted(name for name in os.listdir(tmp) if name.startswith('source'))
+        jobs, threads = plan_jobs(len(parts) + 1, jobs=jobs, threads=threads)
+        print(f"Encoding {len(parts)} segments: {jobs} jobs x {threads} threads")
+        
+        # 2. Encode the segments in parallel, and the audio once next to them
+        video_plan = {'video': 'encode', 'audio': None}
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            audio_future = None
+            if plan['audio'] is not None:
+                audio_codec = ['copy'] if plan['audio'] == 'copy' else ['aac', '-b:a', '128k']
+                audio_future = executor.submit(run_ffmpeg, [
+                    'ffmpeg', '-i', input_file, '-map', '0:a:0', '-vn', '-c:a'] + audio_codec + [
+                    '-y', os.path.join(tmp, 'audio.m4a')
+                ], log_path, f'{name}:audio')
+            futures = [
+                executor.submit(run_ffmpeg, build_command(
+                    os.path.join(tmp, part), os.path.join(tmp, f'encoded{i:04d}.mp4'),
+                    threads, video_plan, profile), log_path, f'{name}:segment{i}')
+                for i, part in enumerate(parts)
+            ]
+            frames = sum(future.result().metrics['frame'] for future in futures)
+            if audio_future is not None:
+                audio_future.result()
+        
+        # 3. Join the encoded segments and the audio without re-encoding
+        list_file = os.path.join(tmp, 'segments.txt')
+        with open(list_file, 'w', encoding='utf-8') as f:
+            for i in range(len(parts)):
+                f.write(f"file 'encoded{i:04d}.mp4'\n")
+        command = ['ffmpeg', '-f', 'concat', '-safe', '0', '-i', list_file]
+        if plan['audio'] is not None:
+            # Keep the source's offset between audio and video
+            offset = source['audio'][0] - source['video'][0]
+            command += ['-itsoffset', f'{offset:.6f}', '-i', os.path.join(tmp, 'audio.m4a'),
+                        '-map', '0:v:0', '-map', '1:a:0']
+        command += ['-c', 'copy', '-movflags', '+faststart', '-y', output_file]
+        run_ffmpeg(command, log_path, f'{name}:concat')
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    
+    seconds = time.monotonic() - start
+    problems = verify_output(source, probe_timing(output_file))
+    return {
+        'input': input_file,
+        'output': output_file,
+        'ok': not problems,
+        'mode': describe_plan(plan),
+        'seconds': seconds,
+        'frames': frames,
+        'fps': frames / seconds if seconds > 0 else 0.0,
+        'threads': threads,
+        'profile': profile or DEFAULT_PROFILE,
+        'segments': len(parts),
+        'problems': problems,
+        'error': '\n'.join(problems) or None,
+    }
+
+
+def run_benchmark(duration=120, segments=None):
+    """Time a single encode against segmented encoding on a testsrc clip"""
+    if not shutil.which('ffmpeg') or not shutil.which('ffprobe'):
+        print("Error: ffmpeg and ffprobe are required for the benchmark")
+        return
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'source.mkv')
+        print(f"Generating a {duration}s synthetic 1080p test clip...")
+        # MPEG-4 Part 2 video so the clip really needs an H.264 encode
+        run_ffmpeg([
+            'ffmpeg',
+            '-f', 'lavfi', '-i', f'testsrc=size=1920x1080:rate=30:duration={duration}',
+            '-f', 'lavfi', '-i', f'sine=frequency=440:duration={duration}',
+            '-c:v', 'mpeg4', '-q:v', '3', '-g', '60',
+            '-c:a', 'libmp3lame',
+            '-y', source
+        ])
+        
+        single = transcode(source, os.path.join(tmp, 'single.mp4'))
+        if not single['ok']:
+            print(f"Single encode failed: {single['error']}")
+            return
+        segmented = convert_segmented(source, os.path.join(tmp, 'segmented.mp4'), segments)
+        
+        print(f"\n{'method':<30}{'seconds':>10}{'fps':>10}{'speedup':>10}{'size MB':>10}")
+        for name, result in (('single encode', single),
+                             (f"segmented ({segmented.get('segments', 1)} chunks)", segmented)):
+            print(f"{name:<30}{result['seconds']:>10.1f}{result['fps']:>10.1f}"
+                  f"{single['seconds'] / result['seconds']:>9.1f}x"
+                  f"{os.path.getsize(result['output']) / 1024 ** 2:>10.1f}")
+        print(f"\nVerification: {'; '.join(segmented['problems']) or 'duration and A/V sync match the source'}")
+
+
+def find_inputs(patterns):
+    """Expand directories and globs into a sorted list of video files"""
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for name in sorted(os.listdir(pattern)):
+                path = os.path.join(pattern, name)
+                if os.path.isfile(path) and name.lower().endswith(VIDEO_EXTENSIONS):
+                    files.append(path)
+        else:
+            files.extend(sorted(glob.glob(os.path.expanduser(pattern))) or
+                         ([pattern] if os.path.isfile(pattern) else []))
+    
+    # Skip our own outputs and duplicates from overlapping patterns
+    seen = set()
+    inputs = []
+    for path in files:
+        key = os.path.abspath(path)
+        if key in seen or Path(path).stem.endswith('_iphone'):
+            continue
+        seen.add(key)
+        inputs.append(path)
+    return inputs
+
+
+def convert_batch(patterns, output_dir=None, jobs=None, threads=None, reencode=False,
+                  log_dir=None, profile=None):
+    """
+    Convert every video matched by patterns, several ffmpeg jobs at a time.
+    
+    With log_dir, each job writes its progress to log_dir/<output name>.jsonl.
+    
+    Returns True if every file converted successfully.
+    """
+    inputs = find_inputs(patterns)
+    if not inputs:
+        print("Error: No video files found")
+        return False
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    
+    jobs, threads = plan_jobs(len(inputs), jobs=jobs, threads=threads)
+    print(f"Converting {len(inputs)} files: {jobs} jobs x {threads} threads "
+          f"on {available_cores()} cores\n")
+    
+    # Jobs run at once with -y, so no two of them may write the same file
+    outputs = batch_output_files(inputs, output_dir)
+    for path, output in zip(inputs, outputs):
+        if output != default_output_file(path, output_dir):
+            print(f"Note: {path} -> {output} (another input has the same name)")
+    
+    results = []
+    start = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = [
+                executor.submit(transcode, path, output, threads, reencode,
+                                log_path=os.path.join(log_dir, Path(output).name + '.jsonl') if log_dir else None,
+                                profile=profile)
+                for path, output in zip(inputs, outputs)
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                mark = '✓' if result['ok'] else '✗'
+                print(f"[{len(results)}/{len(inputs)}] {mark} {os.path.basename(result['input'])}"
+                      f"  {result['mode']}  {result['seconds']:.1f}s  {result['fps']:.1f} fps")
+    except FileNotFoundError:
+        print("\n✗ Error: FFmpeg not found!")
+        return False
+    elapsed = max(time.monotonic() - start, 1e-6)
+    
+    succeeded = [r for r in results if r['ok']]
+    failed = [r for r in results if not r['ok']]
+    frames = sum(r['frames'] for r in succeeded)
+    print("\n" + "=" * 60)
+    remuxed = sum(1 for r in succeeded if r['mode'] == 'remux')
+    print(f"Files:      {len(succeeded)} ok ({remuxed} remuxed only), {len(failed)} failed in {elapsed:.1f}s")
+    print(f"Throughput: {len(succeeded) / elapsed * 3600:.1f} files/hour, "
+          f"{frames / elapsed:.1f} fps total")
+    if succeeded:
+        print(f"Per job:    {sum(r['fps'] for r in succeeded) / len(succeeded):.1f} fps average "
+              f"({threads} threads each)")
+    for result in failed:
+        error = (result['error'] or '').strip().splitlines()
+        print(f"  ✗ {result['input']}: {error[-1] if error else 'unknown error'}")
+    print("=" * 60)
+    return not failed
+
+
+def add_profile_argument(parser):
+    parser.add_argument('--profile', '-p', choices=list(PROFILES), default=DEFAULT_PROFILE,
+                        help=f'encoder profile (default: {DEFAULT_PROFILE})')
+
+
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        run_benchmark()
+        return
+    
+    # Segmented mode: python script.py --segmented input.mp4 [output.mp4] [--segments N]
+    if len(sys.argv) > 1 and sys.argv[1] == '--segmented':
+        parser = argparse.ArgumentParser(description='Convert one long video in parallel chunks')
+        parser.add_argument('input', help='video file')
+        parser.add_argument('output', nargs='?', help='output file (default: input_iphone.mp4)')
+        parser.add_argument('--segments', '-s', type=int,
+                            help='number of chunks (default: twice the number of jobs)')
+        parser.add_argument('--jobs', '-j', type=int, help='chunks encoded at once')
+        parser.add_argument('--threads', '-t', type=int, help='ffmpeg threads per chunk')
+        parser.add_argument('--log', help='JSONL file for progress records of every step')
+        add_profile_argument(parser)
+        options = parser.parse_args(sys.argv[2:])
+        try:
+            result = convert_segmented(options.input, options.output, options.segments,
+                                       options.jobs, options.threads, options.log, options.profile)
+        except (RuntimeError, FileNotFoundError) as e:
+            print(f"\n✗ Conversion failed: {e}")
+            sys.exit(1)
+        if result['ok']:
+            print(f"\n✓ Conversion successful! Output saved to: {result['output']}")
+            print(f"Processed {result['frames']} frames in {result['seconds']:.1f}s ({result['fps']:.1f} fps)")
+        else:
+            print(f"\n✗ Verification failed: {result['error']}")
+        sys.exit(0 if result['ok'] else 1)
+    
+    # Batch mode: python script.py --batch DIR_OR_GLOB... [--jobs N] [--threads N]
+    if len(sys.argv) > 1 and sys.argv[1] == '--batch':
+        parser = argparse.ArgumentParser(description='Convert many videos to iPhone format')
+        parser.add_argument('inputs', nargs='+', help='video files, directories or glob patterns')
+        parser.add_argument('--output-dir', '-o', help='write outputs here instead of next to inputs')
+        parser.add_argument('--jobs', '-j', type=int,
+                            help='files converted at once (default: cores / threads)')
+        parser.add_argument('--threads', '-t', type=int,
+                            help='ffmpeg threads per job (default: cores / jobs)')
+        parser.add_argument('--reencode', action='store_true',
+                            help='re-encode even files that are already iPhone-compatible')
+        parser.add_argument('--log-dir', help='write a JSONL progress log per file here')
+        add_profile_argument(parser)
+        options = parser.parse_args(sys.argv[2:])
+        ok = convert_batch(options.inputs, options.output_dir, options.jobs, options.threads,
+                           options.reencode, options.log_dir, options.profile)
+        sys.exit(0 if ok else 1)
+    
     if len(sys.argv) < 2:
-        print("Usage: python script.py input_video.mp4 [output_video.mp4]")
+        print("Usage: python script.py input_video.mp4 [output_video.mp4] [--profile NAME] [--reencode]")
+        print("       python script.py --batch DIR_OR_GLOB... [--jobs N] [--threads N]")
+        print("       python script.py --segmented input_video.mp4 [output_video.mp4] [--segments N]")
+        print("       python script.py --benchmark")
         print("\nExample:")
         print("  python script.py video.mp4")
         print("  python script.py video.mp4 output.mp4")
+        print("  python script.py --batch ~/Videos '*.mov' --output-dir converted --profile fast")
+        print("\nProfiles:")
+        for name, settings in PROFILES.items():
+            print(f"  {name:<10} -preset {settings['preset']} -crf {settings['crf']}")
         sys.exit(1)
     
-    input_file = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else None
+    parser = argparse.ArgumentParser(description='Convert a video to iPhone format')
+    parser.add_argument('input', help='video file')
+    parser.add_argument('output', nargs='?', help='output file (default: input_iphone.mp4)')
+    parser.add_argument('--reencode', action='store_true',
+                        help='re-encode even if the video is already iPhone-compatible')
+    add_profile_argument(parser)
+    options = parser.parse_args(sys.argv[1:])
     
-    convert_to_iphone_format(input_file, output_file)
+    convert_to_iphone_format(options.input, options.output, reencode=options.reencode,
+                             profile=options.profile)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
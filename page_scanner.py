@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Page Scanner
+Finds video sources (m3u8/mp4 links, iframes, player configs) in HTML
+with one precompiled pattern and a single pass over the document.
+Works on a whole page or on chunks as they are downloaded.
+
+Usage: python3 page_scanner.py page.html
+       python3 page_scanner.py --benchmark
+"""
+
+import codecs
+import json
+import re
+import sys
+import time
+from collections import namedtuple
+
+Hit = namedtuple('Hit', 'kind url')
+
+# Every quantifier is bounded so no match can be longer than this;
+# the streaming scanner keeps this much text between chunks. The longest
+# alternative is a var player config: 8002 chars of JSON plus a name
+# and whitespace runs of up to 64 chars each, 8269 in all.
+MAX_MATCH = 8448
+OVERLAP = MAX_MATCH * 2
+
+# Streaming fetch: bytes read per chunk, and the most read from one page
+CHUNK_SIZE = 64 * 1024
+MAX_PAGE_BYTES = 8 * 1024 * 1024
+
+# Hit kinds that count towards "enough sources found"
+DIRECT_KINDS = ('m3u8', 'mp4', 'player_config')
+
+META_CHARSET_RE = re.compile(rb'''<meta[^>]{0,256}?charset=["']?([\w-]{2,32})''', re.IGNORECASE)
+
+# Sort order of hit kinds: direct streams first, embedded players last
+KIND_ORDER = ('m3u8', 'mp4', 'player_config', 'player', 'iframe')
+
+# Case-sensitive except for the iframe tag and file extensions: with
+# re.IGNORECASE the regex engine loses its first-character fast path.
+SCANNER = re.compile(r'''
+    player_aaaa\s{0,64}=\s{0,64}(?P<aaaa>\{[^}]{1,8000}\})
+  | var\s{1,64}player[^=;<]{0,64}=\s{0,64}(?P<config>\{[^<]{0,8000}?\})\s{0,64};
+  | <(?i:iframe)\b[^>]{0,2048}?\bsrc=["'](?P<iframe>https?://[^"']{1,2048})["']
+  | url["']?\s{0,64}:\s{0,64}["'](?P<keyed>[^"'\s]{1,2048}?\.(?i:m3u8|mp4)[^"'\s]{0,2048})["']
+  | (?P<bare>https?://[^"'\s<>]{1,2048}?\.(?i:m3u8|mp4)[^"'\s<>]{0,2048})
+  | (?P<vod>player\.vod\.com[^"'\s<>]{0,2048})
+''', re.DOTALL | re.VERBOSE)
+
+
+def clean_url(url):
+    """Undo JS/JSON escaping around a matched URL"""
+    return url.replace('\\/', '/').replace('\\"', '"').strip('"\'')
+
+
+def classify(match):
+    """Turn a scanner match into a Hit, or None if it holds no URL"""
+    config = match.group('aaaa') or match.group('config')
+    if config:
+        try:
+            url = json.loads(config).get('url')
+        except (ValueError, AttributeError):
+            return None
+        return Hit('player_config', clean_url(url)) if isinstance(url, str) and url else None
+    if match.group('iframe'):
+        return Hit('iframe', clean_url(match.group('iframe')))
+    if match.group('vod'):
+        return Hit('player', clean_url(match.group('vod')))
+    url = clean_url(match.group('keyed') or match.group('bare'))
+    return Hit('m3u8' if '.m3u8' in url.lower() else 'mp4', url)
+
+
+def sort_hits(hits):
+    """Order hits by kind priority, keeping document order within a kind"""
+    return sorted(hits, key=lambda hit: KIND_ORDER.index(hit.kind))
+
+
+class StreamScanner:
+    """Incremental scanner: feed() text chunks, get new unique hits back"""
+
+    def __init__(self):
+        self._buffer = ''
+        self._seen = set()
+        self.hits = []
+
+    def _scan(self, final):
+        buffer = self._buffer
+        # Every match starting before limit fits in the buffer, so it is final;
+        # later ones are rescanned once the next chunk arrives.
+        limit = len(buffer) if final else len(buffer) - OVERLAP
+        keep_from = limit
+        new_hits = []
+        for match in SCANNER.finditer(buffer):
+            if match.start() >= limit:
+                break
+            keep_from = max(keep_from, match.end())
+            hit = classify(match)
+            if hit is not None and hit.url not in self._seen:
+                self._seen.add(hit.url)
+                new_hits.append(hit)
+        self._buffer = buffer[keep_from:]
+        self.hits.extend(new_hits)
+        return new_hits
+
+    def feed(self, text):
+        """Scan a chunk of decoded text; returns hits completed so far"""
+        self._buffer += text
+        if len(self._buffer) <= OVERLAP:
+            return []
+        return self._scan(final=False)
+
+    def close(self):
+        """Scan whatever is left at the end of the document"""
+        return self._scan(final=True)
+
+
+def scan(html):
+    """Scan a whole document and return unique hits by kind priority"""
+    scanner = StreamScanner()
+    scanner.feed(html)
+    scanner.close()
+    return sort_hits(scanner.hits)
+
+
+def _page_charset(response, head):
+    """Charset from the Content-Type header or a <meta> tag in the first bytes"""
+    charset = response.headers.get_content_charset()
+    if not charset:
+        match = META_CHARSET_RE.search(head)
+        if match:
+            charset = match.group(1).decode('ascii')
+    try:
+        codecs.lookup(charset or 'utf-8')
+    except LookupError:
+        charset = None
+    return charset or 'utf-8'
+
+
+def scan_stream(response, max_sources=3, max_bytes=MAX_PAGE_BYTES,
+                wanted=DIRECT_KINDS, markers=()):
+    """Scan a page while it downloads, stopping early once enough is found
+
+    Reads response in chunks, decodes them incrementally and feeds the
+    scanner. Stops when max_sources hits of the wanted kinds have been
+    seen or max_bytes were read. Returns (hits, markers found in the text).
+    """
+    scanner = StreamScanner()
+    found_markers = set()
+    decoder = None
+    read = 0
+    tail = ''
+    while read < max_bytes:
+        chunk = response.read(min(CHUNK_SIZE, max_bytes - read))
+        if not chunk:
+            break
+        read += len(chunk)
+
+        if decoder is None:
+            decoder = codecs.getincrementaldecoder(_page_charset(response, chunk))('strict')
+        try:
+            text = decoder.decode(chunk)
+        except UnicodeDecodeError:
+            # Not what it claimed to be; the Chinese sites here fall back to GBK
+            decoder = codecs.getincrementaldecoder('gbk')('ignore')
+            text = decoder.decode(chunk)
+
+        # Keep a little of the previous chunk so markers split across chunks are found
+        window = tail + text
+        found_markers.update(m for m in markers if m in window)
+        tail = text[-64:]
+
+        scanner.feed(text)
+        if sum(1 for hit in scanner.hits if hit.kind in wanted) >= max_sources:
+            break
+    scanner.close()
+    return sort_hits(scanner.hits), found_markers
+
+
+# The per-pattern approach the scrapers used before, kept for the benchmark
+LEGACY_PATTERNS = [
+    r'https?://[^"\s<>\']+\.m3u8[^"\s<>\']*',
+    r'"url":\s*"([^"]+\.m3u8[^"]*)"',
+    r"'url':\s*'([^']+\.m3u8[^']*)'",
+    r'url:\s*["\']([^"\']+\.m3u8[^"\']*)["\']',
+    r'https?://[^"\s<>\']+\.mp4[^"\s<>\']*',
+    r'"url":\s*"([^"]+\.mp4[^"]*)"',
+    r"'url':\s*'([^']+\.mp4[^']*)'",
+    r'url:\s*["\']([^"\']+\.mp4[^"\']*)["\']',
+    r'player_aaaa\s*=\s*({[^}]+})',
+    r'var\s+player[^=]*=\s*({.+?});',
+    r'<iframe[^>]+src=["\'](https?://[^"\']+)["\']',
+]
+
+
+def legacy_scan(html):
+    found = []
+    for pattern in LEGACY_PATTERNS:
+        found.extend(re.findall(pattern, html, re.IGNORECASE | re.DOTALL))
+    return found
+
+
+def make_corpus_page(size, seed=0):
+    """Build a synthetic page of roughly size bytes shaped like a video site"""
+    import random
+    rng = random.Random(seed)
+    words = ['video', 'player', 'episode', 'season', 'url', 'https', 'config', 'data']
+    parts = ['<html><head><script>var player_aaaa = {"url":"https:\\/\\/cdn.example.com\\/v\\/index.m3u8","id":1};</script></head><body>']
+    length = len(parts[0])
+    i = 0
+    while length < size:
+        i += 1
+        choice = i % 50
+        if choice == 0:
+            part = f'<a href="https://cdn{i}.example.com/media/{i}/index.m3u8?t={i}">ep {i}</a>\n'
+        elif choice == 1:
+            part = f'<iframe width="640" src="https://embed.example.com/e/{i}"></iframe>\n'
+        elif choice == 2:
+            part = f'<script>var playerConfig{i} = {{"file": "x{i}", "url": "https://s{i}.example.com/{i}.mp4"}}</script>\n'
+        elif choice == 3:
+            # Config without a trailing ';': the legacy DOTALL pattern scans far ahead for one
+            part = f'<script>var player_state{i} = {{"ready": false}}\n</script>\n'
+        else:
+            text = ' '.join(rng.choice(words) for _ in range(12))
+            part = f'<div class="item" data-id="{i}"><p>{text}: https://example.com/page/{i}</p></div>\n'
+        parts.append(part)
+        length += len(part)
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+
+def run_benchmark(sizes=(256 * 1024, 1024 * 1024, 2 * 1024 * 1024)):
+    """Time the legacy multi-pass regexes against the single-pass scanner"""
+    print(f"{'page size':>10}{'legacy s':>12}{'scanner s':>12}{'stream s':>12}{'legacy hits':>13}{'hits':>8}")
+    for size in sizes:
+        html = make_corpus_page(size)
+
+        start = time.perf_counter()
+        legacy_hits = len(set(clean_url(u) for u in legacy_scan(html) if not u.startswith('{')))
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        hits = scan(html)
+        scan_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scanner = StreamScanner()
+        for i in range(0, len(html), 64 * 1024):
+            scanner.feed(html[i:i + 64 * 1024])
+        scanner.close()
+        stream_time = time.perf_counter() - start
+
+        print(f"{size // 1024:>8}KB{legacy_time:>12.3f}{scan_time:>12.3f}{stream_time:>12.3f}{legacy_hits:>13}{len(hits):>8}")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        run_benchmark()
+        return
+
+    if len(sys.argv) < 2:
+        print("Usage: python3 page_scanner.py page.html")
+        print("       python3 page_scanner.py --benchmark")
+        sys.exit(1)
+
+    with open(sys.argv[1], encoding='utf-8', errors='ignore') as f:
+        for hit in scan(f.read()):
+            print(f"{hit.kind:<14}{hit.url}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Encoder Profile Benchmark
+Encodes generated test clips with every profile from
+mp4_to_iphone_format.PROFILES and records encode fps, output size and
+VMAF/SSIM/PSNR against the lossless source, then recommends the fastest
+profile that stays above a quality floor on this machine.
+
+Usage: python3 profile_benchmark.py [--duration 10] [--profiles draft,fast]
+                                    [--min-vmaf 93] [--results results.jsonl]
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import mp4_to_iphone_format
+
+# Generated clips: easy synthetic motion, fine detail, and film-like grain
+CLIPS = {
+    'testsrc2': 'testsrc2=size=1280x720:rate=30',
+    'mandelbrot': 'mandelbrot=size=1280x720:rate=30',
+    'grain': 'testsrc2=size=1280x720:rate=30,noise=alls=12:allf=t+u',
+}
+
+# Quality floors for the recommendation; VMAF is used when ffmpeg has libvmaf
+DEFAULT_MIN_VMAF = 93.0
+DEFAULT_MIN_SSIM = 0.98
+
+VMAF_RE = re.compile(r'VMAF score: ([\d.]+)')
+SSIM_RE = re.compile(r'SSIM .*All:([\d.]+)')
+PSNR_RE = re.compile(r'PSNR .*average:([\d.]+|inf)')
+
+
+def has_vmaf():
+    """Check if this ffmpeg build includes the libvmaf filter"""
+    result = subprocess.run(['ffmpeg', '-hide_banner', '-filters'], capture_output=True, text=True)
+    return ' libvmaf ' in result.stdout
+
+
+def make_clip(source, path, duration):
+    """Render a lavfi source to a lossless H.264 reference clip"""
+    subprocess.run([
+        'ffmpeg', '-loglevel', 'error',
+        '-f', 'lavfi', '-i', source, '-t', str(duration),
+        '-c:v', 'libx264', '-preset', 'ultrafast', '-qp', '0', '-pix_fmt', 'yuv420p',
+        '-y', path
+    ], check=True)
+
+
+def quality_metrics(distorted, reference, vmaf=True):
+    """Return {'vmaf', 'ssim', 'psnr'} of distorted against reference (None if unavailable)"""
+    count = 3 if vmaf else 2
+    # Number frames on both sides so the filters compare frame n with frame n
+    # even when the containers use different timebases
+    graph = (f'[0:v]settb=AVTB,setpts=N,split={count}' + ''.join(f'[d{i}]' for i in range(count)) + ';'
+             f'[1:v]settb=AVTB,setpts=N,split={count}' + ''.join(f'[r{i}]' for i in range(count)) + ';'
+             '[d0][r0]ssim;[d1][r1]psnr')
+    if vmaf:
+        graph += ';[d2][r2]libvmaf'
+    result = subprocess.run([
+        'ffmpeg', '-hide_banner', '-nostats',
+        '-i', distorted, '-i', reference,
+        '-lavfi', graph, '-f', 'null', '-'
+    ], capture_output=True, text=True)
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()
+        raise RuntimeError(error[-1] if error else 'quality measurement failed')
+
+    metrics = {}
+    for key, pattern in (('vmaf', VMAF_RE), ('ssim', SSIM_RE), ('psnr', PSNR_RE)):
+        match = pattern.search(result.stderr)
+        metrics[key] = float(match.group(1)) if match else None
+    return metrics
+
+
+def run_suite(profiles, duration=10, threads=None, results_path=None):
+    """Encode every clip with every profile; returns a list of result dicts"""
+    vmaf = has_vmaf()
+    if not vmaf:
+        print("Note: ffmpeg has no libvmaf, reporting SSIM/PSNR only")
+
+    results = []
+    results_file = open(results_path, 'a', encoding='utf-8') if results_path else None
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for clip, source in CLIPS.items():
+                reference = os.path.join(tmp, f'{clip}.mkv')
+                print(f"Generating {duration}s '{clip}' clip...")
+                make_clip(source, reference, duration)
+
+                for profile in profiles:
+                    output = os.path.join(tmp, f'{clip}-{profile}.mp4')
+                    encoded = mp4_to_iphone_format.transcode(
+                        reference, output, threads, reencode=True, profile=profile)
+                    if not encoded['ok']:
+                        raise RuntimeError(f"{profile} failed on {clip}: {encoded['error']}")
+
+                    result = {
+                        'time': time.time(),
+                        'clip': clip,
+                        'profile': profile,
+                        'settings': mp4_to_iphone_format.PROFILES[profile],
+                        'threads': threads,
+                        'fps': encoded['fps'],
+                        'seconds': encoded['seconds'],
+                        'size': os.path.getsize(output),
+                        'kbps': os.path.getsize(output) * 8 / 1000 / duration,
+                    }
+                    result.update(quality_metrics(output, reference, vmaf))
+                    results.append(result)
+                    if results_file is not None:
+                        results_file.write(json.dumps(result) + '\n')
+                    print_row(result)
+                    os.remove(output)
+    finally:
+        if results_file is not None:
+            results_file.close()
+    return results
+
+
+def format_metric(value, digits):
+    return f'{value:.{digits}f}' if value is not None else '-'
+
+
+def print_row(result):
+    print(f"  {result['profile']:<10}{result['clip']:<12}{result['fps']:>8.1f} fps"
+          f"{result['kbps']:>9.0f} kb/s  VMAF {format_metric(result['vmaf'], 2):>6}"
+          f"  SSIM {format_metric(result['ssim'], 4):>6}  PSNR {format_metric(result['psnr'], 2):>6}")
+
+
+def summarize(results, profiles, min_vmaf=DEFAULT_MIN_VMAF, min_ssim=DEFAULT_MIN_SSIM):
+    """Print per-profile averages and return the fastest profile above the quality floor"""
+    use_vmaf = all(r['vmaf'] is not None for r in results)
+    metric, floor = ('vmaf', min_vmaf) if use_vmaf else ('ssim', min_ssim)
+
+    print("\n" + "=" * 60)
+    print(f"{'profile':<10}{'avg fps':>10}{'avg kb/s':>10}{'worst ' + metric.upper():>12}")
+    best = None
+    for profile in profiles:
+        rows = [r for r in results if r['profile'] == profile]
+        fps = sum(r['fps'] for r in rows) / len(rows)
+        kbps = sum(r['kbps'] for r in rows) / len(rows)
+        worst = min(r[metric] for r in rows)
+        passes = worst >= floor
+        print(f"{profile:<10}{fps:>10.1f}{kbps:>10.0f}{worst:>12.4g}  {'✓' if passes else '✗'}")
+        if passes and (best is None or fps > best[1]):
+            best = (profile, fps)
+    print("=" * 60)
+    if best is None:
+        print(f"No profile reaches {metric.upper()} >= {floor} on every clip")
+        return None
+    print(f"Fastest profile with {metric.upper()} >= {floor}: {best[0]} ({best[1]:.1f} fps)")
+    return best[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the encoder profiles')
+    parser.add_argument('--duration', type=int, default=10, help='seconds per test clip (default: 10)')
+    parser.add_argument('--profiles', default=','.join(mp4_to_iphone_format.PROFILES),
+                        help='comma-separated profiles to test (default: all)')
+    parser.add_argument('--threads', type=int, help='ffmpeg threads per encode (default: ffmpeg decides)')
+    parser.add_argument('--min-vmaf', type=float, default=DEFAULT_MIN_VMAF,
+                        help=f'quality floor when VMAF is available (default: {DEFAULT_MIN_VMAF})')
+    parser.add_argument('--min-ssim', type=float, default=DEFAULT_MIN_SSIM,
+                        help=f'quality floor without VMAF (default: {DEFAULT_MIN_SSIM})')
+    parser.add_argument('--results', help='append every measurement to this JSONL file')
+    options = parser.parse_args()
+
+    profiles = [p.strip() for p in options.profiles.split(',') if p.strip()]
+    try:
+        for profile in profiles:
+            mp4_to_iphone_format.get_profile(profile)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if not shutil.which('ffmpeg'):
+        print("Error: ffmpeg is required for the benchmark")
+        sys.exit(1)
+
+    try:
+        results = run_suite(profiles, options.duration, options.threads, options.results)
+    except (RuntimeError, subprocess.CalledProcessError) as e:
+        print(f"✗ Benchmark failed: {e}")
+        sys.exit(1)
+    summarize(results, profiles, options.min_vmaf, options.min_ssim)
+
+
+if __name__ == "__main__":
+    main()
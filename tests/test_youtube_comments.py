@@ -0,0 +1,483 @@
+"""
+Tests for youtube_comments, driven by a local fake of the discovery
+client's commentThreads/comments resources.
+
+Run from the repository root: python -m unittest discover tests
+"""
+
+import csv
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import youtube_comments
+
+BASE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+# Replies the API embeds in a commentThreads item
+EMBEDDED_REPLIES = 5
+
+
+class FakeApiError(Exception):
+    """Stands in for googleapiclient.errors.HttpError"""
+
+
+class FakeRequest:
+    def __init__(self, run):
+        self._run = run
+
+    def execute(self, num_retries=0):
+        return self._run()
+
+
+class FakeVideo:
+    """
+    Comment threads of one video. Thread k (0 = oldest) is published at
+    BASE_TIME + k // 2 seconds, so two threads share every second, and
+    has replies[k] replies.
+    """
+
+    def __init__(self, video_id, replies):
+        self.video_id = video_id
+        self.replies = list(replies)
+
+    def add_threads(self, replies):
+        """Post newer threads"""
+        self.replies.extend(replies)
+
+    def thread_id(self, k):
+        return f'{self.video_id}-t{k}'
+
+    @staticmethod
+    def snippet(comment_id, seconds):
+        published = (BASE_TIME + timedelta(seconds=seconds)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        return {'authorDisplayName': f'user {comment_id}', 'publishedAt': published,
+                'updatedAt': published, 'likeCount': len(comment_id) % 7,
+                'textDisplay': f'text of {comment_id}'}
+
+    def reply(self, k, j):
+        reply_id = f'{self.thread_id(k)}.r{j}'
+        return {'id': reply_id, 'snippet': self.snippet(reply_id, k // 2 + j)}
+
+    def thread(self, k):
+        thread_id = self.thread_id(k)
+        count = self.replies[k]
+        item = {'id': thread_id, 'snippet': {
+            'totalReplyCount': count,
+            'topLevelComment': {'id': thread_id, 'snippet': self.snippet(thread_id, k // 2)},
+        }}
+        if count:
+            item['replies'] = {'comments': [self.reply(k, j)
+                                            for j in range(min(count, EMBEDDED_REPLIES))]}
+        return item
+
+    def expected_ids(self):
+        """Every comment id, each thread followed by its replies, newest thread first"""
+        ids = []
+        for k in reversed(range(len(self.replies))):
+            ids.append(self.thread_id(k))
+            ids.extend(f'{self.thread_id(k)}.r{j}' for j in range(self.replies[k]))
+        return ids
+
+
+class FakeYouTube:
+    """
+    One fake API client. Like the real one it must not be shared across
+    threads; calls are counted on the shared FakeBackend.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.owner = threading.get_ident()
+
+    def _call(self, kind):
+        assert threading.get_ident() == self.owner, 'API client used from two threads'
+        self.backend.count(kind)
+
+    def commentThreads(self):
+        return FakeThreads(self)
+
+    def comments(self):
+        return FakeComments(self)
+
+
+class FakeThreads:
+    def __init__(self, client):
+        self.client = client
+
+    def list(self, part, videoId, maxResults, pageToken=None, order=None):
+        backend = self.client.backend
+
+        def run():
+            self.client._call('threads')
+            page = backend.calls['threads']
+            if backend.fail_on_page == page:
+                raise FakeApiError(f'HTTP 500 on threads page {page}')
+            video = backend.videos[videoId]
+            # Newest first, as with order=time
+            newest = len(video.replies) - 1
+            start = int(pageToken or 0)
+            end = min(start + maxResults, len(video.replies))
+            response = {'items': [video.thread(newest - i) for i in range(start, end)]}
+            if end < len(video.replies):
+                response['nextPageToken'] = str(end)
+            return response
+        return FakeRequest(run)
+
+
+class FakeComments:
+    def __init__(self, client):
+        self.client = client
+
+    def list(self, part, parentId, maxResults, pageToken=None):
+        backend = self.client.backend
+
+        def run():
+            self.client._call('replies')
+            video_id, k = parentId.rsplit('-t', 1)
+            video = backend.videos[video_id]
+            k = int(k)
+            start = int(pageToken or 0)
+            end = min(start + maxResults, video.replies[k])
+            response = {'items': [video.reply(k, j) for j in range(start, end)]}
+            if end < video.replies[k]:
+                response['nextPageToken'] = str(end)
+            return response
+        return FakeRequest(run)
+
+
+class FakeBackend:
+    """The videos served by the fake clients, and a count of calls by kind"""
+
+    def __init__(self, *videos):
+        self.videos = {video.video_id: video for video in videos}
+        self.fail_on_page = None
+        self.calls = {'threads': 0, 'replies': 0}
+        self._lock = threading.Lock()
+
+    def count(self, kind):
+        with self._lock:
+            self.calls[kind] += 1
+
+    def factory(self):
+        return FakeYouTube(self)
+
+
+def reply_counts(threads):
+    """Mostly a few embedded replies, with every 7th thread past one reply page"""
+    return [130 if k % 7 == 0 else k % 3 for k in range(threads)]
+
+
+def read_csv_ids(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader)
+        return [row[0] for row in reader]
+
+
+def read_rows(writer_class, path):
+    return [row for rows in writer_class.read(path) for row in rows]
+
+
+class StreamingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.video = FakeVideo('vid', reply_counts(250))
+        self.backend = FakeBackend(self.video)
+        self.services = youtube_comments.ServicePool(self.backend.factory)
+
+    def test_pages_are_yielded_one_by_one(self):
+        pages = list(youtube_comments.iter_comment_pages(self.services, 'vid'))
+        self.assertEqual(len(pages), 3)
+        self.assertEqual([token for _, token in pages], ['100', '200', None])
+        ids = [row['id'] for rows, _ in pages for row in rows]
+        self.assertEqual(ids, self.video.expected_ids())
+
+    def test_every_reply_is_fetched(self):
+        rows = list(youtube_comments.iter_comments(self.services, 'vid'))
+        replies = [row for row in rows if row['parent_id'] == 'vid-t0']
+        self.assertEqual(len(replies), 130)
+        self.assertEqual(len({row['id'] for row in replies}), 130)
+        # Threads with more replies than embedded need two comments().list pages each
+        fetched = sum(1 for count in self.video.replies if count > EMBEDDED_REPLIES)
+        self.assertEqual(self.backend.calls['replies'], fetched * 2)
+        for row in replies:
+            self.assertEqual(row['video_id'], 'vid')
+
+    def test_api_errors_reach_the_caller(self):
+        self.backend.fail_on_page = 2
+        pages = youtube_comments.iter_comment_pages(self.services, 'vid')
+        rows, _ = next(pages)
+        self.assertTrue(rows)
+        with self.assertRaises(FakeApiError):
+            next(pages)
+
+    def test_prefetch_is_bounded(self):
+        video = FakeVideo('long', [0] * 2000)
+        backend = FakeBackend(video)
+        services = youtube_comments.ServicePool(backend.factory)
+        pages = youtube_comments.iter_comment_pages(services, 'long', prefetch=2)
+        next(pages)
+        time.sleep(0.3)
+        # The page read, two queued, and at most one fetched and waiting for room
+        self.assertLessEqual(backend.calls['threads'], 4)
+        pages.close()
+        calls = backend.calls['threads']
+        time.sleep(0.2)
+        self.assertEqual(backend.calls['threads'], calls)
+
+    def test_without_prefetch_pages_are_fetched_on_demand(self):
+        pages = youtube_comments.iter_comment_pages(self.services, 'vid', prefetch=0)
+        next(pages)
+        time.sleep(0.1)
+        self.assertEqual(self.backend.calls['threads'], 1)
+        pages.close()
+
+
+class ExportTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = self._tmp.name
+        self.video = FakeVideo('vid', reply_counts(250))
+        self.backend = FakeBackend(self.video)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp, name)
+
+    def test_export_writes_every_comment(self):
+        output = self.path('vid.csv')
+        count = youtube_comments.export_video(self.backend.factory, 'vid', output)
+        self.assertEqual(count, len(self.video.expected_ids()))
+        self.assertEqual(read_csv_ids(output), self.video.expected_ids())
+        self.assertTrue(youtube_comments.load_checkpoint(output)['done'])
+
+    def test_resume_after_quota_cut(self):
+        output = self.path('vid.csv')
+        services = youtube_comments.ServicePool(
+            self.backend.factory, youtube_comments.QuotaLimiter(budget=40, rate=None))
+        with self.assertRaises(youtube_comments.QuotaExceeded):
+            youtube_comments.export_video(self.backend.factory, 'vid', output, services=services)
+        state = youtube_comments.load_checkpoint(output)
+        self.assertFalse(state['done'])
+        self.assertEqual(state['page_token'], '100')
+
+        count = youtube_comments.export_video(self.backend.factory, 'vid', output)
+        ids = read_csv_ids(output)
+        self.assertEqual(ids, self.video.expected_ids())
+        self.assertEqual(count, len(ids))
+
+    def test_resume_jsonl_after_api_error(self):
+        output = self.path('vid.jsonl')
+        self.backend.fail_on_page = 3
+        with self.assertRaises(FakeApiError):
+            youtube_comments.export_video(self.backend.factory, 'vid', output)
+        self.backend.fail_on_page = None
+        youtube_comments.export_video(self.backend.factory, 'vid', output)
+        with open(output, encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual([row['id'] for row in rows], self.video.expected_ids())
+        self.assertIsInstance(rows[0]['like_count'], int)
+
+    def test_export_many_stops_at_quota_and_resumes(self):
+        videos = [FakeVideo(f'v{i}', reply_counts(150)) for i in range(4)]
+        backend = FakeBackend(*videos)
+        video_ids = [video.video_id for video in videos]
+        quota = youtube_comments.QuotaLimiter(budget=40, rate=None)
+        counts, errors = youtube_comments.export_many(
+            backend.factory, video_ids, self.tmp, jobs=2, quota=quota)
+        self.assertTrue(errors)
+
+        counts, errors = youtube_comments.export_many(
+            backend.factory, video_ids, self.tmp, jobs=2, merged_output=self.path('all.csv'))
+        self.assertEqual(errors, {})
+        for video in videos:
+            output = self.path(f'{video.video_id}_comments.csv')
+            self.assertEqual(read_csv_ids(output), video.expected_ids())
+        self.assertEqual(len(read_csv_ids(self.path('all.csv'))),
+                         sum(len(video.expected_ids()) for video in videos))
+
+
+class SyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self._tmp.name, 'vid.csv')
+        self.video = FakeVideo('vid', reply_counts(250))
+        self.backend = FakeBackend(self.video)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def sync(self):
+        return youtube_comments.sync_video(self.backend.factory, 'vid', self.output)
+
+    def test_sync_appends_only_new_threads(self):
+        self.video = FakeVideo('vid', reply_counts(251))
+        self.backend = FakeBackend(self.video)
+        youtube_comments.export_video(self.backend.factory, 'vid', self.output)
+        exported = len(read_csv_ids(self.output))
+        # 251 threads leave the newest exported second half-filled, so the
+        # first new thread shares its timestamp with one already exported
+        self.video.add_threads(reply_counts(31))
+        calls = self.backend.calls['threads']
+        self.assertEqual(self.sync(), len(self.video.expected_ids()) - exported)
+        self.assertEqual(sorted(read_csv_ids(self.output)), sorted(self.video.expected_ids()))
+        self.assertEqual(self.backend.calls['threads'] - calls, 1)
+
+    def test_sync_without_changes_costs_one_call(self):
+        youtube_comments.export_video(self.backend.factory, 'vid', self.output)
+        before = read_csv_ids(self.output)
+        calls = dict(self.backend.calls)
+        self.assertEqual(self.sync(), 0)
+        self.assertEqual(self.backend.calls['threads'] - calls['threads'], 1)
+        self.assertEqual(self.backend.calls['replies'], calls['replies'])
+        self.assertEqual(read_csv_ids(self.output), before)
+
+    def test_sync_without_export_runs_a_full_one(self):
+        self.assertEqual(self.sync(), len(self.video.expected_ids()))
+        self.assertEqual(read_csv_ids(self.output), self.video.expected_ids())
+
+    def test_repeated_syncs_keep_every_comment_once(self):
+        youtube_comments.export_video(self.backend.factory, 'vid', self.output)
+        for threads in (1, 2, 150, 0, 3):
+            self.video.add_threads(reply_counts(threads))
+            self.sync()
+        ids = read_csv_ids(self.output)
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(sorted(ids), sorted(self.video.expected_ids()))
+
+
+class SqliteTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self._tmp.name, 'vid.sqlite')
+        self.video = FakeVideo('vid', reply_counts(250))
+        self.backend = FakeBackend(self.video)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def read_ids(self):
+        return [row['id'] for row in read_rows(youtube_comments.SqliteWriter, self.output)]
+
+    def test_resume_drops_rows_after_checkpoint(self):
+        rows = list(youtube_comments.iter_comments(
+            youtube_comments.ServicePool(self.backend.factory), 'vid'))
+        writer = youtube_comments.SqliteWriter(self.output)
+        writer.write(rows[:100])
+        position = writer.checkpoint()
+        self.assertEqual(position, 100)
+        # Written but never checkpointed, as when an export dies mid-page
+        writer.write(rows[100:150])
+        writer.close()
+
+        writer = youtube_comments.SqliteWriter(self.output, resume_at=position)
+        self.assertEqual(self.read_ids(), [row['id'] for row in rows[:100]])
+        writer.write(rows[100:])
+        self.assertEqual(writer.checkpoint(), len(rows))
+        writer.close()
+        self.assertEqual(self.read_ids(), self.video.expected_ids())
+
+    def test_resume_after_api_error(self):
+        self.backend.fail_on_page = 3
+        with self.assertRaises(FakeApiError):
+            youtube_comments.export_video(self.backend.factory, 'vid', self.output)
+        state = youtube_comments.load_checkpoint(self.output)
+        self.assertEqual(state['position'], len(self.read_ids()))
+
+        self.backend.fail_on_page = None
+        youtube_comments.export_video(self.backend.factory, 'vid', self.output)
+        self.assertEqual(self.read_ids(), self.video.expected_ids())
+        row = read_rows(youtube_comments.SqliteWriter, self.output)[0]
+        self.assertEqual(row['published_at'], '2024-01-01 00:02:04')
+        self.assertIsInstance(row['like_count'], int)
+
+    def test_sync_round_trip(self):
+        youtube_comments.export_video(self.backend.factory, 'vid', self.output)
+        for threads in (3, 120):
+            self.video.add_threads(reply_counts(threads))
+            self.assertGreater(youtube_comments.sync_video(self.backend.factory, 'vid', self.output), 0)
+        self.assertEqual(youtube_comments.sync_video(self.backend.factory, 'vid', self.output), 0)
+        ids = self.read_ids()
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(sorted(ids), sorted(self.video.expected_ids()))
+        state = youtube_comments.load_checkpoint(self.output)
+        self.assertEqual(state['position'], len(ids))
+        self.assertEqual(state['count'], len(ids))
+
+
+@unittest.skipIf(youtube_comments.pyarrow is None, 'pyarrow is not installed')
+class ColumnarTest(unittest.TestCase):
+
+    FORMATS = ('parquet', 'arrow')
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.video = FakeVideo('vid', reply_counts(250))
+        self.backend = FakeBackend(self.video)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def output(self, output_format):
+        return os.path.join(self._tmp.name, 'vid' + youtube_comments.WRITERS[output_format][1])
+
+    def read_ids(self, output_format):
+        writer_class = youtube_comments.get_writer(output_format)
+        return [row['id'] for row in read_rows(writer_class, self.output(output_format))]
+
+    def test_export_keeps_typed_columns(self):
+        for output_format in self.FORMATS:
+            with self.subTest(output_format=output_format):
+                output = self.output(output_format)
+                youtube_comments.export_video(self.backend.factory, 'vid', output)
+                rows = read_rows(youtube_comments.get_writer(output_format), output)
+                self.assertEqual([row['id'] for row in rows], self.video.expected_ids())
+                self.assertEqual(rows[0]['published_at'], BASE_TIME + timedelta(seconds=124))
+                self.assertIsInstance(rows[0]['like_count'], int)
+                for row in rows:
+                    self.assertEqual(row['parent_id'], row['id'].rpartition('.r')[0] or None)
+                self.assertFalse(os.path.exists(output + '.part'))
+
+    def test_interrupted_export_starts_over(self):
+        for output_format in self.FORMATS:
+            with self.subTest(output_format=output_format):
+                output = self.output(output_format)
+                self.backend.fail_on_page = self.backend.calls['threads'] + 3
+                with self.assertRaises(FakeApiError):
+                    youtube_comments.export_video(self.backend.factory, 'vid', output)
+                self.backend.fail_on_page = None
+                youtube_comments.export_video(self.backend.factory, 'vid', output)
+                self.assertEqual(self.read_ids(output_format), self.video.expected_ids())
+
+    def test_sync_rewrites_the_file(self):
+        for output_format in self.FORMATS:
+            with self.subTest(output_format=output_format):
+                video = FakeVideo('vid', reply_counts(250))
+                backend = FakeBackend(video)
+                output = self.output(output_format)
+                youtube_comments.export_video(backend.factory, 'vid', output)
+                video.add_threads(reply_counts(40))
+                added = youtube_comments.sync_video(backend.factory, 'vid', output)
+                ids = self.read_ids(output_format)
+                self.assertEqual(len(ids), len(set(ids)))
+                self.assertEqual(sorted(ids), sorted(video.expected_ids()))
+                self.assertEqual(youtube_comments.load_checkpoint(output)['count'], len(ids))
+                self.assertGreater(added, 0)
+                self.assertFalse(os.path.exists(output + '.part'))
+
+
+if __name__ == '__main__':
+    unittest.main()
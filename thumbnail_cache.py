@@ -0,0 +1,197 @@
+"""
+Thumbnail Cache
+Local proxy for YouTube thumbnails. Images are fetched once over the
+shared keep-alive client, shrunk to the size of a result card (when
+Pillow is installed) and kept in a size-bounded LRU directory, so result
+pages load their thumbnails from disk instead of the CDN every time.
+"""
+
+import http.client
+import io
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import http_client
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Default location of the cached thumbnails
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'noad', 'thumbs')
+
+# Total size of the cache directory before the least recently used images go
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Cards are 180 px tall; 2x for HiDPI screens
+THUMB_SIZE = (640, 360)
+
+# Thumbnails fetched at once when a result page is warmed
+WARM_WORKERS = 6
+
+# Large 16:9 source to downscale, then the card-sized one (also used without Pillow)
+SOURCE_URLS = (
+    'https://i.ytimg.com/vi/{id}/hq720.jpg',
+    'https://i.ytimg.com/vi/{id}/mqdefault.jpg',
+)
+
+VIDEO_ID_RE = re.compile(r'^[0-9A-Za-z_-]{11}$')
+
+
+class ThumbnailError(Exception):
+    """Raised when no thumbnail could be fetched for a video"""
+
+
+def downscale(data, size=THUMB_SIZE):
+    """Shrink an image to fit size as a progressive JPEG; returns data unchanged without Pillow"""
+    if Image is None:
+        return data
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.width <= size[0] and image.height <= size[1]:
+                return data
+            image = image.convert('RGB')
+            image.thumbnail(size, Image.LANCZOS)
+            output = io.BytesIO()
+            image.save(output, 'JPEG', quality=82, optimize=True, progressive=True)
+            return output.getvalue()
+    except OSError:
+        return data
+
+
+class ThumbnailCache:
+    """Disk LRU of card-sized thumbnails keyed by video id; thread-safe"""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES,
+                 sources=None, workers=WARM_WORKERS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # Without Pillow the large source would be served as-is, so skip it
+        self.sources = sources or (SOURCE_URLS if Image is not None else SOURCE_URLS[1:])
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._inflight = {}  # video id -> Future shared by concurrent callers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='thumbs')
+
+        # Rebuild the LRU order from the files' modification times; get()
+        # touches a file on every hit, so its mtime is its last use
+        os.makedirs(directory, exist_ok=True)
+        files = []
+        for entry in os.scandir(directory):
+            if entry.is_file() and entry.name.endswith('.jpg'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        self._sizes = OrderedDict((video_id, size) for _, video_id, size in sorted(files))
+        self._total = sum(self._sizes.values())
+
+    def path_for(self, video_id):
+        return os.path.join(self.directory, f'{video_id}.jpg')
+
+    def get(self, video_id):
+        """Return the JPEG bytes for a video, fetching them on a miss"""
+        if not VIDEO_ID_RE.match(video_id):
+            raise ValueError(f'Invalid video id: {video_id!r}')
+
+        with self._lock:
+            cached = video_id in self._sizes
+            if cached:
+                self._sizes.move_to_end(video_id)
+                self.hits += 1
+        if cached:
+            try:
+                with open(self.path_for(video_id), 'rb') as f:
+                    data = f.read()
+                os.utime(self.path_for(video_id))
+                return data
+            except OSError:
+                with self._lock:
+                    self._total -= self._sizes.pop(video_id, 0)
+
+        with self._lock:
+            future = self._inflight.get(video_id)
+            owner = future is None
+            if owner:
+                future = self._inflight[video_id] = Future()
+                self.misses += 1
+        if not owner:
+            return future.result()
+
+        try:
+            data = downscale(self._fetch(video_id))
+            self._store(video_id, data)
+            future.set_result(data)
+            return data
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(video_id, None)
+
+    def _fetch(self, video_id):
+        client = http_client.shared_client()
+        errors = []
+        for source in self.sources:
+            url = source.format(id=video_id)
+            try:
+                with client.get(url) as response:
+                    data = response.read()
+                    if response.status == 200 and data:
+                        return data
+                    errors.append(f'HTTP {response.status} for {url}')
+            except (http.client.HTTPException, OSError) as e:
+                errors.append(f'{url}: {e}')
+        raise ThumbnailError('; '.join(errors))
+
+    def _store(self, video_id, data):
+        # Write to a temporary file and rename, so a reader never sees half an image
+        path = self.path_for(video_id)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        evicted = []
+        with self._lock:
+            self._total += len(data) - self._sizes.pop(video_id, 0)
+            self._sizes[video_id] = len(data)
+            while self._total > self.max_bytes and len(self._sizes) > 1:
+                old_id, size = self._sizes.popitem(last=False)
+                self._total -= size
+                evicted.append(old_id)
+        for old_id in evicted:
+            try:
+                os.remove(self.path_for(old_id))
+            except OSError:
+                pass
+
+    def warm(self, video_ids):
+        """Fetch thumbnails in the background so the browser's requests hit the cache"""
+        for video_id in video_ids:
+            if VIDEO_ID_RE.match(video_id or ''):
+                self._executor.submit(self._warm_one, video_id)
+
+    def _warm_one(self, video_id):
+        # Already cached: nothing to fetch, and no hit to count
+        with self._lock:
+            if video_id in self._sizes:
+                return
+        try:
+            self.get(video_id)
+        except (ThumbnailError, OSError):
+            pass  # The browser's own request will report it
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._sizes),
+                'bytes': self._total,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
@@ -0,0 +1,837 @@
+"""
+YouTube Comments
+Streaming comment exporter for the YouTube Data API. Thread pages are
+fetched ahead of the writer in a background thread, full reply lists are
+fetched with comments().list(parentId=...) in a small pool, and rows are
+written as they arrive, so memory stays flat however many comments a
+video has.
+
+Many videos (or a whole channel) can be exported at once under one
+shared API quota budget, with a checkpoint per video so an interrupted
+export resumes from its last written page.
+
+An incremental sync requests threads newest first (order=time) and
+stops at the first page that reaches comments already exported, so a
+refresh costs a call or two instead of a full re-export.
+
+Output is CSV by default; JSONL, SQLite, Parquet and Arrow writers keep
+typed columns (UTC timestamps, integer like counts, the parent comment
+of replies) so the exports load straight into pandas or duckdb.
+
+The API client is passed in as a factory: discovery clients are not
+thread-safe, so every worker thread builds its own.
+"""
+
+import csv
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Maximum page size the API allows for commentThreads and comments
+PAGE_SIZE = 100
+
+# Thread pages fetched ahead of the writer
+PREFETCH_PAGES = 2
+
+# Threads whose full reply list is fetched at once
+REPLY_WORKERS = 4
+
+# Retries for transient API errors (5xx, rate limits), with backoff
+NUM_RETRIES = 3
+
+# Default API budget: the daily quota of a new project, and requests per second
+DEFAULT_QUOTA = 10000
+DEFAULT_RATE = 10.0
+
+# Videos exported at once in batch mode
+DEFAULT_JOBS = 3
+
+CSV_HEADER = ['Comment ID', 'Author', 'Published At', 'Updated At', 'Like Count', 'Text']
+
+# Columns of the typed formats (JSONL, SQLite, Parquet, Arrow)
+COLUMNS = ['video_id', 'id', 'parent_id', 'author', 'published_at', 'updated_at',
+           'like_count', 'text']
+
+# Rows buffered per Arrow record batch (and Parquet row group)
+BATCH_ROWS = 50000
+
+
+class QuotaExceeded(Exception):
+    """Raised when the run's API unit budget is used up"""
+
+
+class QuotaLimiter:
+    """Shared API budget: a unit limit for the run and a request rate limit
+
+    Every list call used here costs 1 unit. acquire() blocks to keep the
+    request rate (token bucket) and raises QuotaExceeded past the budget.
+    """
+
+    def __init__(self, budget=DEFAULT_QUOTA, rate=DEFAULT_RATE):
+        self.budget = budget
+        self.rate = rate
+        self.used = 0
+        self._tokens = rate
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, units=1):
+        with self._lock:
+            if self.budget is not None and self.used + units > self.budget:
+                raise QuotaExceeded(f'API quota budget of {self.budget} units used up')
+            self.used += units
+            if not self.rate:
+                return
+            now = time.monotonic()
+            self._tokens = min(self.rate, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class ServicePool:
+    """One API client per thread, built on first use, sharing one quota"""
+
+    def __init__(self, factory, quota=None):
+        self._factory = factory
+        self._local = threading.local()
+        self.quota = quota
+
+    def get(self):
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = self._local.service = self._factory()
+        return service
+
+    def execute(self, request, units=1):
+        if self.quota is not None:
+            self.quota.acquire(units)
+        return request.execute(num_retries=NUM_RETRIES)
+
+
+def list_threads(service, video_id, page_token=None, **params):
+    """Build a commentThreads().list request for one page"""
+    if page_token:
+        params['pageToken'] = page_token
+    return service.commentThreads().list(
+        part='snippet,replies', videoId=video_id, maxResults=PAGE_SIZE, **params)
+
+
+def iter_thread_pages(services, video_id, page_token=None, **params):
+    """Fetch commentThreads pages one after another"""
+    while True:
+        response = services.execute(list_threads(services.get(), video_id, page_token, **params))
+        yield response
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+_DONE = object()
+
+
+class PagePrefetcher:
+    """Iterate over commentThreads pages while the next ones are fetched"""
+
+    def __init__(self, services, video_id, page_token=None, prefetch=PREFETCH_PAGES, **params):
+        self._queue = queue.Queue(maxsize=prefetch)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(services, video_id, page_token, params), daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        # Give up when the reader has stopped, instead of blocking on a full queue
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self, services, video_id, page_token, params):
+        try:
+            for response in iter_thread_pages(services, video_id, page_token, **params):
+                if not self._put(response):
+                    return
+        except Exception as e:
+            self._put(_Failure(e))
+            return
+        self._put(_DONE)
+
+    def __iter__(self):
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+
+    def close(self):
+        """Stop fetching; safe to call before the last page was read"""
+        self._stop.set()
+        self._thread.join()
+
+
+def fetch_replies(services, parent_id):
+    """Fetch every reply to a thread, not just the few embedded in it"""
+    replies = []
+    page_token = None
+    while True:
+        params = {'pageToken': page_token} if page_token else {}
+        response = services.execute(services.get().comments().list(
+            part='snippet', parentId=parent_id, maxResults=PAGE_SIZE, **params))
+        replies.extend(response.get('items', []))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return replies
+
+
+def comment_row(comment, parent_id=None, video_id=None):
+    """Flatten one comment resource into a row dict"""
+    snippet = comment['snippet']
+    return {
+        'video_id': video_id,
+        'id': comment['id'],
+        'parent_id': parent_id,
+        'author': snippet.get('authorDisplayName'),
+        'published_at': snippet.get('publishedAt'),
+        'updated_at': snippet.get('updatedAt'),
+        'like_count': snippet.get('likeCount', 0),
+        'text': snippet.get('textDisplay'),
+    }
+
+
+def needs_reply_fetch(item):
+    """The API embeds at most a few replies per thread"""
+    embedded = len(item.get('replies', {}).get('comments', []))
+    return item['snippet'].get('totalReplyCount', 0) > embedded
+
+
+def iter_comment_pages(services, video_id, page_token=None, reply_workers=REPLY_WORKERS,
+                       prefetch=PREFETCH_PAGES, select=None, **params):
+    """
+    Yield (rows, next_page_token) per commentThreads page, starting at
+    page_token. rows hold each top-level comment followed by all of its
+    replies; next_page_token is None after the last page. select(item)
+    can skip threads (and their reply fetches); params go to the list call.
+    With prefetch=0 pages are only fetched when asked for.
+    """
+    if prefetch:
+        pages = PagePrefetcher(services, video_id, page_token, prefetch=prefetch, **params)
+    else:
+        pages = iter_thread_pages(services, video_id, page_token, **params)
+    executor = ThreadPoolExecutor(max_workers=reply_workers)
+    try:
+        for response in pages:
+            items = response.get('items', [])
+            if select is not None:
+                items = [item for item in items if select(item)]
+            # Start the reply fetches for the whole page before writing any of it
+            futures = {
+                item['id']: executor.submit(fetch_replies, services, item['id'])
+                for item in items if needs_reply_fetch(item)
+            }
+            rows = []
+            for item in items:
+                top = item['snippet']['topLevelComment']
+                rows.append(comment_row(top, video_id=video_id))
+                if item['id'] in futures:
+                    replies = futures.pop(item['id']).result()
+                else:
+                    replies = item.get('replies', {}).get('comments', [])
+                rows.extend(comment_row(reply, parent_id=item['id'], video_id=video_id)
+                            for reply in replies)
+            yield rows, response.get('nextPageToken')
+    finally:
+        pages.close()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_comments(services, video_id, reply_workers=REPLY_WORKERS, prefetch=PREFETCH_PAGES):
+    """Yield row dicts for every comment of a video"""
+    for rows, _ in iter_comment_pages(services, video_id, None, reply_workers, prefetch):
+        yield from rows
+
+
+def parse_timestamp(value):
+    """Parse an API timestamp ('2024-05-01T12:34:56Z') into a UTC datetime"""
+    if value is None or isinstance(value, datetime):
+        return value
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def typed_row(row):
+    """Row dict with COLUMNS: datetimes for the timestamps and an int like count"""
+    return {
+        'video_id': row.get('video_id'),
+        'id': row['id'],
+        'parent_id': row.get('parent_id'),
+        'author': row.get('author'),
+        'published_at': parse_timestamp(row.get('published_at')),
+        'updated_at': parse_timestamp(row.get('updated_at')),
+        'like_count': int(row.get('like_count') or 0),
+        'text': row.get('text'),
+    }
+
+
+class CsvWriter:
+    """CSV output that can be reopened at a checkpoint to resume"""
+
+    resumable = True
+
+    def __init__(self, path, resume_at=None):
+        self.path = path
+        if resume_at is None:
+            self._file = open(path, 'w', newline='', encoding='utf-8')
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(CSV_HEADER)
+        else:
+            # Drop anything written after the checkpoint, then append
+            self._file = open(path, 'r+', newline='', encoding='utf-8')
+            self._file.truncate(resume_at)
+            self._file.seek(resume_at)
+            self._writer = csv.writer(self._file)
+
+    def write(self, rows):
+        for row in rows:
+            self._writer.writerow([
+                row['id'],
+                row['author'],
+                row['published_at'],
+                row['updated_at'],
+                row['like_count'],
+                row['text'],
+            ])
+
+    def checkpoint(self):
+        """Flush and return the position to resume from"""
+        self._file.flush()
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlWriter:
+    """One JSON object per line, timestamps in ISO 8601 UTC; resumable like CSV"""
+
+    resumable = True
+
+    def __init__(self, path, resume_at=None):
+        self.path = path
+        if resume_at is None:
+            self._file = open(path, 'w', encoding='utf-8')
+        else:
+            self._file = open(path, 'r+', encoding='utf-8')
+            self._file.truncate(resume_at)
+            self._file.seek(resume_at)
+
+    def write(self, rows):
+        for row in rows:
+            row = typed_row(row)
+            for key in ('published_at', 'updated_at'):
+                if row[key] is not None:
+                    row[key] = row[key].isoformat().replace('+00:00', 'Z')
+            self._file.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+    def checkpoint(self):
+        self._file.flush()
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+    @staticmethod
+    def read(path):
+        """Yield lists of row dicts from a JSONL export"""
+        with open(path, encoding='utf-8') as f:
+            rows = []
+            for line in f:
+                rows.append(json.loads(line))
+                if len(rows) >= BATCH_ROWS:
+                    yield rows
+                    rows = []
+            if rows:
+                yield rows
+
+
+class SqliteWriter:
+    """
+    A 'comments' table in an SQLite database. Timestamps are stored as
+    'YYYY-MM-DD HH:MM:SS' UTC text in TIMESTAMP columns. A checkpoint
+    commits and returns the last rowid; resuming deletes later rows.
+    """
+
+    resumable = True
+
+    SCHEMA = '''CREATE TABLE comments (
+        video_id TEXT,
+        id TEXT NOT NULL,
+        parent_id TEXT,
+        author TEXT,
+        published_at TIMESTAMP,
+        updated_at TIMESTAMP,
+        like_count INTEGER NOT NULL,
+        text TEXT
+    )'''
+
+    def __init__(self, path, resume_at=None):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        if resume_at is None:
+            self._db.execute('DROP TABLE IF EXISTS comments')
+            self._db.execute(self.SCHEMA)
+        else:
+            self._db.execute('DELETE FROM comments WHERE rowid > ?', (resume_at,))
+        self._db.commit()
+
+    @staticmethod
+    def _value(value):
+        if isinstance(value, datetime):
+            return value.strftime('%Y-%m-%d %H:%M:%S')
+        return value
+
+    def write(self, rows):
+        self._db.executemany(
+            f"INSERT INTO comments ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+            ([self._value(value) for value in typed_row(row).values()] for row in rows))
+
+    def checkpoint(self):
+        self._db.commit()
+        return self._db.execute('SELECT COALESCE(MAX(rowid), 0) FROM comments').fetchone()[0]
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+
+    @staticmethod
+    def read(path):
+        """Yield lists of row dicts from an SQLite export"""
+        db = sqlite3.connect(path)
+        try:
+            cursor = db.execute(f"SELECT {', '.join(COLUMNS)} FROM comments ORDER BY rowid")
+            while True:
+                rows = cursor.fetchmany(BATCH_ROWS)
+                if not rows:
+                    return
+                yield [dict(zip(COLUMNS, row)) for row in rows]
+        finally:
+            db.close()
+
+
+def arrow_schema():
+    return pyarrow.schema([
+        ('video_id', pyarrow.string()),
+        ('id', pyarrow.string()),
+        ('parent_id', pyarrow.string()),
+        ('author', pyarrow.string()),
+        ('published_at', pyarrow.timestamp('s', tz='UTC')),
+        ('updated_at', pyarrow.timestamp('s', tz='UTC')),
+        ('like_count', pyarrow.int64()),
+        ('text', pyarrow.string()),
+    ])
+
+
+class _ArrowWriter:
+    """
+    Buffers rows into Arrow record batches of BATCH_ROWS. The file is
+    written as <path>.part and renamed on close, because a columnar file
+    is only readable once its footer is written; these formats cannot be
+    appended to, so an interrupted export starts over instead of resuming.
+    """
+
+    resumable = False
+
+    def __init__(self, path, resume_at=None):
+        self.path = path
+        self.schema = arrow_schema()
+        self._rows = []
+        self._count = 0
+        self._writer = self._open(path + '.part')
+
+    def write(self, rows):
+        self._rows.extend(typed_row(row) for row in rows)
+        if len(self._rows) >= BATCH_ROWS:
+            self._flush()
+
+    def _flush(self):
+        if self._rows:
+            self._writer.write_batch(pyarrow.RecordBatch.from_pylist(self._rows, schema=self.schema))
+            self._count += len(self._rows)
+            self._rows = []
+
+    def checkpoint(self):
+        return self._count + len(self._rows)
+
+    def close(self):
+        if self._writer is None:
+            return
+        self._flush()
+        self._writer.close()
+        self._writer = None
+        os.replace(self.path + '.part', self.path)
+
+    def discard(self):
+        """Close without replacing the existing file"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            os.remove(self.path + '.part')
+
+
+class ParquetWriter(_ArrowWriter):
+    """Parquet file, zstd-compressed, one row group per record batch"""
+
+    def _open(self, path):
+        return pyarrow.parquet.ParquetWriter(path, self.schema, compression='zstd')
+
+    @staticmethod
+    def read(path):
+        """Yield lists of row dicts from a Parquet export"""
+        for batch in pyarrow.parquet.ParquetFile(path).iter_batches(batch_size=BATCH_ROWS):
+            yield batch.to_pylist()
+
+
+class ArrowWriter(_ArrowWriter):
+    """Arrow IPC file (Feather v2), for zero-copy loading with memory mapping"""
+
+    def _open(self, path):
+        return pyarrow.ipc.new_file(path, self.schema)
+
+    @staticmethod
+    def read(path):
+        """Yield lists of row dicts from an Arrow export"""
+        with pyarrow.memory_map(path) as source:
+            reader = pyarrow.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i).to_pylist()
+
+
+# Output formats: writer class and file extension
+WRITERS = {
+    'csv': (CsvWriter, '.csv'),
+    'jsonl': (JsonlWriter, '.jsonl'),
+    'sqlite': (SqliteWriter, '.sqlite'),
+    'parquet': (ParquetWriter, '.parquet'),
+    'arrow': (ArrowWriter, '.arrow'),
+}
+
+# Other extensions that select a format
+EXTENSION_FORMATS = {'.ndjson': 'jsonl', '.db': 'sqlite', '.sqlite3': 'sqlite', '.feather': 'arrow'}
+
+
+def output_format_for(path):
+    """Guess the output format from a file name; CSV if unknown"""
+    extension = os.path.splitext(path)[1].lower()
+    for name, (_, format_extension) in WRITERS.items():
+        if extension == format_extension:
+            return name
+    return EXTENSION_FORMATS.get(extension, 'csv')
+
+
+def get_writer(output_format):
+    """Return the writer class of an output format; raises ValueError if unknown"""
+    if output_format not in WRITERS:
+        raise ValueError(f"Unknown output format '{output_format}' "
+                         f"(choose from {', '.join(WRITERS)})")
+    writer_class = WRITERS[output_format][0]
+    if issubclass(writer_class, _ArrowWriter) and pyarrow is None:
+        raise RuntimeError(f'pyarrow is required for {output_format} output (pip install pyarrow)')
+    return writer_class
+
+
+def checkpoint_path(output_file):
+    return output_file + '.checkpoint.json'
+
+
+def load_checkpoint(output_file):
+    """Return the saved checkpoint for an output file, or None"""
+    try:
+        with open(checkpoint_path(output_file), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_checkpoint(output_file, state):
+    # Write to a temporary file and rename, so a crash never leaves half a checkpoint
+    path = checkpoint_path(output_file)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(path + '.tmp', path)
+
+
+def export_video(service_factory, video_id, output_file, reply_workers=REPLY_WORKERS,
+                 prefetch=PREFETCH_PAGES, services=None, resume=True, skip_done=False,
+                 output_format=None):
+    """
+    Export every comment of one video to a file; returns the count.
+
+    output_format is a WRITERS key, guessed from the file name if None.
+    After every page a checkpoint (output_file + '.checkpoint.json')
+    records the next page token and the file position, so a failed or
+    interrupted export continues where it stopped when run again (Parquet
+    and Arrow exports start over instead). A finished export is started
+    over, or kept as-is with skip_done.
+    """
+    writer_class = get_writer(output_format or output_format_for(output_file))
+    services = services or ServicePool(service_factory)
+    state = load_checkpoint(output_file) if resume else None
+    if state is not None and state.get('done'):
+        if skip_done and os.path.exists(output_file):
+            return state['count']
+        state = None
+    if state is not None and writer_class.resumable and os.path.exists(output_file):
+        writer = writer_class(output_file, resume_at=state['position'])
+    else:
+        state = None
+        writer = writer_class(output_file)
+
+    state = state or {'video_id': video_id, 'page_token': None, 'count': 0, 'done': False,
+                      'high_water': None}
+    try:
+        for rows, next_token in iter_comment_pages(services, video_id, state['page_token'],
+                                                   reply_workers, prefetch, order='time'):
+            writer.write(rows)
+            state.update(page_token=next_token, count=state['count'] + len(rows),
+                         position=writer.checkpoint(), done=next_token is None)
+            # Checkpoints from before sync existed lack the mark; those get a full export
+            if 'high_water' in state:
+                state['high_water'] = high_water(rows, state['high_water'])
+            save_checkpoint(output_file, state)
+    finally:
+        writer.close()
+    return state['count']
+
+
+def high_water(rows, mark=None):
+    """
+    Advance a high-water mark over rows: the latest top-level publishedAt
+    and the IDs of the threads published at exactly that second.
+    """
+    latest = parse_timestamp(mark['published_at']) if mark else None
+    ids = set(mark['ids']) if mark else set()
+    for row in rows:
+        if row['parent_id'] is not None or not row['published_at']:
+            continue
+        published = parse_timestamp(row['published_at'])
+        if latest is None or published > latest:
+            latest, ids = published, {row['id']}
+        elif published == latest:
+            ids.add(row['id'])
+    if latest is None:
+        return mark
+    return {'published_at': latest.isoformat(), 'ids': sorted(ids)}
+
+
+def is_new_thread(item, mark):
+    """Whether a commentThreads item was published after the high-water mark"""
+    published = parse_timestamp(item['snippet']['topLevelComment']['snippet']['publishedAt'])
+    latest = parse_timestamp(mark['published_at'])
+    return published > latest or (published == latest and item['id'] not in mark['ids'])
+
+
+def sync_video(service_factory, video_id, output_file, reply_workers=REPLY_WORKERS,
+               prefetch=0, services=None, output_format=None):
+    """
+    Add the threads published since the last export; returns how many
+    comments were added.
+
+    Threads are requested newest first and paging stops after the first
+    page that reaches the high-water mark saved in the checkpoint. The new
+    rows are appended to the existing file (Parquet and Arrow files are
+    rewritten). Pages are not prefetched by default, since a page fetched
+    past the mark is wasted quota. Videos without a finished export get a
+    full one (with prefetch). New
+    replies to threads exported earlier and comment edits are not
+    picked up; a full export (--restart) refreshes those.
+    """
+    writer_class = get_writer(output_format or output_format_for(output_file))
+    services = services or ServicePool(service_factory)
+    state = load_checkpoint(output_file)
+    if (state is None or not state.get('done') or not state.get('high_water')
+            or not os.path.exists(output_file)):
+        return export_video(service_factory, video_id, output_file, reply_workers,
+                            prefetch or PREFETCH_PAGES, services, output_format=output_format)
+
+    mark = state['high_water']
+    reached = False
+
+    def select(item):
+        nonlocal reached
+        if is_new_thread(item, mark):
+            return True
+        reached = True
+        return False
+
+    # Deltas are small, so collect them and only touch the file once paging succeeded
+    new_rows = []
+    for rows, _ in iter_comment_pages(services, video_id, None, reply_workers, prefetch,
+                                      select=select, order='time'):
+        new_rows.extend(rows)
+        if reached:
+            break
+    if not new_rows:
+        return 0
+
+    if writer_class.resumable:
+        writer = writer_class(output_file, resume_at=state['position'])
+        try:
+            writer.write(new_rows)
+            position = writer.checkpoint()
+        finally:
+            writer.close()
+    else:
+        writer = writer_class(output_file)
+        try:
+            for rows in writer_class.read(output_file):
+                writer.write(rows)
+            writer.write(new_rows)
+            position = writer.checkpoint()
+        except BaseException:
+            writer.discard()
+            raise
+        writer.close()
+
+    state.update(count=state['count'] + len(new_rows), position=position,
+                 high_water=high_water(new_rows, mark))
+    save_checkpoint(output_file, state)
+    return len(new_rows)
+
+
+def channel_video_ids(services, channel_id):
+    """List every upload of a channel through its uploads playlist"""
+    response = services.execute(services.get().channels().list(
+        part='contentDetails', id=channel_id))
+    items = response.get('items', [])
+    if not items:
+        raise ValueError(f'Channel not found: {channel_id}')
+    playlist_id = items[0]['contentDetails']['relatedPlaylists']['uploads']
+
+    video_ids = []
+    page_token = None
+    while True:
+        params = {'pageToken': page_token} if page_token else {}
+        response = services.execute(services.get().playlistItems().list(
+            part='contentDetails', playlistId=playlist_id, maxResults=50, **params))
+        video_ids.extend(item['contentDetails']['videoId'] for item in response.get('items', []))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return video_ids
+
+
+def merge_csv(parts, output_file):
+    """Concatenate per-video CSVs into one file with a leading Video ID column"""
+    count = 0
+    with open(output_file, 'w', newline='', encoding='utf-8') as out:
+        writer = csv.writer(out)
+        writer.writerow(['Video ID'] + CSV_HEADER)
+        for video_id, path in parts:
+            with open(path, newline='', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                for row in reader:
+                    writer.writerow([video_id] + row)
+                    count += 1
+    return count
+
+
+def merge_outputs(parts, output_file, output_format='csv'):
+    """Combine per-video exports of one format into a single file; returns the row count"""
+    if output_format == 'csv':
+        return merge_csv(parts, output_file)
+    writer_class = get_writer(output_format)
+    writer = writer_class(output_file)
+    count = 0
+    try:
+        for video_id, path in parts:
+            for rows in writer_class.read(path):
+                writer.write(rows)
+                count += len(rows)
+    finally:
+        writer.close()
+    return count
+
+
+def export_many(service_factory, video_ids, output_dir='.', jobs=DEFAULT_JOBS,
+                quota=None, merged_output=None, resume=True, output_format='csv', sync=False):
+    """
+    Export several videos concurrently under one shared quota.
+
+    Every video gets <output_dir>/<id>_comments.<ext> in output_format
+    with its own checkpoint, and videos finished in an earlier run are
+    skipped unless resume is off; with merged_output they are also
+    combined into one file of the same format. With sync, videos already
+    exported only get their new threads (see sync_video), and the counts
+    are of comments added.
+    Stops starting new videos once the quota is used up. Returns
+    (counts by video id, errors by video id).
+    """
+    get_writer(output_format)
+    extension = WRITERS[output_format][1]
+    os.makedirs(output_dir, exist_ok=True)
+    services = ServicePool(service_factory, quota)
+    counts = {}
+    errors = {}
+    stop = threading.Event()
+    lock = threading.Lock()
+
+    def run(video_id):
+        if stop.is_set():
+            errors[video_id] = 'skipped: quota used up'
+            return
+        output_file = os.path.join(output_dir, f'{video_id}_comments{extension}')
+        try:
+            if sync:
+                counts[video_id] = sync_video(service_factory, video_id, output_file,
+                                              services=services, output_format=output_format)
+                message = f"✓ {video_id}: {counts[video_id]} new comments"
+            else:
+                counts[video_id] = export_video(service_factory, video_id, output_file,
+                                                services=services, resume=resume, skip_done=resume,
+                                                output_format=output_format)
+                message = f"✓ {video_id}: {counts[video_id]} comments"
+        except QuotaExceeded as e:
+            stop.set()
+            errors[video_id] = f'{e} (resume later from the checkpoint)'
+            message = f"✗ {video_id}: {errors[video_id]}"
+        except Exception as e:
+            errors[video_id] = str(e)
+            message = f"✗ {video_id}: {e}"
+        with lock:
+            done = len(counts) + len(errors)
+            print(f"[{done}/{len(video_ids)}] {message}", flush=True)
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        list(executor.map(run, video_ids))
+
+    if merged_output and counts:
+        parts = [(video_id, os.path.join(output_dir, f'{video_id}_comments{extension}'))
+                 for video_id in video_ids if video_id in counts]
+        merge_outputs(parts, merged_output, output_format)
+    return counts, errors
@@ -0,0 +1,314 @@
+"""
+yt-dlp Engine
+Runs yt-dlp in-process with warm, reusable YoutubeDL instances so the
+scripts do not pay Python startup and extractor import time per call.
+
+Options are given as yt-dlp command line arguments (without the URL),
+so existing commands can be passed through unchanged.
+"""
+
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+yt_dlp = None
+_missing = False  # set once the import failed, so it is not retried on every call
+
+# Extracted info dicts are reused for this many seconds (stream URLs expire)
+INFO_CACHE_TTL = 1800
+
+# Maximum number of info dicts kept in memory
+INFO_CACHE_SIZE = 64
+
+# Warm YoutubeDL instances kept per thread; the least recently used is closed
+MAX_INSTANCES = 4
+
+# Options that usually change with every URL (output name, referer); they are
+# applied to the warm instance per call instead of being part of its key
+PER_CALL_OPTIONS = ('-o', '--output', '--referer')
+
+_local = threading.local()
+_info_cache = OrderedDict()  # (url, args) -> (expires_at, info)
+_info_lock = threading.Lock()
+
+
+class EngineError(Exception):
+    """Raised when yt-dlp fails to extract or download a video"""
+
+
+def _load():
+    """Import yt_dlp on first use; returns None if it is not installed"""
+    global yt_dlp, _missing
+    if yt_dlp is None and not _missing:
+        try:
+            import yt_dlp as module
+        except ImportError:
+            _missing = True
+            return None
+        yt_dlp = module
+    return yt_dlp
+
+
+def is_available():
+    """Check if the yt_dlp package can be used in-process"""
+    return _load() is not None
+
+
+def split_args(args):
+    """Split args into (shared options, per-call options)"""
+    shared, per_call = [], []
+    args = list(args)
+    i = 0
+    while i < len(args):
+        name, has_value, _ = args[i].partition('=')
+        if name in PER_CALL_OPTIONS:
+            step = 1 if has_value else 2
+            per_call += args[i:i + step]
+        else:
+            step = 1
+            shared.append(args[i])
+        i += step
+    return shared, per_call
+
+
+def _parse(args):
+    parsed = yt_dlp.parse_options(list(args))
+    if parsed.urls:
+        raise EngineError('URLs must be passed separately from options')
+    return parsed.ydl_opts
+
+
+def get_ydl(args=()):
+    """Return this thread's warm YoutubeDL instance for the given options"""
+    if _load() is None:
+        raise EngineError('yt_dlp is not installed. Please run: pip install yt-dlp')
+
+    # YoutubeDL is not thread-safe, so every thread keeps its own instances
+    instances = getattr(_local, 'instances', None)
+    if instances is None:
+        instances = _local.instances = OrderedDict()  # shared args -> (ydl, defaults)
+
+    shared, per_call = split_args(args)
+    key = tuple(shared)
+    entry = instances.get(key)
+    if entry is None:
+        ydl = yt_dlp.YoutubeDL(_parse(shared))
+        defaults = {
+            'outtmpl': dict(ydl.params['outtmpl']),
+            'referer': ydl.params['http_headers'].get('Referer'),
+        }
+        entry = instances[key] = (ydl, defaults)
+        while len(instances) > MAX_INSTANCES:
+            _, (old, _) = instances.popitem(last=False)
+            old.close()
+    instances.move_to_end(key)
+
+    # Reset the per-call options, then apply this call's
+    ydl, defaults = entry
+    outtmpl = dict(defaults['outtmpl'])
+    referer = defaults['referer']
+    if per_call:
+        options = _parse(per_call)
+        outtmpl.update(options.get('outtmpl') or {})
+        referer = (options.get('http_headers') or {}).get('Referer', referer)
+    ydl.params['outtmpl'] = outtmpl
+    headers = ydl.params['http_headers']
+    if headers.get('Referer') != referer:
+        if referer is None:
+            headers.pop('Referer', None)
+        else:
+            headers['Referer'] = referer
+        # The request director copies the headers when it is built, so drop it
+        # to have it rebuilt; the extractors stay warm
+        director = ydl.__dict__.pop('_request_director', None)
+        if director is not None:
+            director.close()
+    return ydl
+
+
+def extract_info(url, args=(), cache=True):
+    """Extract metadata for url once; later calls reuse the cached info dict"""
+    key = (url, tuple(args))
+    if cache:
+        with _info_lock:
+            entry = _info_cache.get(key)
+            if entry is not None and entry[0] > time.time():
+                _info_cache.move_to_end(key)
+                return entry[1]
+
+    ydl = get_ydl(args)
+    try:
+        info = ydl.extract_info(url, download=False)
+    except yt_dlp.utils.DownloadError as e:
+        raise EngineError(str(e)) from e
+    if info is None:
+        raise EngineError(f'No video information found for {url}')
+
+    if cache:
+        with _info_lock:
+            _info_cache[key] = (time.time() + INFO_CACHE_TTL, info)
+            _info_cache.move_to_end(key)
+            while len(_info_cache) > INFO_CACHE_SIZE:
+                _info_cache.popitem(last=False)
+    return info
+
+
+def iter_entries(url, args=(), start=1, end=None):
+    """
+    Yield the entries of a search or playlist as yt-dlp produces them,
+    instead of waiting for the whole list. start and end select entries
+    like --playlist-start/--playlist-end (1-based, inclusive). Uses the
+    yt-dlp binary (one --dump-json line per entry) when the package is
+    not installed.
+    """
+    if is_available():
+        # The range is applied here rather than through args, so every page
+        # reuses the same warm YoutubeDL instance
+        ydl = get_ydl(args)
+        try:
+            # process=False keeps 'entries' lazy, so each one arrives as it is extracted
+            info = ydl.extract_info(url, download=False, process=False)
+            entries = itertools.islice((info or {}).get('entries') or [], start - 1, end)
+            for entry in entries:
+                if entry:
+                    yield entry
+        except yt_dlp.utils.DownloadError as e:
+            raise EngineError(str(e)) from e
+        return
+
+    cmd = cli_command() + ['--dump-json', '--playlist-start', str(start)]
+    if end is not None:
+        cmd += ['--playlist-end', str(end)]
+    cmd += list(args) + [url]
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    try:
+        for line in process.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+        stderr = process.stderr.read()
+        process.wait()
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        process.stderr.close()
+    if process.returncode != 0:
+        raise EngineError(stderr.strip() or f'yt-dlp exited with code {process.returncode}')
+
+
+def download(url, args=(), info=None):
+    """Download url (reusing info if given) and return the final file path"""
+    if info is None:
+        info = extract_info(url, args)
+
+    ydl = get_ydl(args)
+    try:
+        # Re-process the already extracted info instead of fetching the page again
+        result = ydl.process_ie_result(
+            yt_dlp.YoutubeDL.sanitize_info(info, remove_private_keys=True),
+            download=True
+        )
+    except yt_dlp.utils.DownloadError as e:
+        raise EngineError(str(e)) from e
+
+    return final_filename(ydl, result)
+
+
+def final_filename(ydl, result):
+    """Return the path of the file written for a processed info dict"""
+    downloads = result.get('requested_downloads') or []
+    if downloads and downloads[-1].get('filepath'):
+        return downloads[-1]['filepath']
+    return result.get('filepath') or ydl.prepare_filename(result)
+
+
+def dump_info_cli(url, args=()):
+    """Extract the info dict once with the yt-dlp binary (-J)"""
+    cmd = ['yt-dlp', '-J', '--no-playlist'] + list(args) + [url]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def cli_command():
+    """Command that runs yt-dlp as a separate process"""
+    if shutil.which('yt-dlp') or not is_available():
+        return ['yt-dlp']
+    return [sys.executable, '-m', 'yt_dlp']
+
+
+def save_info(info, path):
+    """Write an info dict to path for --load-info-json"""
+    if is_available():
+        info = yt_dlp.YoutubeDL.sanitize_info(info)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(info, f)
+
+
+def requested_formats(info):
+    """Return (video_format, audio_format) dicts selected in info; either may be None"""
+    formats = info.get('requested_formats') or [info]
+    video = next((f for f in formats if f.get('vcodec', 'none') != 'none'), None)
+    audio = next((f for f in formats if f.get('acodec', 'none') != 'none'), None)
+    return video, audio
+
+
+def open_stream(info_path, format_id, quiet=True):
+    """Start yt-dlp writing one format of a saved info dict to a pipe"""
+    cmd = cli_command() + ['--load-info-json', info_path, '-f', format_id, '-o', '-']
+    cmd += ['--quiet', '--no-progress', '--no-warnings'] if quiet else ['--no-warnings']
+    return subprocess.Popen(cmd, stdout=subprocess.PIPE)
+
+
+def download_info_cli(info, args=()):
+    """Download from a -J info dict without fetching the page again; returns the final path"""
+    with tempfile.TemporaryDirectory() as tmp:
+        info_path = os.path.join(tmp, 'info.json')
+        path_file = os.path.join(tmp, 'filepath.txt')
+        save_info(info, info_path)
+
+        cmd = ['yt-dlp'] + list(args) + [
+            '--load-info-json', info_path,
+            # Record the final path after merging/post-processing without --get-filename
+            '--print-to-file', 'after_move:filepath', path_file,
+        ]
+        subprocess.run(cmd, check=True)
+
+        with open(path_file, encoding='utf-8') as f:
+            lines = [line.strip() for line in f if line.strip()]
+    return lines[-1] if lines else info.get('filename')
+
+
+def fetch(url, args=()):
+    """Download url with a single metadata extraction; returns the final path"""
+    if is_available():
+        return download(url, args)
+    return download_info_cli(dump_info_cli(url, args), args)
+
+
+def playlist_urls(url):
+    """Return the video URLs of a playlist or channel without resolving formats"""
+    if is_available():
+        info = extract_info(url, ['--flat-playlist', '--quiet', '--no-warnings'], cache=False)
+    else:
+        cmd = ['yt-dlp', '-J', '--flat-playlist', '--no-warnings', url]
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        info = json.loads(result.stdout)
+
+    urls = []
+    for entry in info.get('entries') or []:
+        if entry:
+            urls.append(entry.get('webpage_url') or entry.get('url'))
+    return [u for u in urls if u] or [url]